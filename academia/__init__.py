@@ -0,0 +1,10 @@
+# Camada de dados do sistema de cobrança (banco, alunos, pagamentos, faturamento, relatórios e
+# notificações), independente do Streamlit. Scripts e workers usam Repositorio ou as funções dos módulos.
+
+def __getattr__(nome):
+    # Repositorio importa todos os módulos; carregado só quando usado, para que
+    # `python -m academia.<modulo>` não importe o próprio módulo antes de executá-lo
+    if nome == "Repositorio":
+        from academia.repositorio import Repositorio
+        return Repositorio
+    raise AttributeError(f"module 'academia' has no attribute {nome!r}")
@@ -0,0 +1,819 @@
+import contextvars
+import functools
+import inspect
+import itertools
+import os
+import queue
+import sqlite3
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import date
+
+from academia.instrumentacao import ConexaoInstrumentada
+
+# Caminho padrão do banco de dados
+DB_PATH = os.environ.get('ACADEMIA_DB', 'academia.db')
+
+# Ajustes das conexões (podem ser sobrescritos por variáveis de ambiente)
+BUSY_TIMEOUT_MS = int(os.environ.get('ACADEMIA_BUSY_TIMEOUT_MS', '5000'))
+CACHE_SIZE_KB = int(os.environ.get('ACADEMIA_CACHE_SIZE_KB', '20000'))
+MMAP_SIZE = int(os.environ.get('ACADEMIA_MMAP_SIZE', str(256 * 1024 * 1024)))
+POOL_TAMANHO = int(os.environ.get('ACADEMIA_POOL_TAMANHO', '8'))
+
+# Limites do cache de leituras
+CACHE_MAX_TREINADORES = int(os.environ.get('ACADEMIA_CACHE_MAX_TREINADORES', '256'))
+CACHE_MAX_ENTRADAS = int(os.environ.get('ACADEMIA_CACHE_MAX_ENTRADAS', '64'))
+
+# Migrações do schema, aplicadas em ordem e uma única vez.
+# A versão atual fica gravada em PRAGMA user_version: a migração N é aplicada
+# quando user_version < N. Novas migrações devem ser sempre adicionadas ao final.
+def _m001_schema_inicial(c):
+    # Criar tabela de treinadores
+    c.execute('''
+    CREATE TABLE IF NOT EXISTS treinadores (
+        id INTEGER PRIMARY KEY,
+        nome TEXT NOT NULL,
+        email TEXT UNIQUE NOT NULL,
+        senha TEXT NOT NULL
+    )
+    ''')
+
+    # Criar tabela de alunos
+    c.execute('''
+    CREATE TABLE IF NOT EXISTS alunos (
+        id INTEGER PRIMARY KEY,
+        nome TEXT NOT NULL,
+        email TEXT NOT NULL,
+        telefone TEXT NOT NULL,
+        data_inicio TEXT NOT NULL,
+        data_pagamento TEXT NOT NULL,
+        dia_vencimento INTEGER,
+        valor_mensalidade REAL NOT NULL,
+        treinador_id INTEGER NOT NULL,
+        FOREIGN KEY (treinador_id) REFERENCES treinadores (id)
+    )
+    ''')
+
+    # Bancos criados antes da coluna dia_vencimento: adicioná-la e preencher com o dia da data_pagamento
+    colunas = [row[1] for row in c.execute('PRAGMA table_info(alunos)')]
+    if 'dia_vencimento' not in colunas:
+        c.execute('ALTER TABLE alunos ADD COLUMN dia_vencimento INTEGER')
+        c.execute('UPDATE alunos SET dia_vencimento = CAST(substr(data_pagamento, 9, 2) AS INTEGER)')
+
+    # Criar tabela de pagamentos
+    c.execute('''
+    CREATE TABLE IF NOT EXISTS pagamentos (
+        id INTEGER PRIMARY KEY,
+        data_vencimento TEXT NOT NULL,
+        data_pagamento TEXT,
+        valor REAL NOT NULL,
+        status TEXT NOT NULL,
+        aluno_id INTEGER NOT NULL,
+        FOREIGN KEY (aluno_id) REFERENCES alunos (id)
+    )
+    ''')
+
+def _m002_indices_pagamentos(c):
+    # Histórico e último pagamento de um aluno (WHERE aluno_id = ? ORDER BY data_vencimento DESC)
+    c.execute('CREATE INDEX IF NOT EXISTS idx_pagamentos_aluno_vencimento ON pagamentos (aluno_id, data_vencimento)')
+    # Varreduras por status e vencimento (pendentes que vencem hoje, em 3 dias ou já venceram)
+    c.execute('CREATE INDEX IF NOT EXISTS idx_pagamentos_status_vencimento ON pagamentos (status, data_vencimento)')
+
+def _m003_indice_alunos_treinador(c):
+    # Lista de alunos do treinador já ordenada por nome
+    c.execute('CREATE INDEX IF NOT EXISTS idx_alunos_treinador_nome ON alunos (treinador_id, nome)')
+
+def _m004_pagamento_unico_por_vencimento(c):
+    # Remover vencimentos duplicados do mesmo aluno (ex: próximo pagamento criado duas vezes),
+    # mantendo o registro pago, se houver, ou o mais antigo
+    c.execute('''
+    DELETE FROM pagamentos WHERE id IN (
+        SELECT id FROM (
+            SELECT id, ROW_NUMBER() OVER (
+                PARTITION BY aluno_id, data_vencimento
+                ORDER BY status = 'Pago' DESC, id
+            ) AS ordem
+            FROM pagamentos
+        ) WHERE ordem > 1
+    )
+    ''')
+    # Um único pagamento por aluno e vencimento; substitui o índice simples da migração 2
+    c.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_pagamentos_aluno_vencimento_unico ON pagamentos (aluno_id, data_vencimento)')
+    c.execute('DROP INDEX IF EXISTS idx_pagamentos_aluno_vencimento')
+
+# Colunas com valores em dinheiro: em reais (REAL) até a migração 12 e em centavos (INTEGER) depois dela.
+# Os triggers e consultas que usam essas colunas são montados com um dos dois conjuntos de nomes.
+_VALORES_REAIS = {
+    "mensalidade": "valor_mensalidade",
+    "valor": "valor",
+    "atual_valor": "atual_valor",
+    "receita_mensal": "receita_mensal",
+    "receita_recebida": "receita_recebida",
+}
+_VALORES_CENTAVOS = {
+    "mensalidade": "mensalidade_centavos",
+    "valor": "valor_centavos",
+    "atual_valor": "atual_valor_centavos",
+    "receita_mensal": "receita_mensal_centavos",
+    "receita_recebida": "receita_recebida_centavos",
+}
+
+def _criar_trigger_resumo_update(c, v):
+    c.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS trg_pagamentos_resumo_update
+    AFTER UPDATE OF data_vencimento, data_pagamento, {v['valor']}, status, aluno_id ON pagamentos
+    BEGIN
+        INSERT OR IGNORE INTO resumo_mensal_pendente (treinador_id, mes)
+        SELECT treinador_id, substr(OLD.data_vencimento, 1, 7) FROM alunos WHERE id = OLD.aluno_id
+        UNION
+        SELECT treinador_id, substr(NEW.data_vencimento, 1, 7) FROM alunos WHERE id = NEW.aluno_id;
+    END
+    ''')
+
+def _m005_resumo_mensal(c):
+    # Totais mensais por treinador (mês de vencimento), usados pelos relatórios
+    c.execute('''
+    CREATE TABLE IF NOT EXISTS resumo_mensal (
+        treinador_id INTEGER NOT NULL,
+        mes TEXT NOT NULL,
+        cobrancas INTEGER NOT NULL,
+        valor_esperado REAL NOT NULL,
+        pagas INTEGER NOT NULL,
+        valor_recebido REAL NOT NULL,
+        dias_atraso INTEGER NOT NULL,
+        PRIMARY KEY (treinador_id, mes)
+    ) WITHOUT ROWID
+    ''')
+    # Meses alterados desde a última atualização do resumo, marcados pelos triggers abaixo
+    c.execute('''
+    CREATE TABLE IF NOT EXISTS resumo_mensal_pendente (
+        treinador_id INTEGER NOT NULL,
+        mes TEXT NOT NULL,
+        PRIMARY KEY (treinador_id, mes)
+    ) WITHOUT ROWID
+    ''')
+    c.execute('''
+    CREATE TRIGGER IF NOT EXISTS trg_pagamentos_resumo_insert AFTER INSERT ON pagamentos
+    BEGIN
+        INSERT OR IGNORE INTO resumo_mensal_pendente (treinador_id, mes)
+        SELECT treinador_id, substr(NEW.data_vencimento, 1, 7) FROM alunos WHERE id = NEW.aluno_id;
+    END
+    ''')
+    _criar_trigger_resumo_update(c, _VALORES_REAIS)
+    c.execute('''
+    CREATE TRIGGER IF NOT EXISTS trg_pagamentos_resumo_delete AFTER DELETE ON pagamentos
+    BEGIN
+        INSERT OR IGNORE INTO resumo_mensal_pendente (treinador_id, mes)
+        SELECT treinador_id, substr(OLD.data_vencimento, 1, 7) FROM alunos WHERE id = OLD.aluno_id;
+    END
+    ''')
+    # Bancos existentes: todos os meses começam pendentes
+    c.execute('''
+    INSERT OR IGNORE INTO resumo_mensal_pendente (treinador_id, mes)
+    SELECT DISTINCT a.treinador_id, substr(p.data_vencimento, 1, 7)
+    FROM pagamentos p
+    JOIN alunos a ON a.id = p.aluno_id
+    ''')
+
+# Último pagamento de um aluno (maior data de vencimento), copiado para as colunas atual_* de alunos
+def _sql_pagamento_atual(v):
+    return f'''
+UPDATE alunos SET (atual_pagamento_id, atual_status, atual_vencimento, {v['atual_valor']}, atual_data_pagamento) = (
+    SELECT id, status, data_vencimento, {v['valor']}, data_pagamento
+    FROM pagamentos
+    WHERE aluno_id = alunos.id
+    ORDER BY data_vencimento DESC
+    LIMIT 1
+)
+'''
+
+def _criar_triggers_pagamento_atual(c, v):
+    sql_pagamento_atual = _sql_pagamento_atual(v)
+    # Novo pagamento: só substitui o atual se vencer depois dele
+    c.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS trg_pagamentos_atual_insert AFTER INSERT ON pagamentos
+    BEGIN
+        UPDATE alunos SET atual_pagamento_id = NEW.id, atual_status = NEW.status,
+                          atual_vencimento = NEW.data_vencimento, {v['atual_valor']} = NEW.{v['valor']},
+                          atual_data_pagamento = NEW.data_pagamento
+        WHERE id = NEW.aluno_id
+          AND (atual_vencimento IS NULL OR NEW.data_vencimento >= atual_vencimento);
+    END
+    ''')
+    # Alteração do pagamento atual ou de um vencimento que pode passar a ser o último
+    c.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS trg_pagamentos_atual_update
+    AFTER UPDATE OF data_vencimento, data_pagamento, {v['valor']}, status, aluno_id ON pagamentos
+    BEGIN
+    ''' + sql_pagamento_atual + '''
+        WHERE id IN (OLD.aluno_id, NEW.aluno_id)
+          AND (atual_pagamento_id = OLD.id OR atual_vencimento IS NULL
+               OR NEW.data_vencimento >= atual_vencimento);
+    END
+    ''')
+    c.execute('''
+    CREATE TRIGGER IF NOT EXISTS trg_pagamentos_atual_delete AFTER DELETE ON pagamentos
+    BEGIN
+    ''' + sql_pagamento_atual + '''
+        WHERE id = OLD.aluno_id AND atual_pagamento_id = OLD.id;
+    END
+    ''')
+
+SQL_PAGAMENTO_ATUAL = _sql_pagamento_atual(_VALORES_CENTAVOS)
+
+def _m006_pagamento_atual(c):
+    # Ponteiro para o último pagamento de cada aluno, mantido pelos triggers abaixo, para que
+    # listagens e contagens por status sejam uma busca indexada em alunos (triggers acima)
+    colunas = [row[1] for row in c.execute('PRAGMA table_info(alunos)')]
+    for coluna, tipo in [('atual_pagamento_id', 'INTEGER'), ('atual_status', 'TEXT'),
+                         ('atual_vencimento', 'TEXT'), ('atual_valor', 'REAL'),
+                         ('atual_data_pagamento', 'TEXT')]:
+        if coluna not in colunas:
+            c.execute(f'ALTER TABLE alunos ADD COLUMN {coluna} {tipo}')
+    c.execute(_sql_pagamento_atual(_VALORES_REAIS))
+    c.execute('CREATE INDEX IF NOT EXISTS idx_alunos_treinador_status_nome ON alunos (treinador_id, atual_status, nome)')
+    _criar_triggers_pagamento_atual(c, _VALORES_REAIS)
+
+# Contadores por treinador calculados a partir de alunos (e do último pagamento em alunos.atual_*)
+def _sql_estatisticas_treinadores(v):
+    return f'''
+SELECT treinador_id,
+       COUNT(*) AS total_alunos,
+       COUNT(atual_pagamento_id) AS com_pagamento,
+       COALESCE(SUM(atual_status = 'Pendente'), 0) AS pendentes,
+       COALESCE(SUM(atual_status = 'Atrasado'), 0) AS atrasados,
+       COALESCE(SUM(atual_status = 'Pago'), 0) AS pagos,
+       COALESCE(SUM({v['mensalidade']}), 0) AS {v['receita_mensal']},
+       COALESCE(SUM(CASE WHEN atual_status = 'Pago' THEN {v['atual_valor']} END), 0) AS {v['receita_recebida']}
+FROM alunos
+GROUP BY treinador_id
+'''
+
+SQL_ESTATISTICAS_TREINADORES = _sql_estatisticas_treinadores(_VALORES_CENTAVOS)
+
+def _sql_somar_estatisticas(linha, sinal, v):
+    # Soma (sinal '+') ou subtrai (sinal '-') a contribuição de uma linha de alunos (NEW ou OLD)
+    return f'''
+        INSERT OR IGNORE INTO treinador_stats (treinador_id) VALUES ({linha}.treinador_id);
+        UPDATE treinador_stats SET
+            total_alunos = total_alunos {sinal} 1,
+            com_pagamento = com_pagamento {sinal} ({linha}.atual_pagamento_id IS NOT NULL),
+            pendentes = pendentes {sinal} ({linha}.atual_status IS 'Pendente'),
+            atrasados = atrasados {sinal} ({linha}.atual_status IS 'Atrasado'),
+            pagos = pagos {sinal} ({linha}.atual_status IS 'Pago'),
+            {v['receita_mensal']} = {v['receita_mensal']} {sinal} {linha}.{v['mensalidade']},
+            {v['receita_recebida']} = {v['receita_recebida']} {sinal}
+                CASE WHEN {linha}.atual_status IS 'Pago' THEN COALESCE({linha}.{v['atual_valor']}, 0) ELSE 0 END
+        WHERE treinador_id = {linha}.treinador_id;
+    '''
+
+def _criar_triggers_estatisticas(c, v):
+    c.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS trg_alunos_stats_insert AFTER INSERT ON alunos
+    BEGIN {_sql_somar_estatisticas('NEW', '+', v)} END
+    ''')
+    c.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS trg_alunos_stats_delete AFTER DELETE ON alunos
+    BEGIN {_sql_somar_estatisticas('OLD', '-', v)} END
+    ''')
+    c.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS trg_alunos_stats_update
+    AFTER UPDATE OF treinador_id, {v['mensalidade']}, atual_pagamento_id, atual_status, {v['atual_valor']} ON alunos
+    BEGIN {_sql_somar_estatisticas('OLD', '-', v)} {_sql_somar_estatisticas('NEW', '+', v)} END
+    ''')
+
+def _m007_estatisticas_treinadores(c):
+    # Métricas do dashboard por treinador, atualizadas pelos triggers de alunos
+    # (que também disparam quando o último pagamento muda, pelos triggers da migração 6)
+    c.execute('''
+    CREATE TABLE IF NOT EXISTS treinador_stats (
+        treinador_id INTEGER PRIMARY KEY,
+        total_alunos INTEGER NOT NULL DEFAULT 0,
+        com_pagamento INTEGER NOT NULL DEFAULT 0,
+        pendentes INTEGER NOT NULL DEFAULT 0,
+        atrasados INTEGER NOT NULL DEFAULT 0,
+        pagos INTEGER NOT NULL DEFAULT 0,
+        receita_mensal REAL NOT NULL DEFAULT 0,
+        receita_recebida REAL NOT NULL DEFAULT 0
+    )
+    ''')
+    c.execute('DELETE FROM treinador_stats')
+    c.execute('INSERT INTO treinador_stats ' + _sql_estatisticas_treinadores(_VALORES_REAIS))
+    _criar_triggers_estatisticas(c, _VALORES_REAIS)
+
+def _m008_busca_alunos(c):
+    # Índice de texto completo (sem acentos) sobre nome, email e telefone dos alunos,
+    # com o conteúdo lido da própria tabela alunos e sincronizado pelos triggers abaixo
+    c.execute('''
+    CREATE VIRTUAL TABLE IF NOT EXISTS alunos_busca USING fts5(
+        nome, email, telefone,
+        content='alunos', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    )
+    ''')
+    c.execute("INSERT INTO alunos_busca (alunos_busca) VALUES ('rebuild')")
+    c.execute('''
+    CREATE TRIGGER IF NOT EXISTS trg_alunos_busca_insert AFTER INSERT ON alunos
+    BEGIN
+        INSERT INTO alunos_busca (rowid, nome, email, telefone) VALUES (NEW.id, NEW.nome, NEW.email, NEW.telefone);
+    END
+    ''')
+    c.execute('''
+    CREATE TRIGGER IF NOT EXISTS trg_alunos_busca_delete AFTER DELETE ON alunos
+    BEGIN
+        INSERT INTO alunos_busca (alunos_busca, rowid, nome, email, telefone)
+        VALUES ('delete', OLD.id, OLD.nome, OLD.email, OLD.telefone);
+    END
+    ''')
+    c.execute('''
+    CREATE TRIGGER IF NOT EXISTS trg_alunos_busca_update AFTER UPDATE OF nome, email, telefone ON alunos
+    BEGIN
+        INSERT INTO alunos_busca (alunos_busca, rowid, nome, email, telefone)
+        VALUES ('delete', OLD.id, OLD.nome, OLD.email, OLD.telefone);
+        INSERT INTO alunos_busca (rowid, nome, email, telefone) VALUES (NEW.id, NEW.nome, NEW.email, NEW.telefone);
+    END
+    ''')
+
+def _m009_fila_envios(c):
+    # Fila persistente de mensagens (email, WhatsApp) drenada em segundo plano
+    c.execute('''
+    CREATE TABLE IF NOT EXISTS envios (
+        id INTEGER PRIMARY KEY,
+        treinador_id INTEGER NOT NULL,
+        pagamento_id INTEGER,
+        canal TEXT NOT NULL,
+        destino TEXT NOT NULL,
+        mensagem TEXT NOT NULL,
+        referencia TEXT NOT NULL,
+        status TEXT NOT NULL DEFAULT 'Pendente',
+        tentativas INTEGER NOT NULL DEFAULT 0,
+        proxima_tentativa TEXT NOT NULL,
+        erro TEXT,
+        criado_em TEXT NOT NULL,
+        enviado_em TEXT,
+        FOREIGN KEY (treinador_id) REFERENCES treinadores (id)
+    )
+    ''')
+    # Um lembrete por pagamento, canal e dia de referência
+    c.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_envios_lembrete ON envios (pagamento_id, canal, referencia)')
+    # Próximos envios a tentar e contagem por status do treinador
+    c.execute('CREATE INDEX IF NOT EXISTS idx_envios_status_tentativa ON envios (status, proxima_tentativa)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_envios_treinador_status ON envios (treinador_id, status)')
+
+def _m010_modelos_mensagem(c):
+    # Modelos de lembrete editados pelo treinador (os tipos sem modelo usam o texto padrão)
+    c.execute('''
+    CREATE TABLE IF NOT EXISTS modelos_mensagem (
+        treinador_id INTEGER NOT NULL,
+        tipo TEXT NOT NULL,
+        texto TEXT NOT NULL,
+        PRIMARY KEY (treinador_id, tipo),
+        FOREIGN KEY (treinador_id) REFERENCES treinadores (id)
+    )
+    ''')
+
+def _m011_conciliacao(c):
+    # Créditos importados de extratos bancários (CSV/OFX) e o pagamento conciliado com cada um;
+    # o identificador (FITID do OFX ou hash da linha do CSV) impede importar o mesmo crédito duas vezes
+    c.execute('''
+    CREATE TABLE IF NOT EXISTS transacoes_extrato (
+        id INTEGER PRIMARY KEY,
+        treinador_id INTEGER NOT NULL,
+        identificador TEXT NOT NULL,
+        data TEXT NOT NULL,
+        valor REAL NOT NULL,
+        descricao TEXT NOT NULL,
+        situacao TEXT NOT NULL,
+        pagamento_id INTEGER,
+        candidatos TEXT,
+        importado_em TEXT NOT NULL,
+        FOREIGN KEY (treinador_id) REFERENCES treinadores (id),
+        FOREIGN KEY (pagamento_id) REFERENCES pagamentos (id)
+    )
+    ''')
+    c.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_transacoes_extrato_identificador ON transacoes_extrato (treinador_id, identificador)')
+    # Fila de revisão do treinador
+    c.execute('CREATE INDEX IF NOT EXISTS idx_transacoes_extrato_situacao ON transacoes_extrato (treinador_id, situacao)')
+
+def _m012_valores_em_centavos(c):
+    # Valores em dinheiro passam a ser centavos inteiros: somas exatas (SUM de INTEGER, sem os
+    # arredondamentos de REAL) e a formatação em reais fica só na exibição (academia.dinheiro).
+    # Os triggers que citam as colunas antigas são removidos antes do DROP COLUMN e recriados depois.
+    for trigger in ['trg_pagamentos_resumo_update', 'trg_pagamentos_atual_insert', 'trg_pagamentos_atual_update',
+                    'trg_pagamentos_atual_delete', 'trg_alunos_stats_insert', 'trg_alunos_stats_delete',
+                    'trg_alunos_stats_update']:
+        c.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+
+    # Conversão feita uma única vez, arredondando para o centavo mais próximo
+    for tabela, antiga, nova, tipo in [
+        ('alunos', 'valor_mensalidade', 'mensalidade_centavos', 'INTEGER NOT NULL DEFAULT 0'),
+        ('alunos', 'atual_valor', 'atual_valor_centavos', 'INTEGER'),
+        ('pagamentos', 'valor', 'valor_centavos', 'INTEGER NOT NULL DEFAULT 0'),
+        ('transacoes_extrato', 'valor', 'valor_centavos', 'INTEGER NOT NULL DEFAULT 0'),
+    ]:
+        c.execute(f'ALTER TABLE {tabela} ADD COLUMN {nova} {tipo}')
+        c.execute(f'UPDATE {tabela} SET {nova} = CAST(ROUND({antiga} * 100) AS INTEGER)')
+        c.execute(f'ALTER TABLE {tabela} DROP COLUMN {antiga}')
+
+    _criar_trigger_resumo_update(c, _VALORES_CENTAVOS)
+    _criar_triggers_pagamento_atual(c, _VALORES_CENTAVOS)
+
+    # Tabelas derivadas recriadas com colunas INTEGER e recalculadas
+    c.execute('DROP TABLE treinador_stats')
+    c.execute('''
+    CREATE TABLE treinador_stats (
+        treinador_id INTEGER PRIMARY KEY,
+        total_alunos INTEGER NOT NULL DEFAULT 0,
+        com_pagamento INTEGER NOT NULL DEFAULT 0,
+        pendentes INTEGER NOT NULL DEFAULT 0,
+        atrasados INTEGER NOT NULL DEFAULT 0,
+        pagos INTEGER NOT NULL DEFAULT 0,
+        receita_mensal_centavos INTEGER NOT NULL DEFAULT 0,
+        receita_recebida_centavos INTEGER NOT NULL DEFAULT 0
+    )
+    ''')
+    c.execute('INSERT INTO treinador_stats ' + SQL_ESTATISTICAS_TREINADORES)
+    _criar_triggers_estatisticas(c, _VALORES_CENTAVOS)
+
+    c.execute('DROP TABLE resumo_mensal')
+    c.execute('''
+    CREATE TABLE resumo_mensal (
+        treinador_id INTEGER NOT NULL,
+        mes TEXT NOT NULL,
+        cobrancas INTEGER NOT NULL,
+        valor_esperado_centavos INTEGER NOT NULL,
+        pagas INTEGER NOT NULL,
+        valor_recebido_centavos INTEGER NOT NULL,
+        dias_atraso INTEGER NOT NULL,
+        PRIMARY KEY (treinador_id, mes)
+    ) WITHOUT ROWID
+    ''')
+    c.execute('''
+    INSERT OR IGNORE INTO resumo_mensal_pendente (treinador_id, mes)
+    SELECT DISTINCT a.treinador_id, substr(p.data_vencimento, 1, 7)
+    FROM pagamentos p
+    JOIN alunos a ON a.id = p.aluno_id
+    ''')
+
+def _m013_resumo_alunos(c):
+    # Os meses do resumo também mudam quando um aluno troca de treinador (os pagamentos passam a
+    # contar para o novo) ou é removido (os pagamentos deixam de contar para o treinador)
+    c.execute('''
+    CREATE TRIGGER IF NOT EXISTS trg_alunos_resumo_update AFTER UPDATE OF treinador_id ON alunos
+    WHEN OLD.treinador_id IS NOT NEW.treinador_id
+    BEGIN
+        INSERT OR IGNORE INTO resumo_mensal_pendente (treinador_id, mes)
+        SELECT OLD.treinador_id, substr(data_vencimento, 1, 7) FROM pagamentos WHERE aluno_id = OLD.id
+        UNION
+        SELECT NEW.treinador_id, substr(data_vencimento, 1, 7) FROM pagamentos WHERE aluno_id = NEW.id;
+    END
+    ''')
+    c.execute('''
+    CREATE TRIGGER IF NOT EXISTS trg_alunos_resumo_delete AFTER DELETE ON alunos
+    BEGIN
+        INSERT OR IGNORE INTO resumo_mensal_pendente (treinador_id, mes)
+        SELECT OLD.treinador_id, substr(data_vencimento, 1, 7) FROM pagamentos WHERE aluno_id = OLD.id;
+    END
+    ''')
+
+def _m014_busca_por_treinador(c):
+    # O treinador passa a fazer parte do índice de busca: a consulta filtra pelo token do treinador
+    # dentro do MATCH, e o bm25 só ordena os alunos dele, em vez de percorrer os de todos os treinadores
+    for trigger in ['trg_alunos_busca_insert', 'trg_alunos_busca_delete', 'trg_alunos_busca_update']:
+        c.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+    c.execute('DROP TABLE IF EXISTS alunos_busca')
+    c.execute('''
+    CREATE VIRTUAL TABLE alunos_busca USING fts5(
+        nome, email, telefone, treinador_id,
+        content='alunos', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    )
+    ''')
+    c.execute("INSERT INTO alunos_busca (alunos_busca) VALUES ('rebuild')")
+    c.execute('''
+    CREATE TRIGGER trg_alunos_busca_insert AFTER INSERT ON alunos
+    BEGIN
+        INSERT INTO alunos_busca (rowid, nome, email, telefone, treinador_id)
+        VALUES (NEW.id, NEW.nome, NEW.email, NEW.telefone, NEW.treinador_id);
+    END
+    ''')
+    c.execute('''
+    CREATE TRIGGER trg_alunos_busca_delete AFTER DELETE ON alunos
+    BEGIN
+        INSERT INTO alunos_busca (alunos_busca, rowid, nome, email, telefone, treinador_id)
+        VALUES ('delete', OLD.id, OLD.nome, OLD.email, OLD.telefone, OLD.treinador_id);
+    END
+    ''')
+    c.execute('''
+    CREATE TRIGGER trg_alunos_busca_update AFTER UPDATE OF nome, email, telefone, treinador_id ON alunos
+    BEGIN
+        INSERT INTO alunos_busca (alunos_busca, rowid, nome, email, telefone, treinador_id)
+        VALUES ('delete', OLD.id, OLD.nome, OLD.email, OLD.telefone, OLD.treinador_id);
+        INSERT INTO alunos_busca (rowid, nome, email, telefone, treinador_id)
+        VALUES (NEW.id, NEW.nome, NEW.email, NEW.telefone, NEW.treinador_id);
+    END
+    ''')
+
+def _m015_reserva_envios(c):
+    # Momento em que o envio foi reservado por um despachante; só reservas antigas (de um processo
+    # interrompido) voltam para a fila, e não as de outro despachante ainda em andamento
+    c.execute('ALTER TABLE envios ADD COLUMN reservado_em TEXT')
+
+MIGRACOES = [
+    _m001_schema_inicial,
+    _m002_indices_pagamentos,
+    _m003_indice_alunos_treinador,
+    _m004_pagamento_unico_por_vencimento,
+    _m005_resumo_mensal,
+    _m006_pagamento_atual,
+    _m007_estatisticas_treinadores,
+    _m008_busca_alunos,
+    _m009_fila_envios,
+    _m010_modelos_mensagem,
+    _m011_conciliacao,
+    _m012_valores_em_centavos,
+    _m013_resumo_alunos,
+    _m014_busca_por_treinador,
+    _m015_reserva_envios,
+]
+
+def versao_schema(conn):
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+def aplicar_migracoes(conn):
+    # Schema já atualizado: apenas a leitura do user_version, nenhum DDL
+    if versao_schema(conn) >= len(MIGRACOES):
+        return 0
+
+    aplicadas = 0
+    # BEGIN IMMEDIATE garante que só um processo migra por vez;
+    # a versão é relida depois de obter o lock
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        versao = versao_schema(conn)
+        for numero in range(versao + 1, len(MIGRACOES) + 1):
+            MIGRACOES[numero - 1](conn)
+            conn.execute(f'PRAGMA user_version = {numero}')
+            aplicadas += 1
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return aplicadas
+
+# Pool de conexões reutilizadas entre reruns e sessões do Streamlit.
+# As conexões de escrita usam WAL, então as de leitura (somente leitura) nunca
+# esperam pelo escritor; o busy_timeout evita "database is locked" entre escritores.
+def _abrir_conexao(caminho, somente_leitura):
+    if somente_leitura:
+        uri = 'file:' + os.path.abspath(caminho) + '?mode=ro'
+        conn = sqlite3.connect(uri, uri=True, check_same_thread=False, factory=ConexaoInstrumentada)
+    else:
+        conn = sqlite3.connect(caminho, check_same_thread=False, factory=ConexaoInstrumentada)
+        conn.execute('PRAGMA journal_mode = WAL')
+    conn.row_factory = sqlite3.Row
+    conn.execute(f'PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}')
+    conn.execute('PRAGMA synchronous = NORMAL')
+    conn.execute(f'PRAGMA cache_size = -{CACHE_SIZE_KB}')
+    conn.execute(f'PRAGMA mmap_size = {MMAP_SIZE}')
+    conn.execute('PRAGMA temp_store = MEMORY')
+    return conn
+
+class PoolConexoes:
+    def __init__(self, caminho, somente_leitura=False, tamanho=POOL_TAMANHO):
+        self.caminho = caminho
+        self.somente_leitura = somente_leitura
+        self.tamanho = tamanho
+        self._livres = queue.LifoQueue()
+
+    def obter(self):
+        try:
+            return self._livres.get_nowait()
+        except queue.Empty:
+            return _abrir_conexao(self.caminho, self.somente_leitura)
+
+    def devolver(self, conn):
+        # Conexões além do tamanho do pool são fechadas
+        if self._livres.qsize() < self.tamanho:
+            self._livres.put(conn)
+        else:
+            conn.close()
+
+    def fechar(self):
+        while True:
+            try:
+                self._livres.get_nowait().close()
+            except queue.Empty:
+                return
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+def _pool(caminho, somente_leitura):
+    chave = (os.path.abspath(caminho), somente_leitura)
+    with _pools_lock:
+        pool = _pools.get(chave)
+        if pool is None:
+            pool = _pools[chave] = PoolConexoes(caminho, somente_leitura)
+        return pool
+
+# Banco em uso no contexto atual (thread ou tarefa asyncio): um caminho ou uma conexão já aberta,
+# definido por usando() (ver academia.repositorio). Sem valor, as funções usam DB_PATH.
+_banco_contexto = contextvars.ContextVar('banco_contexto', default=None)
+
+def banco_atual():
+    return _banco_contexto.get() or DB_PATH
+
+@contextmanager
+def usando(banco):
+    token = _banco_contexto.set(banco)
+    try:
+        yield
+    finally:
+        _banco_contexto.reset(token)
+
+def _chave_banco(banco):
+    if isinstance(banco, sqlite3.Connection):
+        return ('conexao', id(banco))
+    return os.path.abspath(banco)
+
+@contextmanager
+def conexao(caminho=None):
+    # Conexão de escrita: commit ao final do bloco, rollback em caso de erro
+    banco = caminho or banco_atual()
+    # Uma conexão recebida de fora é usada diretamente, sem pool
+    pool = None if isinstance(banco, sqlite3.Connection) else _pool(banco, somente_leitura=False)
+    conn = banco if pool is None else pool.obter()
+    alteracoes = conn.total_changes
+    try:
+        yield conn
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        # Qualquer escrita invalida o cache de leituras
+        if conn.total_changes != alteracoes:
+            invalidar_cache()
+        if pool is not None:
+            pool.devolver(conn)
+
+@contextmanager
+def leitura(caminho=None):
+    # Conexão somente leitura para consultas
+    banco = caminho or banco_atual()
+    if isinstance(banco, sqlite3.Connection):
+        yield banco
+        return
+    pool = _pool(banco, somente_leitura=True)
+    conn = pool.obter()
+    try:
+        yield conn
+    finally:
+        # Encerrar qualquer transação de leitura aberta antes de devolver ao pool
+        conn.rollback()
+        pool.devolver(conn)
+
+def usar_banco(caminho):
+    # Altera o banco padrão usado pelas funções de dados (scripts e benchmarks)
+    global DB_PATH
+    DB_PATH = caminho
+
+def fechar_conexoes():
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.fechar()
+        _pools.clear()
+        for versao in _versoes_banco.values():
+            versao.fechar()
+        _versoes_banco.clear()
+    # Na próxima abertura o schema volta a ser verificado (ex: arquivo recriado)
+    _schemas_atualizados.clear()
+
+# Cache de leituras por treinador.
+# Cada entrada guarda a versão dos dados em que foi lida e é recarregada quando a versão muda.
+# A versão combina as escritas deste processo (invalidar_cache, chamado por conexao()) com a
+# versão do arquivo do banco (versao_banco), que muda também com as escritas de outros processos:
+# CLIs, tarefas noturnas e outros workers do Streamlit. Os treinadores e as entradas menos usados
+# recentemente são removidos quando os limites são atingidos.
+_versao_dados = 0
+_versao_lock = threading.Lock()
+
+def versao_dados():
+    return _versao_dados
+
+def invalidar_cache():
+    global _versao_dados
+    with _versao_lock:
+        _versao_dados += 1
+
+class VersaoBanco:
+    # PRAGMA data_version muda, na conexão que o consulta, sempre que outra conexão (deste ou de
+    # outro processo) grava no arquivo. Uma conexão por banco, usada só para essa consulta,
+    # transforma as mudanças em um número que só cresce (também entre instâncias recriadas).
+    _numeros = itertools.count(1)
+
+    def __init__(self, caminho):
+        self._conn = _abrir_conexao(caminho, somente_leitura=True)
+        self._lock = threading.Lock()
+        self._data_version = None
+        self._versao = None
+
+    def atual(self):
+        with self._lock:
+            data_version = self._conn.execute('PRAGMA data_version').fetchone()[0]
+            if data_version != self._data_version:
+                self._data_version = data_version
+                self._versao = next(self._numeros)
+            return self._versao
+
+    def fechar(self):
+        self._conn.close()
+
+_versoes_banco = {}
+
+def versao_banco(banco):
+    # Uma conexão recebida de fora só é alterada por este processo (invalidar_cache basta)
+    if isinstance(banco, sqlite3.Connection):
+        return 0
+    chave = os.path.abspath(banco)
+    with _pools_lock:
+        versao = _versoes_banco.get(chave)
+        if versao is None:
+            versao = _versoes_banco[chave] = VersaoBanco(banco)
+    return versao.atual()
+
+class CacheLeituras:
+    def __init__(self, max_treinadores=CACHE_MAX_TREINADORES, max_entradas=CACHE_MAX_ENTRADAS):
+        self.max_treinadores = max_treinadores
+        self.max_entradas = max_entradas
+        self._treinadores = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obter(self, treinador_id, chave, carregar, versao):
+        # A versão é lida antes da consulta: uma escrita durante a consulta deixa a entrada
+        # com uma versão antiga, recarregada na próxima leitura
+        with self._lock:
+            entradas = self._treinadores.get(treinador_id)
+            if entradas is not None and chave in entradas and entradas[chave][0] == versao:
+                self._treinadores.move_to_end(treinador_id)
+                entradas.move_to_end(chave)
+                return entradas[chave][1]
+
+        valor = carregar()
+
+        with self._lock:
+            entradas = self._treinadores.setdefault(treinador_id, OrderedDict())
+            entradas[chave] = (versao, valor)
+            entradas.move_to_end(chave)
+            self._treinadores.move_to_end(treinador_id)
+            while len(entradas) > self.max_entradas:
+                entradas.popitem(last=False)
+            while len(self._treinadores) > self.max_treinadores:
+                self._treinadores.popitem(last=False)
+        return valor
+
+    def limpar(self):
+        with self._lock:
+            self._treinadores.clear()
+
+cache_leituras = CacheLeituras()
+
+def cache_por_treinador(funcao):
+    # O primeiro argumento da função decorada deve ser o treinador_id. Um `hoje` omitido entra na
+    # chave (e na chamada) já como a data atual, para que as entradas não passem da meia-noite.
+    # Mesmo com a entrada em cache, cada chamada custa um PRAGMA data_version (sem leitura de
+    # tabelas) na conexão de versao_banco, para enxergar as gravações de outros processos.
+    assinatura = inspect.signature(funcao)
+    usa_hoje = "hoje" in assinatura.parameters
+
+    @functools.wraps(funcao)
+    def wrapper(treinador_id, *args, **kwargs):
+        if usa_hoje:
+            argumentos = assinatura.bind(treinador_id, *args, **kwargs)
+            if argumentos.arguments.get("hoje") is None:
+                argumentos.arguments["hoje"] = date.today()
+            args, kwargs = argumentos.args[1:], argumentos.kwargs
+        banco = banco_atual()
+        chave = (_chave_banco(banco), funcao.__name__, args, tuple(sorted(kwargs.items())))
+        versao = (versao_dados(), versao_banco(banco))
+        return cache_leituras.obter(treinador_id, chave, lambda: funcao(treinador_id, *args, **kwargs), versao)
+    return wrapper
+
+_schemas_atualizados = set()
+
+# Inicialização do banco de dados
+def init_db(caminho=None):
+    caminho = caminho or banco_atual()
+    if isinstance(caminho, sqlite3.Connection):
+        return aplicar_migracoes(caminho)
+    # Nesta execução do processo o schema já foi verificado
+    if os.path.abspath(caminho) in _schemas_atualizados:
+        return 0
+    with conexao(caminho) as conn:
+        aplicadas = aplicar_migracoes(conn)
+    _schemas_atualizados.add(os.path.abspath(caminho))
+    return aplicadas
@@ -0,0 +1,375 @@
+import argparse
+import bisect
+import csv
+import difflib
+import functools
+import hashlib
+import io
+import json
+import os
+import re
+import unicodedata
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from academia.banco import DB_PATH, cache_por_treinador, conexao, init_db, leitura, usar_banco
+from academia.dados import inserir_proximos_pagamentos, marcar_status
+from academia.dinheiro import centavos_de_texto
+
+# Situações de um crédito importado do extrato
+CONCILIADA = "Conciliada"
+REVISAR = "Revisar"
+SEM_CORRESPONDENCIA = "Sem correspondência"
+DESCARTADA = "Descartada"
+
+# Vencimentos que um crédito pode quitar: até ATRASO_MAXIMO_DIAS antes da data do crédito
+# (pagamento atrasado) e até ANTECEDENCIA_MAXIMA_DIAS depois (pagamento adiantado)
+ATRASO_MAXIMO_DIAS = 60
+ANTECEDENCIA_MAXIMA_DIAS = 15
+# Semelhança mínima entre o nome do aluno e a descrição do crédito, e vantagem mínima sobre o
+# candidato seguinte (de outro aluno), para conciliar sem revisão
+LIMIAR_NOME = 0.6
+MARGEM_NOME = 0.2
+# Candidatos guardados para a revisão do treinador; sem nenhuma palavra do nome na descrição,
+# o crédito só vai para revisão se houver no máximo MAX_CANDIDATOS_SEM_NOME pagamentos do mesmo valor
+MAX_CANDIDATOS = 5
+MAX_CANDIDATOS_SEM_NOME = 20
+
+# Colunas aceitas no CSV (cabeçalhos comparados sem acentos e em minúsculas)
+COLUNAS_CSV = {
+    "data": ["data", "data lancamento", "data do lancamento"],
+    "valor": ["valor", "valor (r$)", "credito", "credito (r$)"],
+    "descricao": ["descricao", "historico", "nome", "lancamento", "detalhes"],
+}
+
+PALAVRAS_IGNORADAS = {"de", "da", "do", "das", "dos", "e"}
+
+def _sem_acentos(texto):
+    return unicodedata.normalize("NFKD", texto).encode("ascii", "ignore").decode().lower()
+
+def palavras(texto):
+    return [p for p in re.findall(r"[a-z0-9]+", _sem_acentos(texto)) if p not in PALAVRAS_IGNORADAS]
+
+def _converter_data(texto):
+    # AAAA-MM-DD, DD/MM/AAAA ou AAAAMMDD[hhmmss...] (OFX)
+    texto = texto.strip()
+    for formato, tamanho in (("%Y-%m-%d", 10), ("%d/%m/%Y", 10), ("%Y%m%d", 8)):
+        try:
+            return datetime.strptime(texto[:tamanho], formato).date()
+        except ValueError:
+            pass
+    raise ValueError(f"data inválida: {texto}")
+
+def _texto(arquivo):
+    # arquivo pode ser um caminho ou um objeto de arquivo (ex: upload do Streamlit)
+    if hasattr(arquivo, "read"):
+        conteudo = arquivo.read()
+    else:
+        with open(arquivo, "rb") as f:
+            conteudo = f.read()
+    if isinstance(conteudo, str):
+        return conteudo
+    try:
+        return conteudo.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        # Extratos OFX de bancos brasileiros costumam vir em Windows-1252
+        return conteudo.decode("cp1252")
+
+def _ler_ofx(texto):
+    # OFX 1.x (SGML, tags de campo sem fechamento) ou 2.x (XML): um <STMTTRN> por lançamento
+    transacoes = []
+    erros = []
+    for numero, bloco in enumerate(re.split(r"<STMTTRN>", texto, flags=re.I)[1:], start=1):
+        bloco = re.split(r"</STMTTRN>|</BANKTRANLIST>", bloco, flags=re.I)[0]
+        campos = {nome.upper(): valor.strip() for nome, valor in re.findall(r"<(\w+)>([^<\r\n]*)", bloco)}
+        try:
+            transacao = {
+                "data": _converter_data(campos.get("DTPOSTED", "")),
+                "valor_centavos": centavos_de_texto(campos.get("TRNAMT", "")),
+                "descricao": " ".join(filter(None, [campos.get("NAME"), campos.get("MEMO")])),
+            }
+        except ValueError as e:
+            erros.append({"linha": numero, "erro": str(e)})
+            continue
+        if campos.get("FITID"):
+            transacao["identificador"] = "ofx:" + campos["FITID"]
+        transacoes.append(transacao)
+    return transacoes, erros
+
+def _ler_csv(texto):
+    amostra = texto[:4096]
+    try:
+        dialeto = csv.Sniffer().sniff(amostra, delimiters=";,\t")
+    except csv.Error:
+        dialeto = csv.excel
+    leitor = csv.reader(io.StringIO(texto), dialeto)
+    cabecalho = [_sem_acentos(c).strip() for c in next(leitor, [])]
+
+    posicoes = {}
+    for coluna, nomes in COLUNAS_CSV.items():
+        posicao = next((cabecalho.index(nome) for nome in nomes if nome in cabecalho), None)
+        if posicao is None:
+            raise ValueError(f"Coluna obrigatória ausente: {coluna} (aceitos: {', '.join(nomes)})")
+        posicoes[coluna] = posicao
+
+    transacoes = []
+    erros = []
+    for numero, linha in enumerate(leitor, start=2):  # a linha 1 é o cabeçalho
+        if not any(campo.strip() for campo in linha):
+            continue
+        try:
+            transacoes.append({
+                "data": _converter_data(linha[posicoes["data"]]),
+                "valor_centavos": centavos_de_texto(linha[posicoes["valor"]]),
+                "descricao": linha[posicoes["descricao"]].strip(),
+            })
+        except (ValueError, IndexError):
+            erros.append({"linha": numero, "erro": "data ou valor inválido"})
+    return transacoes, erros
+
+def ler_extrato(arquivo, nome_arquivo=None):
+    # Retorna (créditos do extrato, erros por linha); débitos são ignorados
+    nome_arquivo = nome_arquivo or getattr(arquivo, "name", None) or str(arquivo)
+    texto = _texto(arquivo)
+    if nome_arquivo.lower().endswith(".ofx") or re.search(r"<OFX>", texto[:4096], re.I):
+        transacoes, erros = _ler_ofx(texto)
+    else:
+        transacoes, erros = _ler_csv(texto)
+
+    creditos = []
+    ocorrencias = defaultdict(int)
+    for transacao in transacoes:
+        if transacao["valor_centavos"] <= 0:
+            continue
+        if "identificador" not in transacao:
+            # Sem FITID: hash da linha; linhas idênticas no mesmo arquivo são diferenciadas pela ocorrência
+            chave = f"{transacao['data']}|{transacao['valor_centavos']}|{transacao['descricao']}"
+            ocorrencias[chave] += 1
+            transacao["identificador"] = "hash:" + hashlib.sha1(
+                f"{chave}|{ocorrencias[chave]}".encode()).hexdigest()
+        creditos.append(transacao)
+    return creditos, erros
+
+@functools.lru_cache(maxsize=65536)
+def _parecidas(a, b):
+    # Pequenos erros de digitação ("Souza" e "Sousa"); as estimativas rápidas descartam a maioria dos pares
+    if len(b) < 4:
+        return False
+    comparacao = difflib.SequenceMatcher(None, a, b)
+    return comparacao.real_quick_ratio() >= 0.8 and comparacao.quick_ratio() >= 0.8 and comparacao.ratio() >= 0.8
+
+def semelhanca_nome(nome, palavras_descricao):
+    # Fração das palavras do nome do aluno encontradas na descrição do crédito: exatas, abreviadas
+    # pela inicial ("JOAO S SILVA"), cortadas pelo banco ("JOAO DA SIL") ou com pequenos erros de digitação
+    palavras_nome = palavras(nome)
+    if not palavras_nome:
+        return 0.0
+    pontos = 0.0
+    for palavra in palavras_nome:
+        if palavra in palavras_descricao:
+            pontos += 1
+        elif any(len(p) >= 3 and palavra.startswith(p) for p in palavras_descricao):
+            pontos += 0.8
+        elif len(palavra) >= 4 and any(_parecidas(palavra, p) for p in palavras_descricao):
+            pontos += 0.8
+        elif palavra[0] in palavras_descricao:
+            pontos += 0.5
+    return pontos / len(palavras_nome)
+
+class IndiceAbertos:
+    # Pagamentos em aberto indexados por valor (em centavos) e por (valor, palavra do nome do aluno),
+    # cada lista em ordem de vencimento: um crédito consulta apenas os pagamentos do mesmo valor,
+    # dentro da janela de datas, o que mantém a conciliação linear no tamanho do extrato
+    def __init__(self, abertos):
+        self.por_valor = defaultdict(list)
+        self.por_nome = defaultdict(list)
+        for pagamento in sorted(abertos, key=lambda p: p["data_vencimento"]):
+            valor = pagamento["valor_centavos"]
+            self.por_valor[valor].append(pagamento)
+            for palavra in set(palavras(pagamento["nome"])):
+                self.por_nome[valor, palavra].append(pagamento)
+        self.vencimentos = {chave: [p["data_vencimento"] for p in lista]
+                            for indice in (self.por_valor, self.por_nome) for chave, lista in indice.items()}
+        self.usados = set()
+
+    def _na_janela(self, chave, indice, inicio, fim):
+        vencimentos = self.vencimentos.get(chave)
+        if not vencimentos:
+            return []
+        lista = indice[chave][bisect.bisect_left(vencimentos, inicio):bisect.bisect_right(vencimentos, fim)]
+        return [p for p in lista if p["id"] not in self.usados]
+
+    def candidatos(self, credito, palavras_descricao):
+        valor = credito["valor_centavos"]
+        inicio = (credito["data"] - timedelta(days=ATRASO_MAXIMO_DIAS)).isoformat()
+        fim = (credito["data"] + timedelta(days=ANTECEDENCIA_MAXIMA_DIAS)).isoformat()
+
+        # Os alunos com mais palavras do nome na descrição (nomes comuns, como "Maria",
+        # aparecem em muitos pagamentos; a contagem deixa só os mais prováveis)
+        acertos = defaultdict(int)
+        pagamentos = {}
+        for palavra in palavras_descricao:
+            for pagamento in self._na_janela((valor, palavra), self.por_nome, inicio, fim):
+                acertos[pagamento["id"]] += 1
+                pagamentos[pagamento["id"]] = pagamento
+        if acertos:
+            maximo = max(acertos.values())
+            return [pagamentos[p] for p, total in acertos.items() if total == maximo]
+
+        # Nenhuma palavra em comum (ex: pago por um parente ou nome digitado errado): todos os
+        # pagamentos do mesmo valor, se forem poucos o bastante para uma revisão útil
+        candidatos = self._na_janela(valor, self.por_valor, inicio, fim)
+        return candidatos if len(candidatos) <= MAX_CANDIDATOS_SEM_NOME else []
+
+def conciliar(creditos, abertos):
+    # Decide, para cada crédito, o pagamento quitado (situação CONCILIADA), os candidatos a revisar
+    # (REVISAR) ou SEM_CORRESPONDENCIA; cada pagamento é quitado por no máximo um crédito
+    indice = IndiceAbertos(abertos)
+    resultados = []
+    for credito in creditos:
+        palavras_descricao = set(palavras(credito["descricao"]))
+        pontuados = sorted(((semelhanca_nome(p["nome"], palavras_descricao), p)
+                            for p in indice.candidatos(credito, palavras_descricao)),
+                           key=lambda item: (-item[0], item[1]["data_vencimento"]))
+        resultado = dict(credito, situacao=SEM_CORRESPONDENCIA, pagamento_id=None, candidatos=[])
+        if pontuados:
+            pontos, melhor = pontuados[0]
+            # Outros vencimentos do mesmo aluno não tornam o crédito ambíguo: quita-se o mais antigo
+            rivais = [p for p, pagamento in pontuados[1:] if pagamento["aluno_id"] != melhor["aluno_id"]]
+            if pontos >= LIMIAR_NOME and pontos - (rivais[0] if rivais else 0.0) >= MARGEM_NOME:
+                resultado.update(situacao=CONCILIADA, pagamento_id=melhor["id"])
+                indice.usados.add(melhor["id"])
+            else:
+                resultado.update(situacao=REVISAR,
+                                 candidatos=[pagamento["id"] for _, pagamento in pontuados[:MAX_CANDIDATOS]])
+        resultados.append(resultado)
+    return resultados
+
+def importar_extrato(arquivo, treinador_id, nome_arquivo=None, criar_proximos=False):
+    # Lê o extrato, concilia os créditos ainda não importados com os pagamentos em aberto do treinador
+    # e aplica tudo em uma única transação: pagamentos quitados (e, opcionalmente, os próximos
+    # pagamentos mensais) e o registro dos créditos, inclusive os que ficam para revisão
+    creditos, erros = ler_extrato(arquivo, nome_arquivo)
+    totais = {"creditos": len(creditos), "ja_importados": 0, "conciliados": 0, "revisar": 0,
+              "sem_correspondencia": 0, "proximos": 0, "erros": erros}
+    if not creditos:
+        return totais
+
+    agora = datetime.now().isoformat(sep=" ", timespec="seconds")
+    with conexao() as conn:
+        conn.execute('BEGIN IMMEDIATE')
+        c = conn.execute('''
+        SELECT identificador FROM transacoes_extrato
+        WHERE treinador_id = ? AND identificador IN (SELECT value FROM json_each(?))
+        ''', (treinador_id, json.dumps([credito["identificador"] for credito in creditos])))
+        importados = {row[0] for row in c.fetchall()}
+        novos = [credito for credito in creditos if credito["identificador"] not in importados]
+        totais["ja_importados"] = len(creditos) - len(novos)
+        if not novos:
+            return totais
+
+        datas = [credito["data"] for credito in novos]
+        c = conn.execute('''
+        SELECT p.id, p.aluno_id, p.valor_centavos, p.data_vencimento, a.nome
+        FROM alunos a
+        JOIN pagamentos p ON p.aluno_id = a.id
+        WHERE a.treinador_id = ? AND p.status IN ('Pendente', 'Atrasado')
+          AND p.data_vencimento BETWEEN ? AND ?
+        ''', (treinador_id, (min(datas) - timedelta(days=ATRASO_MAXIMO_DIAS)).isoformat(),
+              (max(datas) + timedelta(days=ANTECEDENCIA_MAXIMA_DIAS)).isoformat()))
+        resultados = conciliar(novos, [dict(row) for row in c.fetchall()])
+
+        quitados = [(r["pagamento_id"], r["data"].isoformat()) for r in resultados if r["situacao"] == CONCILIADA]
+        marcar_status(conn, treinador_id, "Pago", quitados)
+        if criar_proximos:
+            totais["proximos"] = inserir_proximos_pagamentos(conn, treinador_id, [p for p, _ in quitados])
+
+        conn.executemany('''
+        INSERT INTO transacoes_extrato (treinador_id, identificador, data, valor_centavos, descricao, situacao,
+                                        pagamento_id, candidatos, importado_em)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', [(treinador_id, r["identificador"], r["data"].isoformat(), r["valor_centavos"], r["descricao"],
+               r["situacao"], r["pagamento_id"], json.dumps(r["candidatos"]) if r["candidatos"] else None, agora)
+              for r in resultados])
+
+    totais["conciliados"] = len(quitados)
+    totais["revisar"] = sum(r["situacao"] == REVISAR for r in resultados)
+    totais["sem_correspondencia"] = sum(r["situacao"] == SEM_CORRESPONDENCIA for r in resultados)
+    return totais
+
+@cache_por_treinador
+def listar_revisao(treinador_id):
+    # Créditos aguardando revisão, com os pagamentos candidatos de cada um
+    with leitura() as conn:
+        c = conn.execute('''
+        SELECT id, data, valor_centavos, descricao, candidatos FROM transacoes_extrato
+        WHERE treinador_id = ? AND situacao = ?
+        ORDER BY data, id
+        ''', (treinador_id, REVISAR))
+        transacoes = [dict(row) for row in c.fetchall()]
+
+        ids = sorted({p for t in transacoes for p in json.loads(t["candidatos"])})
+        c = conn.execute('''
+        SELECT p.id, p.data_vencimento, p.valor_centavos, p.status, a.nome
+        FROM pagamentos p
+        JOIN alunos a ON a.id = p.aluno_id
+        WHERE p.id IN (SELECT value FROM json_each(?)) AND a.treinador_id = ?
+        ''', (json.dumps(ids), treinador_id))
+        pagamentos = {row["id"]: dict(row) for row in c.fetchall()}
+
+    for transacao in transacoes:
+        # Candidatos quitados desde a importação deixam de ser oferecidos
+        transacao["candidatos"] = [pagamentos[p] for p in json.loads(transacao.pop("candidatos"))
+                                   if p in pagamentos and pagamentos[p]["status"] != "Pago"]
+    return transacoes
+
+def confirmar_conciliacao(treinador_id, transacao_id, pagamento_id, criar_proximo=False):
+    # Quita o pagamento escolhido na revisão com a data do crédito; False se o crédito já foi
+    # resolvido ou o pagamento não é do treinador
+    with conexao() as conn:
+        conn.execute('BEGIN IMMEDIATE')
+        row = conn.execute('''
+        SELECT data FROM transacoes_extrato WHERE id = ? AND treinador_id = ? AND situacao = ?
+        ''', (transacao_id, treinador_id, REVISAR)).fetchone()
+        if row is None or not marcar_status(conn, treinador_id, "Pago", [(pagamento_id, row["data"])]):
+            return False
+        if criar_proximo:
+            inserir_proximos_pagamentos(conn, treinador_id, [pagamento_id])
+        conn.execute('''
+        UPDATE transacoes_extrato SET situacao = ?, pagamento_id = ? WHERE id = ?
+        ''', (CONCILIADA, pagamento_id, transacao_id))
+    return True
+
+def descartar_conciliacao(treinador_id, transacao_id):
+    # O crédito não corresponde a nenhuma mensalidade (ex: outra receita do treinador)
+    with conexao() as conn:
+        c = conn.execute('''
+        UPDATE transacoes_extrato SET situacao = ? WHERE id = ? AND treinador_id = ? AND situacao = ?
+        ''', (DESCARTADA, transacao_id, treinador_id, REVISAR))
+        return c.rowcount > 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Concilia um extrato bancário (CSV ou OFX) com os pagamentos em aberto.")
+    parser.add_argument("arquivo", help="extrato OFX ou CSV com as colunas data, valor e descrição")
+    parser.add_argument("--treinador", type=int, required=True, help="treinador dono da conta")
+    parser.add_argument("--criar-proximos", action="store_true",
+                        help="criar o próximo pagamento mensal de cada aluno quitado")
+    parser.add_argument("--banco", default=DB_PATH, help="caminho do banco de dados")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.arquivo):
+        parser.error(f"arquivo não encontrado: {args.arquivo}")
+
+    usar_banco(args.banco)
+    init_db()
+    inicio = datetime.now()
+    totais = importar_extrato(args.arquivo, args.treinador, criar_proximos=args.criar_proximos)
+    duracao = (datetime.now() - inicio).total_seconds()
+    for erro in totais["erros"]:
+        print(f"linha {erro['linha']}: {erro['erro']}")
+    print(f"{totais['creditos']} créditos lidos em {duracao:.2f}s: {totais['conciliados']} conciliados, "
+          f"{totais['revisar']} para revisar, {totais['sem_correspondencia']} sem correspondência, "
+          f"{totais['ja_importados']} já importados")
+
+if __name__ == "__main__":
+    main()
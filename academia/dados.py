@@ -0,0 +1,520 @@
+import hashlib
+import logging
+import os
+import sqlite3
+from datetime import datetime, timedelta
+
+from academia.banco import banco_atual, cache_por_treinador, conexao, leitura, usando
+from academia.faturamento import proximo_vencimento
+
+# Funções de autenticação
+def hash_password(password):
+    return hashlib.sha256(password.encode()).hexdigest()
+
+def check_password(password, hashed_password):
+    return hash_password(password) == hashed_password
+
+def register_user(nome, email, senha):
+    try:
+        with conexao() as conn:
+            hashed_password = hash_password(senha)
+            conn.execute("INSERT INTO treinadores (nome, email, senha) VALUES (?, ?, ?)", 
+                         (nome, email, hashed_password))
+        return True
+    except sqlite3.IntegrityError:
+        return False
+
+def authenticate_user(email, senha):
+    with leitura() as conn:
+        c = conn.execute("SELECT id, nome, email, senha FROM treinadores WHERE email = ?", (email,))
+        user = c.fetchone()
+    
+    if user and check_password(senha, user[3]):
+        return {"id": user[0], "nome": user[1], "email": user[2]}
+    return None
+
+# Funções para gerenciar alunos
+def adicionar_aluno(nome, email, telefone, data_pagamento, mensalidade_centavos, treinador_id):
+    data_inicio = datetime.now().strftime("%Y-%m-%d")
+    
+    # Extrair o dia do mês da data de pagamento para o dia fixo de vencimento
+    data_vencimento = datetime.strptime(data_pagamento, "%Y-%m-%d")
+    dia_vencimento = data_vencimento.day
+    
+    with conexao() as conn:
+        c = conn.execute('''
+        INSERT INTO alunos (nome, email, telefone, data_inicio, data_pagamento, dia_vencimento, mensalidade_centavos, treinador_id)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (nome, email, telefone, data_inicio, data_pagamento, dia_vencimento, mensalidade_centavos, treinador_id))
+        
+        aluno_id = c.lastrowid
+        
+        # Criar o primeiro pagamento
+        conn.execute('''
+        INSERT INTO pagamentos (data_vencimento, valor_centavos, status, aluno_id)
+        VALUES (?, ?, ?, ?)
+        ''', (data_pagamento, mensalidade_centavos, "Pendente", aluno_id))
+    
+    return aluno_id
+
+def adicionar_aluno_com_status(nome, email, telefone, data_pagamento, mensalidade_centavos, treinador_id, status_inicial="Pendente"):
+    data_inicio = datetime.now().strftime("%Y-%m-%d")
+    
+    # Extrair o dia do mês da data de pagamento para o dia fixo de vencimento
+    data_vencimento = datetime.strptime(data_pagamento, "%Y-%m-%d")
+    dia_vencimento = data_vencimento.day
+    
+    # Se o status for "Pago", registramos a data de pagamento efetivo
+    data_pagamento_efetivo = None
+    if status_inicial == "Pago":
+        data_pagamento_efetivo = datetime.now().strftime("%Y-%m-%d")
+    
+    with conexao() as conn:
+        c = conn.execute('''
+        INSERT INTO alunos (nome, email, telefone, data_inicio, data_pagamento, dia_vencimento, mensalidade_centavos, treinador_id)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (nome, email, telefone, data_inicio, data_pagamento, dia_vencimento, mensalidade_centavos, treinador_id))
+        
+        aluno_id = c.lastrowid
+        
+        # Criar o primeiro pagamento com o status especificado
+        # A data de vencimento é a data informada pelo usuário
+        conn.execute('''
+        INSERT INTO pagamentos (data_vencimento, data_pagamento, valor_centavos, status, aluno_id)
+        VALUES (?, ?, ?, ?, ?)
+        ''', (data_pagamento, data_pagamento_efetivo, mensalidade_centavos, status_inicial, aluno_id))
+    
+    return aluno_id
+
+# Colunas de alunos e do último pagamento (mantido em alunos.atual_* pelos triggers da migração 6)
+_COLUNAS_ALUNO = '''
+a.id, a.nome, a.email, a.telefone, a.data_inicio, a.data_pagamento, a.dia_vencimento,
+a.mensalidade_centavos, a.treinador_id
+'''
+_COLUNAS_PAGAMENTO_ATUAL = '''
+a.atual_pagamento_id AS pag_id, a.atual_vencimento AS pag_data_vencimento,
+a.atual_data_pagamento AS pag_data_pagamento, a.atual_valor_centavos AS pag_valor_centavos,
+a.atual_status AS pag_status, a.id AS pag_aluno_id
+'''
+
+@cache_por_treinador
+def listar_alunos(treinador_id):
+    with leitura() as conn:
+        c = conn.execute(f'''
+        SELECT {_COLUNAS_ALUNO} FROM alunos a WHERE treinador_id = ? ORDER BY nome
+        ''', (treinador_id,))
+        
+        alunos = [dict(row) for row in c.fetchall()]
+    return alunos
+
+def obter_status_pagamento(aluno_id):
+    with leitura() as conn:
+        c = conn.execute('''
+        SELECT p.* FROM alunos a JOIN pagamentos p ON p.id = a.atual_pagamento_id WHERE a.id = ?
+        ''', (aluno_id,))
+        
+        pagamento = c.fetchone()
+    
+    if pagamento:
+        return dict(pagamento)
+    return None
+
+def _aluno_com_pagamento(row):
+    # Colunas pag_* da consulta formam o dicionário do último pagamento do aluno
+    aluno = {k: row[k] for k in row.keys() if not k.startswith("pag_")}
+    aluno['pagamento'] = None
+    if row['pag_id'] is not None:
+        aluno['pagamento'] = {k[4:]: row[k] for k in row.keys() if k.startswith("pag_")}
+    return aluno
+
+# Faixas de atraso (em dias) usadas no dashboard
+FAIXAS_ATRASO = ["0-30", "31-60", "61-90", "90+"]
+
+# pandas e numpy são importados apenas pelas funções do dashboard, para que scripts e
+# workers que não as usam iniciem sem esse custo
+def _data_exibicao(coluna):
+    # AAAA-MM-DD -> DD/MM/AAAA por fatias do texto (mais rápido que converter e usar strftime)
+    coluna = coluna.astype("string")
+    return coluna.str.slice(8, 10) + "/" + coluna.str.slice(5, 7) + "/" + coluna.str.slice(0, 4)
+
+def calcular_prazos(tabela, hoje=None):
+    # Acrescenta ao quadro de alunos os prazos do último pagamento, calculados por coluna
+    import numpy as np
+    import pandas as pd
+    
+    hoje = pd.Timestamp(hoje or datetime.now().date())
+    status = tabela["pag_status"]
+    vencimento = pd.to_datetime(tabela["pag_data_vencimento"], format="%Y-%m-%d", errors="coerce")
+
+    dias = (vencimento - hoje).dt.days
+    em_aberto = status.isin(["Pendente", "Atrasado"])
+    atraso = (-dias).where(em_aberto & (dias < 0))
+
+    tabela["dias_ate_vencimento"] = dias.astype("Int64")
+    tabela["dias_atraso"] = atraso.astype("Int64")
+    tabela["faixa_atraso"] = pd.cut(atraso, [0, 30, 60, 90, np.inf], labels=FAIXAS_ATRASO)
+    tabela["situacao"] = np.select(
+        [atraso.notna(),
+         (status == "Pendente") & (dias > 0),
+         (status == "Pendente") & (dias == 0),
+         (status == "Pago") & tabela["pag_data_pagamento"].notna()],
+        ["Atrasado há " + atraso.astype("Int64").astype(str) + " dias",
+         "Vence em " + dias.astype("Int64").astype(str) + " dias",
+         "Vence hoje",
+         "Pago em " + _data_exibicao(tabela["pag_data_pagamento"])],
+        default="",
+    )
+    tabela["data_pagamento_exibicao"] = _data_exibicao(tabela["data_pagamento"])
+    return tabela
+
+@cache_por_treinador
+def obter_metricas(treinador_id):
+    # Métricas do cabeçalho do dashboard: uma linha de treinador_stats, mantida pelos triggers de alunos
+    with leitura() as conn:
+        row = conn.execute('''
+        SELECT total_alunos, com_pagamento, pendentes, atrasados, pagos, receita_mensal_centavos,
+               receita_recebida_centavos
+        FROM treinador_stats WHERE treinador_id = ?
+        ''', (treinador_id,)).fetchone()
+    
+    if row:
+        return dict(row)
+    return {"total_alunos": 0, "com_pagamento": 0, "pendentes": 0, "atrasados": 0, "pagos": 0,
+            "receita_mensal_centavos": 0, "receita_recebida_centavos": 0}
+
+@cache_por_treinador
+def obter_painel_alunos(treinador_id, hoje=None):
+    # Um quadro (DataFrame) com cada aluno e seu último pagamento, montado a partir de uma única consulta;
+    # prazos e faixas de atraso são calculados sobre as colunas, sem percorrer os alunos em Python
+    import pandas as pd
+    
+    with leitura() as conn:
+        c = conn.execute(f'''
+        SELECT {_COLUNAS_ALUNO}, {_COLUNAS_PAGAMENTO_ATUAL}
+        FROM alunos a
+        WHERE a.treinador_id = ?
+        ORDER BY a.nome
+        ''', (treinador_id,))
+        colunas = [d[0] for d in c.description]
+        tabela = pd.DataFrame.from_records([tuple(row) for row in c.fetchall()], columns=colunas)
+
+    tabela = calcular_prazos(tabela, hoje)
+    return {
+        "tabela": tabela,
+        "faixas_atraso": {faixa: int(total) for faixa, total in
+                          tabela["faixa_atraso"].value_counts(sort=False).items()},
+    }
+
+# Tamanho da página de cards do dashboard
+PAGINA_CARDS = 20
+
+@cache_por_treinador
+def listar_alunos_por_status(treinador_id, status=None, limite=PAGINA_CARDS, deslocamento=0):
+    # Uma página dos alunos cujo último pagamento tem o status informado (None: todos com pagamento),
+    # lida em ordem de nome pelos índices (treinador_id, atual_status, nome) ou (treinador_id, nome)
+    filtro = "a.atual_pagamento_id IS NOT NULL" if status is None else "a.atual_status = :status"
+    with leitura() as conn:
+        c = conn.execute(f'''
+        SELECT {_COLUNAS_ALUNO}, {_COLUNAS_PAGAMENTO_ATUAL}
+        FROM alunos a
+        WHERE a.treinador_id = :treinador_id AND {filtro}
+        ORDER BY a.nome, a.id
+        LIMIT :limite OFFSET :deslocamento
+        ''', {"treinador_id": treinador_id, "status": status,
+              "limite": limite, "deslocamento": deslocamento})
+        
+        alunos = [_aluno_com_pagamento(row) for row in c.fetchall()]
+    return alunos
+
+# Resultados exibidos na busca de alunos
+LIMITE_BUSCA = 20
+
+def _consulta_fts(treinador_id, termo):
+    # Cada palavra digitada vira um prefixo entre aspas ("joa"*), todas obrigatórias e procuradas
+    # só em nome, email e telefone; o token do treinador restringe o MATCH aos alunos dele
+    palavras = [p.replace('"', '""') for p in termo.split()]
+    termos = " ".join(f'"{p}"*' for p in palavras if p)
+    if not termos:
+        return ""
+    return f'treinador_id : "{int(treinador_id)}" AND {{nome email telefone}} : ({termos})'
+
+@cache_por_treinador
+def buscar_alunos(treinador_id, termo, limite=LIMITE_BUSCA):
+    # Busca por nome, email ou telefone (sem acentos e por prefixo), ordenada por relevância;
+    # o nome pesa mais que email e telefone
+    consulta = _consulta_fts(treinador_id, termo)
+    if not consulta:
+        return []
+    with leitura() as conn:
+        c = conn.execute(f'''
+        SELECT {_COLUNAS_ALUNO}, {_COLUNAS_PAGAMENTO_ATUAL}
+        FROM alunos_busca b
+        JOIN alunos a ON a.id = b.rowid
+        WHERE alunos_busca MATCH :consulta
+        ORDER BY bm25(alunos_busca, 10.0, 2.0, 1.0, 0.0), a.nome
+        LIMIT :limite
+        ''', {"consulta": consulta, "limite": limite})
+        
+        alunos = [_aluno_com_pagamento(row) for row in c.fetchall()]
+    return alunos
+
+def registrar_pagamento(pagamento_id):
+    with conexao() as conn:
+        c = conn.cursor()
+        
+        data_atual = datetime.now().strftime("%Y-%m-%d")
+        c.execute('''
+        UPDATE pagamentos SET data_pagamento = ?, status = 'Pago' WHERE id = ?
+        ''', (data_atual, pagamento_id))
+
+def criar_proximo_pagamento(aluno_id, valor_centavos, data_ultimo_pagamento):
+    with conexao() as conn:
+        # Obter o dia de vencimento fixo do aluno
+        c = conn.execute('SELECT dia_vencimento FROM alunos WHERE id = ?', (aluno_id,))
+        resultado = c.fetchone()
+        
+        # Se não houver dia de vencimento definido, usar o dia do último pagamento
+        dia_vencimento = resultado[0] if resultado else None
+        
+        # Próxima data de vencimento: mês seguinte, mesmo dia do vencimento
+        data_vencimento_str = proximo_vencimento(data_ultimo_pagamento, dia_vencimento).strftime("%Y-%m-%d")
+        
+        # Inserir o novo pagamento no banco de dados (ignorado se já existir para este vencimento)
+        conn.execute('''
+        INSERT INTO pagamentos (data_vencimento, data_pagamento, valor_centavos, status, aluno_id)
+        VALUES (?, NULL, ?, 'Pendente', ?)
+        ON CONFLICT (aluno_id, data_vencimento) DO NOTHING
+        ''', (data_vencimento_str, valor_centavos, aluno_id))
+
+STATUS_PAGAMENTO = ("Pago", "Pendente", "Atrasado")
+
+def marcar_status(conn, treinador_id, novo_status, itens):
+    # itens: pares (pagamento_id, data_pagamento), alterados na transação da conexão informada;
+    # apenas pagamentos de alunos do treinador são alterados
+    if novo_status not in STATUS_PAGAMENTO:
+        raise ValueError(f"Status inválido: {novo_status}")
+    c = conn.executemany('''
+    UPDATE pagamentos SET status = ?, data_pagamento = ?
+    WHERE id = ? AND aluno_id IN (SELECT id FROM alunos WHERE treinador_id = ?)
+    ''', [(novo_status, data_pagamento if novo_status == "Pago" else None, pagamento_id, treinador_id)
+          for pagamento_id, data_pagamento in itens])
+    return c.rowcount
+
+def inserir_proximos_pagamentos(conn, treinador_id, pagamento_ids):
+    # Pagamento do mês seguinte de cada pagamento informado (ignorado se já existir)
+    if not pagamento_ids:
+        return 0
+    c = conn.execute(f'''
+    SELECT p.aluno_id, p.valor_centavos, p.data_vencimento, a.dia_vencimento
+    FROM pagamentos p
+    JOIN alunos a ON a.id = p.aluno_id
+    WHERE a.treinador_id = ? AND p.id IN ({", ".join("?" * len(pagamento_ids))})
+    ''', (treinador_id, *pagamento_ids))
+    novos = [(proximo_vencimento(data_vencimento, dia_vencimento).strftime("%Y-%m-%d"), valor_centavos, aluno_id)
+             for aluno_id, valor_centavos, data_vencimento, dia_vencimento in c.fetchall()]
+    c = conn.executemany('''
+    INSERT INTO pagamentos (data_vencimento, data_pagamento, valor_centavos, status, aluno_id)
+    VALUES (?, NULL, ?, 'Pendente', ?)
+    ON CONFLICT (aluno_id, data_vencimento) DO NOTHING
+    ''', novos)
+    return c.rowcount
+
+def alterar_status_pagamentos(treinador_id, pagamento_ids, novo_status, criar_proximos=False, hoje=None):
+    # Altera o status de vários pagamentos do treinador em uma única transação; com criar_proximos,
+    # cria também o pagamento do mês seguinte de cada aluno
+    data_pagamento = (hoje or datetime.now().date()).strftime("%Y-%m-%d")
+    with conexao() as conn:
+        conn.execute('BEGIN IMMEDIATE')
+        alterados = marcar_status(conn, treinador_id, novo_status,
+                                  [(pagamento_id, data_pagamento) for pagamento_id in pagamento_ids])
+        proximos = inserir_proximos_pagamentos(conn, treinador_id, pagamento_ids) if criar_proximos else 0
+    return {"alterados": alterados, "proximos": proximos}
+
+def alterar_status_pagamento(treinador_id, pagamento_id, novo_status, hoje=None):
+    # Mesmo caminho das alterações em lote e da conciliação (marcar_status): "Pago" registra a data
+    # de pagamento, os outros status a removem
+    return alterar_status_pagamentos(treinador_id, [pagamento_id], novo_status, hoje=hoje)["alterados"]
+
+def atualizar_aluno(aluno_id, nome, email, telefone, data_pagamento, mensalidade_centavos):
+    # Extrair o dia do mês da data de pagamento para o dia fixo de vencimento
+    data_vencimento = datetime.strptime(data_pagamento, "%Y-%m-%d")
+    dia_vencimento = data_vencimento.day
+    
+    with conexao() as conn:
+        c = conn.execute('''
+        UPDATE alunos 
+        SET nome = ?, email = ?, telefone = ?, data_pagamento = ?, dia_vencimento = ?, mensalidade_centavos = ?
+        WHERE id = ?
+        ''', (nome, email, telefone, data_pagamento, dia_vencimento, mensalidade_centavos, aluno_id))
+        
+        # Verificar se a atualização foi bem-sucedida
+        return c.rowcount > 0
+
+@cache_por_treinador
+def obter_treinador(treinador_id):
+    with leitura() as conn:
+        c = conn.execute("SELECT nome, email FROM treinadores WHERE id = ?", (treinador_id,))
+        treinador = c.fetchone()
+    
+    if treinador:
+        return dict(treinador)
+    return None
+
+def atualizar_treinador(treinador_id, nome, senha_atual, nova_senha=None):
+    # Retorna False se a senha atual não confere
+    with conexao() as conn:
+        c = conn.execute("SELECT senha FROM treinadores WHERE id = ?", (treinador_id,))
+        row = c.fetchone()
+        if not row or not check_password(senha_atual, row[0]):
+            return False
+        
+        if nova_senha:
+            conn.execute("UPDATE treinadores SET nome = ?, senha = ? WHERE id = ?",
+                         (nome, hash_password(nova_senha), treinador_id))
+        else:
+            conn.execute("UPDATE treinadores SET nome = ? WHERE id = ?", (nome, treinador_id))
+    return True
+
+def sincronizar_treinador(treinador_id, nome, email):
+    # Cópia do treinador no banco próprio (modo com um banco por treinador); a senha fica apenas no catálogo
+    with conexao() as conn:
+        conn.execute('''
+        INSERT INTO treinadores (id, nome, email, senha) VALUES (?, ?, ?, '')
+        ON CONFLICT (id) DO UPDATE SET nome = excluded.nome, email = excluded.email
+        ''', (treinador_id, nome, email))
+
+# Tamanho da página do histórico de pagamentos
+PAGINA_HISTORICO = 6
+
+_SQL_HISTORICO = '''
+SELECT p.* FROM pagamentos p
+JOIN alunos a ON a.id = p.aluno_id
+WHERE p.aluno_id = :aluno_id AND a.treinador_id = :treinador_id {continuacao}
+ORDER BY p.data_vencimento DESC, p.id DESC
+LIMIT :limite
+'''
+# Primeira página e páginas seguintes em consultas separadas: com a chave em uma condição opcional
+# (:data_vencimento IS NULL OR ...), o SQLite não usa o intervalo no índice e toda página começaria
+# a leitura pelo pagamento mais recente
+SQL_HISTORICO_PRIMEIRA_PAGINA = _SQL_HISTORICO.format(continuacao="")
+SQL_HISTORICO_CONTINUACAO = _SQL_HISTORICO.format(continuacao='''
+  AND p.data_vencimento <= :data_vencimento AND (p.data_vencimento < :data_vencimento OR p.id < :id)''')
+
+@cache_por_treinador
+def listar_historico_pagamentos(treinador_id, aluno_id, depois_de=None, limite=PAGINA_HISTORICO):
+    # Paginação por chave (keyset) em (data_vencimento, id), do mais recente para o mais antigo.
+    # depois_de é a chave do último pagamento da página anterior; None para a primeira página.
+    parametros = {"aluno_id": aluno_id, "treinador_id": treinador_id, "limite": limite + 1}
+    if depois_de is None:
+        sql = SQL_HISTORICO_PRIMEIRA_PAGINA
+    else:
+        sql = SQL_HISTORICO_CONTINUACAO
+        parametros["data_vencimento"], parametros["id"] = depois_de
+    with leitura() as conn:
+        historico = [dict(row) for row in conn.execute(sql, parametros).fetchall()]
+    
+    # Uma linha a mais indica que ainda há pagamentos mais antigos
+    proxima = None
+    if len(historico) > limite:
+        historico = historico[:limite]
+        proxima = (historico[-1]['data_vencimento'], historico[-1]['id'])
+    
+    return {
+        "pagamentos": historico,
+        "proxima": proxima
+    }
+
+@cache_por_treinador
+def obter_resumo_pagamentos(treinador_id, aluno_id):
+    # Totais do aluno, calculados uma vez e mantidos em cache até a próxima escrita
+    with leitura() as conn:
+        c = conn.execute('''
+        SELECT COUNT(p.id) AS total_pagamentos,
+               COALESCE(SUM(CASE WHEN p.status = 'Pago' THEN p.valor_centavos END), 0) AS total_pago_centavos,
+               COALESCE(SUM(CASE WHEN p.status = 'Atrasado' THEN p.valor_centavos END), 0) AS total_atrasado_centavos,
+               COUNT(DISTINCT substr(p.data_vencimento, 1, 7)) AS meses_ativos,
+               MIN(p.data_vencimento) AS primeiro_vencimento
+        FROM pagamentos p
+        JOIN alunos a ON a.id = p.aluno_id
+        WHERE p.aluno_id = ? AND a.treinador_id = ?
+        ''', (aluno_id, treinador_id))
+        
+        resumo = dict(c.fetchone())
+    return resumo
+
+# Função para verificar pagamentos e gerar notificações (somente leitura, por treinador)
+@cache_por_treinador
+def verificar_pagamentos(treinador_id, hoje=None):
+    hoje = hoje or datetime.now().date()
+    tres_dias_depois = (hoje + timedelta(days=3)).strftime("%Y-%m-%d")
+    hoje_str = hoje.strftime("%Y-%m-%d")
+    
+    # Pagamentos em aberto que vencem até daqui a 3 dias, incluindo os já vencidos.
+    # Um pagamento vencido continua na lista mesmo antes do agendador marcá-lo como Atrasado.
+    with leitura() as conn:
+        c = conn.execute('''
+        SELECT p.id, p.data_vencimento, p.valor_centavos, a.nome, a.email, a.telefone,
+               strftime('%d/%m/%Y', p.data_vencimento) AS vencimento,
+               CAST(julianday(:hoje) - julianday(p.data_vencimento) AS INTEGER) AS dias_atraso
+        FROM pagamentos p
+        JOIN alunos a ON p.aluno_id = a.id
+        WHERE a.treinador_id = :treinador_id
+          AND p.status IN ('Pendente', 'Atrasado')
+          AND p.data_vencimento <= :tres_dias
+        ORDER BY p.data_vencimento, a.nome
+        ''', {"treinador_id": treinador_id, "hoje": hoje_str, "tres_dias": tres_dias_depois})
+        
+        pagamentos = [dict(row) for row in c.fetchall()]
+    
+    return {
+        "tres_dias": [p for p in pagamentos if p['data_vencimento'] == tres_dias_depois],
+        "hoje": [p for p in pagamentos if p['data_vencimento'] == hoje_str],
+        "atrasados": [p for p in pagamentos if p['data_vencimento'] < hoje_str]
+    }
+
+# Transição de status Pendente -> Atrasado, executada em segundo plano e fora dos reruns.
+# Intervalo em segundos; 0 executa uma vez a cada virada de dia.
+INTERVALO_ATRASOS_S = int(os.environ.get('ACADEMIA_INTERVALO_ATRASOS_S', '0'))
+LOTE_ATRASOS = 500
+
+def atualizar_pagamentos_atrasados(hoje=None, treinador_id=None):
+    hoje_str = (hoje or datetime.now().date()).strftime("%Y-%m-%d")
+    
+    # Atualizar em lotes pequenos, cada um em sua própria transação, para não segurar
+    # o lock de escrita. Pode ser executada várias vezes: só altera o que ainda está Pendente.
+    # Com treinador_id, apenas os pagamentos dos alunos desse treinador.
+    total = 0
+    while True:
+        with conexao() as conn:
+            c = conn.execute('''
+            UPDATE pagamentos SET status = 'Atrasado'
+            WHERE id IN (
+                SELECT id FROM pagamentos
+                WHERE status = 'Pendente' AND data_vencimento < :hoje
+                  AND (:treinador_id IS NULL
+                       OR aluno_id IN (SELECT id FROM alunos WHERE treinador_id = :treinador_id))
+                LIMIT :lote
+            )
+            ''', {"hoje": hoje_str, "treinador_id": treinador_id, "lote": LOTE_ATRASOS})
+        total += c.rowcount
+        if c.rowcount < LOTE_ATRASOS:
+            return total
+
+def _segundos_ate_proxima_verificacao(agora):
+    if INTERVALO_ATRASOS_S > 0:
+        return INTERVALO_ATRASOS_S
+    meia_noite = datetime.combine(agora.date() + timedelta(days=1), datetime.min.time())
+    return (meia_noite - agora).total_seconds() + 1
+
+def executar_agendador_atrasos(parar, bancos=None):
+    # bancos: função que retorna os bancos a atualizar a cada execução (um por treinador, ver
+    # academia.shards); sem ela, apenas o banco atual
+    while not parar.is_set():
+        for banco in bancos() if bancos else [banco_atual()]:
+            try:
+                with usando(banco):
+                    atualizar_pagamentos_atrasados()
+            except sqlite3.Error:
+                # Tentar novamente na próxima execução
+                logging.getLogger(__name__).exception("Erro ao atualizar pagamentos atrasados")
+        parar.wait(_segundos_ate_proxima_verificacao(datetime.now()))
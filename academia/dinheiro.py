@@ -0,0 +1,38 @@
+import re
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+
+# Valores em dinheiro são guardados e somados em centavos inteiros (INTEGER no banco, int no Python,
+# int64 no pandas). Reais só aparecem na entrada (formulários, planilhas, extratos), convertidos aqui
+# uma única vez, e na exibição.
+
+def para_centavos(valor):
+    # Reais (número ou texto com ponto decimal) para centavos, com meio centavo arredondado para cima;
+    # o número passa por str() para que 0.1 + 0.2 vire 30 centavos, e não 30.000000000000004
+    try:
+        return int((Decimal(str(valor)) * 100).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+    except InvalidOperation:
+        raise ValueError(f"valor inválido: {valor}") from None
+
+def centavos_de_texto(texto):
+    # Regra única para valores digitados, de planilhas e de extratos (importação e conciliação).
+    # Aceita 150, 150.00, 150,00, 1.500, 1.234,56, -150,00 e R$ 150,00. Sem vírgula, pontos seguidos
+    # de exatamente três dígitos são separadores de milhar (1.500 e 1.234.567 são reais inteiros);
+    # com vírgula, a vírgula é a casa decimal
+    texto = str(texto).replace("R$", "").replace(" ", "").strip()
+    if "," in texto or re.fullmatch(r"-?\d{1,3}(?:\.\d{3})+", texto):
+        texto = texto.replace(".", "").replace(",", ".")
+    return para_centavos(texto)
+
+def para_reais(centavos):
+    # Apenas para exibição (gráficos e campos numéricos de formulário); totais são somados em centavos
+    return centavos / 100
+
+def formatar_valor(centavos):
+    # 123456 -> "1.234,56"
+    sinal = "-" if centavos < 0 else ""
+    reais, resto = divmod(abs(int(centavos)), 100)
+    return f"{sinal}{reais:,}".replace(",", ".") + f",{resto:02d}"
+
+def formatar_reais(centavos):
+    # 123456 -> "R$ 1.234,56"
+    return "R$ " + formatar_valor(centavos)
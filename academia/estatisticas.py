@@ -0,0 +1,73 @@
+import argparse
+from datetime import datetime
+
+from academia.banco import (DB_PATH, SQL_ESTATISTICAS_TREINADORES, SQL_PAGAMENTO_ATUAL, conexao, init_db,
+                            leitura)
+
+# Todos inteiros (valores em centavos): a comparação é exata
+COLUNAS = ["total_alunos", "com_pagamento", "pendentes", "atrasados", "pagos", "receita_mensal_centavos",
+           "receita_recebida_centavos"]
+
+def verificar_estatisticas(caminho=None):
+    # Recalcula os contadores de todos os treinadores e retorna as diferenças para treinador_stats
+    with leitura(caminho) as conn:
+        esperado = {row['treinador_id']: dict(row) for row in conn.execute(SQL_ESTATISTICAS_TREINADORES)}
+        atual = {row['treinador_id']: dict(row) for row in conn.execute('SELECT * FROM treinador_stats')}
+
+    vazio = {coluna: 0 for coluna in COLUNAS}
+    divergencias = []
+    for treinador_id in sorted(esperado.keys() | atual.keys()):
+        for coluna in COLUNAS:
+            valor_esperado = esperado.get(treinador_id, vazio)[coluna]
+            valor_atual = atual.get(treinador_id, vazio)[coluna]
+            if valor_esperado != valor_atual:
+                divergencias.append({"treinador_id": treinador_id, "coluna": coluna,
+                                     "esperado": valor_esperado, "atual": valor_atual})
+    return divergencias
+
+def verificar_pagamentos_atuais(caminho=None):
+    # Alunos cujo ponteiro atual_pagamento_id não aponta para o último pagamento
+    with leitura(caminho) as conn:
+        c = conn.execute('''
+        SELECT a.id AS aluno_id, a.atual_pagamento_id AS atual,
+               (SELECT p.id FROM pagamentos p WHERE p.aluno_id = a.id
+                ORDER BY p.data_vencimento DESC LIMIT 1) AS esperado
+        FROM alunos a
+        WHERE a.atual_pagamento_id IS NOT (SELECT p.id FROM pagamentos p WHERE p.aluno_id = a.id
+                                           ORDER BY p.data_vencimento DESC LIMIT 1)
+        ''')
+        return [dict(row) for row in c.fetchall()]
+
+def recalcular(caminho=None):
+    # Reconstrói os ponteiros de último pagamento e os contadores a partir das tabelas base
+    with conexao(caminho) as conn:
+        conn.execute('BEGIN IMMEDIATE')
+        conn.execute(SQL_PAGAMENTO_ATUAL)
+        conn.execute('DELETE FROM treinador_stats')
+        conn.execute('INSERT INTO treinador_stats ' + SQL_ESTATISTICAS_TREINADORES)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Verifica os contadores por treinador e os ponteiros de último pagamento.")
+    parser.add_argument("--corrigir", action="store_true", help="recalcular tudo se houver divergências")
+    parser.add_argument("--banco", default=DB_PATH, help="caminho do banco de dados")
+    args = parser.parse_args(argv)
+
+    init_db(args.banco)
+    inicio = datetime.now()
+    divergencias = verificar_estatisticas(args.banco)
+    ponteiros = verificar_pagamentos_atuais(args.banco)
+    duracao = (datetime.now() - inicio).total_seconds()
+
+    for d in divergencias:
+        print(f"treinador {d['treinador_id']}: {d['coluna']} = {d['atual']} (esperado {d['esperado']})")
+    for p in ponteiros:
+        print(f"aluno {p['aluno_id']}: último pagamento {p['atual']} (esperado {p['esperado']})")
+    print(f"{len(divergencias)} contadores e {len(ponteiros)} ponteiros divergentes ({duracao:.2f}s)")
+
+    if (divergencias or ponteiros) and args.corrigir:
+        recalcular(args.banco)
+        print("contadores e ponteiros recalculados")
+    return 1 if (divergencias or ponteiros) and not args.corrigir else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
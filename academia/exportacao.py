@@ -0,0 +1,130 @@
+import argparse
+import csv
+import io
+from datetime import datetime
+
+from academia.banco import DB_PATH, init_db, leitura
+
+# Linhas lidas do cursor por vez
+TAMANHO_LOTE = 5000
+
+FORMATOS = ["csv", "parquet"]
+
+# Consultas e tipos (para o Parquet) de cada tabela exportada.
+# Os filtros de período e status se aplicam aos pagamentos. Os pagamentos são lidos a partir dos
+# alunos do treinador (busca no índice único por aluno e vencimento, já na ordem do arquivo), sem
+# percorrer os pagamentos dos outros treinadores.
+TABELAS = {
+    "alunos": {
+        "sql": '''
+        SELECT id, nome, email, telefone, data_inicio, data_pagamento, dia_vencimento,
+               mensalidade_centavos, treinador_id
+        FROM alunos
+        WHERE treinador_id = :treinador_id
+        ORDER BY id
+        ''',
+        "tipos": {"id": "int64", "nome": "string", "email": "string", "telefone": "string",
+                  "data_inicio": "string", "data_pagamento": "string", "dia_vencimento": "int64",
+                  "mensalidade_centavos": "int64", "treinador_id": "int64"},
+    },
+    "pagamentos": {
+        "sql": '''
+        SELECT p.id, p.aluno_id, a.nome AS aluno_nome, p.data_vencimento, p.data_pagamento,
+               p.valor_centavos, p.status
+        FROM pagamentos p
+        JOIN alunos a ON a.id = p.aluno_id
+        WHERE p.aluno_id IN (SELECT id FROM alunos WHERE treinador_id = :treinador_id)
+          AND (:inicio IS NULL OR p.data_vencimento >= :inicio)
+          AND (:fim IS NULL OR p.data_vencimento <= :fim)
+          AND (:status IS NULL OR p.status = :status)
+        ORDER BY p.aluno_id, p.data_vencimento
+        ''',
+        "tipos": {"id": "int64", "aluno_id": "int64", "aluno_nome": "string", "data_vencimento": "string",
+                  "data_pagamento": "string", "valor_centavos": "int64", "status": "string"},
+    },
+}
+
+def iterar_lotes(treinador_id, tabela, inicio=None, fim=None, status=None, tamanho_lote=TAMANHO_LOTE,
+                 caminho=None):
+    # Gera (colunas, linhas) em lotes de tamanho fixo, sem carregar o resultado inteiro na memória
+    with leitura(caminho) as conn:
+        c = conn.execute(TABELAS[tabela]["sql"], {"treinador_id": treinador_id, "inicio": inicio,
+                                                  "fim": fim, "status": status})
+        colunas = [d[0] for d in c.description]
+        # O primeiro lote é gerado mesmo vazio, para que o arquivo tenha o cabeçalho
+        linhas = c.fetchmany(tamanho_lote)
+        yield colunas, linhas
+        while linhas:
+            linhas = c.fetchmany(tamanho_lote)
+            if linhas:
+                yield colunas, linhas
+
+def _exportar_csv(lotes, destino):
+    texto = io.TextIOWrapper(destino, encoding="utf-8", newline="", write_through=True)
+    try:
+        escritor = csv.writer(texto)
+        total = 0
+        cabecalho = False
+        for colunas, linhas in lotes:
+            if not cabecalho:
+                escritor.writerow(colunas)
+                cabecalho = True
+            escritor.writerows(tuple(linha) for linha in linhas)
+            total += len(linhas)
+        return total
+    finally:
+        # Não fechar o destino, que pertence a quem chamou
+        texto.detach()
+
+def _exportar_parquet(lotes, destino, tipos):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("A exportação em Parquet requer o pacote pyarrow.")
+
+    esquema = pa.schema([(nome, getattr(pa, tipo)()) for nome, tipo in tipos.items()])
+    total = 0
+    with pq.ParquetWriter(destino, esquema) as escritor:
+        for colunas, linhas in lotes:
+            # Um row group por lote
+            arrays = [pa.array([linha[i] for linha in linhas], type=esquema.field(nome).type)
+                      for i, nome in enumerate(colunas)]
+            escritor.write_batch(pa.record_batch(arrays, schema=esquema))
+            total += len(linhas)
+    return total
+
+def exportar(treinador_id, tabela, formato, destino, inicio=None, fim=None, status=None,
+             tamanho_lote=TAMANHO_LOTE, caminho=None):
+    # destino é um arquivo binário aberto para escrita; retorna o número de linhas exportadas
+    if tabela not in TABELAS:
+        raise ValueError(f"Tabela desconhecida: {tabela}")
+    lotes = iterar_lotes(treinador_id, tabela, inicio, fim, status, tamanho_lote, caminho)
+    if formato == "csv":
+        return _exportar_csv(lotes, destino)
+    if formato == "parquet":
+        return _exportar_parquet(lotes, destino, TABELAS[tabela]["tipos"])
+    raise ValueError(f"Formato desconhecido: {formato}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Exporta os alunos ou pagamentos de um treinador.")
+    parser.add_argument("--treinador", type=int, required=True)
+    parser.add_argument("--tabela", choices=list(TABELAS), default="pagamentos")
+    parser.add_argument("--formato", choices=FORMATOS, default="csv")
+    parser.add_argument("--saida", required=True, help="arquivo de saída")
+    parser.add_argument("--inicio", help="vencimentos a partir de AAAA-MM-DD")
+    parser.add_argument("--fim", help="vencimentos até AAAA-MM-DD")
+    parser.add_argument("--status", help="apenas pagamentos com este status")
+    parser.add_argument("--banco", default=DB_PATH, help="caminho do banco de dados")
+    args = parser.parse_args(argv)
+
+    init_db(args.banco)
+    inicio = datetime.now()
+    with open(args.saida, "wb") as destino:
+        total = exportar(args.treinador, args.tabela, args.formato, destino, args.inicio, args.fim,
+                         args.status, caminho=args.banco)
+    duracao = (datetime.now() - inicio).total_seconds()
+    print(f"{total} linhas exportadas para {args.saida} em {duracao:.2f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+import argparse
+import calendar
+from datetime import date, datetime
+
+from academia.banco import DB_PATH, conexao, init_db
+
+# Quantidade máxima de meses gerados de uma vez para um mesmo aluno
+MAX_MESES_RETROATIVOS = 24
+
+def vencimento_no_mes(ano, mes, dia_vencimento):
+    # Usar o menor valor entre o dia de vencimento e o último dia do mês (ex: dia 31 em fevereiro)
+    dia = min(dia_vencimento, calendar.monthrange(ano, mes)[1])
+    return date(ano, mes, dia)
+
+def somar_meses(ano, mes, meses):
+    total = ano * 12 + (mes - 1) + meses
+    return total // 12, total % 12 + 1
+
+def proximo_vencimento(data_vencimento, dia_vencimento=None):
+    # Mês seguinte ao vencimento informado, mantendo o dia fixo do aluno
+    data = datetime.strptime(data_vencimento, "%Y-%m-%d").date()
+    ano, mes = somar_meses(data.year, data.month, 1)
+    return vencimento_no_mes(ano, mes, dia_vencimento or data.day)
+
+def vencimentos_pendentes(ultimo_vencimento, dia_vencimento, ate, max_meses=MAX_MESES_RETROATIVOS):
+    # Vencimentos dos meses seguintes ao último já gerado, até o mês de referência (inclusive)
+    ultimo = datetime.strptime(ultimo_vencimento, "%Y-%m-%d").date()
+    meses = (ate.year - ultimo.year) * 12 + (ate.month - ultimo.month)
+    vencimentos = []
+    for i in range(max(meses - max_meses, 0) + 1, meses + 1):
+        ano, mes = somar_meses(ultimo.year, ultimo.month, i)
+        vencimentos.append(vencimento_no_mes(ano, mes, dia_vencimento).strftime("%Y-%m-%d"))
+    return vencimentos
+
+def mes_seguinte(hoje=None):
+    hoje = hoje or datetime.now().date()
+    ano, mes = somar_meses(hoje.year, hoje.month, 1)
+    return date(ano, mes, 1)
+
+def gerar_cobrancas(treinador_id=None, ate=None, caminho=None, max_meses=MAX_MESES_RETROATIVOS):
+    # Gera, em uma única transação, os pagamentos de todos os alunos (de um treinador ou de todos)
+    # até o mês de referência `ate` (padrão: próximo mês), incluindo meses que ficaram para trás.
+    # Pode ser executada várias vezes: a restrição única (aluno_id, data_vencimento) impede duplicatas.
+    ate = ate or mes_seguinte()
+
+    with conexao(caminho) as conn:
+        conn.execute('BEGIN IMMEDIATE')
+        c = conn.execute('''
+        SELECT a.id, a.dia_vencimento, a.data_pagamento, a.mensalidade_centavos,
+               MAX(p.data_vencimento) AS ultimo_vencimento
+        FROM alunos a
+        LEFT JOIN pagamentos p ON p.aluno_id = a.id
+        WHERE :treinador_id IS NULL OR a.treinador_id = :treinador_id
+        GROUP BY a.id
+        ''', {"treinador_id": treinador_id})
+
+        novos = []
+        for aluno_id, dia_vencimento, data_pagamento, valor_centavos, ultimo_vencimento in c:
+            if ultimo_vencimento is None:
+                # Aluno sem nenhum pagamento: o primeiro vencimento é a data informada no cadastro
+                primeiro = datetime.strptime(data_pagamento, "%Y-%m-%d").date()
+                if (primeiro.year, primeiro.month) > (ate.year, ate.month):
+                    continue
+                novos.append((data_pagamento, valor_centavos, aluno_id))
+                ultimo_vencimento = data_pagamento
+            dia = dia_vencimento or int(ultimo_vencimento[8:10])
+            for vencimento in vencimentos_pendentes(ultimo_vencimento, dia, ate, max_meses):
+                novos.append((vencimento, valor_centavos, aluno_id))
+
+        c = conn.executemany('''
+        INSERT INTO pagamentos (data_vencimento, data_pagamento, valor_centavos, status, aluno_id)
+        VALUES (?, NULL, ?, 'Pendente', ?)
+        ON CONFLICT (aluno_id, data_vencimento) DO NOTHING
+        ''', novos)
+        criados = c.rowcount
+
+    return criados
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gera os pagamentos mensais de todos os alunos em lote.")
+    parser.add_argument("--treinador", type=int, help="gerar apenas para os alunos deste treinador")
+    parser.add_argument("--ate", help="mês de referência AAAA-MM (padrão: próximo mês)")
+    parser.add_argument("--meses", type=int, default=MAX_MESES_RETROATIVOS,
+                        help="máximo de meses retroativos por aluno")
+    parser.add_argument("--banco", default=DB_PATH, help="caminho do banco de dados")
+    args = parser.parse_args(argv)
+
+    ate = datetime.strptime(args.ate, "%Y-%m").date() if args.ate else None
+
+    init_db(args.banco)
+    inicio = datetime.now()
+    criados = gerar_cobrancas(args.treinador, ate, args.banco, args.meses)
+    duracao = (datetime.now() - inicio).total_seconds()
+    print(f"{criados} pagamentos criados em {duracao:.2f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+import argparse
+import os
+from datetime import datetime
+
+import pandas as pd
+
+from academia.banco import DB_PATH, conexao, init_db
+from academia.dinheiro import centavos_de_texto
+
+# Linhas processadas por transação
+TAMANHO_LOTE = 5000
+
+COLUNAS = ["nome", "email", "telefone", "data_vencimento", "valor_mensalidade"]
+STATUS_VALIDOS = ["Pendente", "Pago", "Atrasado"]
+
+def _lotes_csv(arquivo, tamanho_lote, separador):
+    yield from pd.read_csv(arquivo, dtype=str, keep_default_na=False, chunksize=tamanho_lote,
+                           sep=separador, encoding="utf-8-sig")
+
+def _lotes_xlsx(arquivo, tamanho_lote):
+    try:
+        import openpyxl
+    except ImportError:
+        raise RuntimeError("A importação de arquivos XLSX requer o pacote openpyxl.")
+
+    # Leitura em modo read_only, linha a linha, para manter a memória limitada
+    planilha = openpyxl.load_workbook(arquivo, read_only=True, data_only=True)
+    try:
+        linhas = planilha.active.iter_rows(values_only=True)
+        cabecalho = [str(c).strip() if c is not None else "" for c in next(linhas, [])]
+        lote = []
+        for linha in linhas:
+            lote.append(["" if v is None else v for v in linha])
+            if len(lote) == tamanho_lote:
+                yield pd.DataFrame(lote, columns=cabecalho)
+                lote = []
+        if lote:
+            yield pd.DataFrame(lote, columns=cabecalho)
+    finally:
+        planilha.close()
+
+def ler_lotes(arquivo, nome_arquivo=None, tamanho_lote=TAMANHO_LOTE, separador=","):
+    # arquivo pode ser um caminho ou um objeto de arquivo (ex: upload do Streamlit)
+    nome_arquivo = nome_arquivo or getattr(arquivo, "name", None) or str(arquivo)
+    if nome_arquivo.lower().endswith((".xlsx", ".xlsm")):
+        return _lotes_xlsx(arquivo, tamanho_lote)
+    return _lotes_csv(arquivo, tamanho_lote, separador)
+
+def _converter_datas(coluna):
+    # Aceita AAAA-MM-DD ou DD/MM/AAAA (também valores de data vindos do XLSX)
+    texto = coluna.astype(str).str.strip().str.slice(0, 10)
+    datas = pd.to_datetime(texto, format="%Y-%m-%d", errors="coerce")
+    return datas.fillna(pd.to_datetime(texto, format="%d/%m/%Y", errors="coerce"))
+
+def _centavos_ou_zero(texto):
+    try:
+        return centavos_de_texto(texto)
+    except ValueError:
+        return 0
+
+def _converter_valores(coluna):
+    # Centavos (int64) pela mesma regra da conciliação (academia.dinheiro.centavos_de_texto), sem
+    # passar por float; cada valor distinto é convertido uma vez (mensalidades se repetem muito).
+    # Valores inválidos ficam 0 e, como os negativos, são rejeitados na validação.
+    texto = coluna.astype(str)
+    return texto.map({valor: _centavos_ou_zero(valor) for valor in texto.unique()}).astype("int64")
+
+def validar_lote(lote, primeira_linha):
+    # Retorna (linhas válidas já convertidas, lista de erros por linha)
+    lote = lote.rename(columns=lambda c: str(c).strip().lower())
+    faltando = [c for c in COLUNAS if c not in lote.columns]
+    if faltando:
+        raise ValueError(f"Colunas obrigatórias ausentes: {', '.join(faltando)}")
+
+    dados = pd.DataFrame({
+        "linha": range(primeira_linha, primeira_linha + len(lote)),
+        "nome": lote["nome"].astype(str).str.strip(),
+        "email": lote["email"].astype(str).str.strip(),
+        "telefone": lote["telefone"].astype(str).str.strip(),
+        "data_vencimento": _converter_datas(lote["data_vencimento"]),
+        "mensalidade_centavos": _converter_valores(lote["valor_mensalidade"]),
+    })
+    if "status" in lote.columns:
+        status = lote["status"].astype(str).str.strip().str.capitalize()
+        dados["status"] = status.where(status != "", "Pendente").values
+    else:
+        dados["status"] = "Pendente"
+
+    regras = [
+        (dados["nome"] == "", "nome vazio"),
+        (dados["email"] == "", "email vazio"),
+        (dados["telefone"] == "", "telefone vazio"),
+        (dados["data_vencimento"].isna(), "data de vencimento inválida"),
+        (dados["mensalidade_centavos"] <= 0, "valor da mensalidade inválido"),
+        (~dados["status"].isin(STATUS_VALIDOS), "status inválido"),
+    ]
+    invalidas = pd.Series(False, index=dados.index)
+    erros = []
+    for mascara, mensagem in regras:
+        novas = mascara & ~invalidas
+        erros.extend({"linha": int(linha), "erro": mensagem} for linha in dados.loc[novas, "linha"])
+        invalidas |= mascara
+
+    validas = dados[~invalidas].copy()
+    # Dia fixo de vencimento mensal, derivado da primeira data de vencimento
+    validas["dia_vencimento"] = validas["data_vencimento"].dt.day
+    validas["data_vencimento"] = validas["data_vencimento"].dt.strftime("%Y-%m-%d")
+    return validas, sorted(erros, key=lambda e: e["linha"])
+
+def inserir_lote(validas, treinador_id, caminho=None):
+    if validas.empty:
+        return 0
+
+    hoje = datetime.now().strftime("%Y-%m-%d")
+    with conexao(caminho) as conn:
+        # Os ids são reservados sob o lock de escrita para inserir os pagamentos sem reler os alunos
+        conn.execute("BEGIN IMMEDIATE")
+        proximo_id = conn.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM alunos").fetchone()[0]
+        ids = range(proximo_id, proximo_id + len(validas))
+
+        conn.executemany('''
+        INSERT INTO alunos (id, nome, email, telefone, data_inicio, data_pagamento, dia_vencimento,
+                            mensalidade_centavos, treinador_id)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', zip(ids, validas["nome"], validas["email"], validas["telefone"], [hoje] * len(validas),
+                 validas["data_vencimento"], validas["dia_vencimento"].astype(int).tolist(),
+                 validas["mensalidade_centavos"].tolist(), [treinador_id] * len(validas)))
+
+        # Primeiro pagamento de cada aluno com o status informado
+        conn.executemany('''
+        INSERT INTO pagamentos (data_vencimento, data_pagamento, valor_centavos, status, aluno_id)
+        VALUES (?, ?, ?, ?, ?)
+        ''', zip(validas["data_vencimento"],
+                 [hoje if s == "Pago" else None for s in validas["status"]],
+                 validas["mensalidade_centavos"].tolist(), validas["status"], ids))
+    return len(validas)
+
+def importar_alunos(arquivo, treinador_id, nome_arquivo=None, caminho=None, tamanho_lote=TAMANHO_LOTE,
+                    separador=",", progresso=None):
+    # Importa o arquivo em lotes; linhas inválidas são relatadas sem interromper a importação
+    importados = 0
+    erros = []
+    primeira_linha = 2  # a linha 1 é o cabeçalho
+    for lote in ler_lotes(arquivo, nome_arquivo, tamanho_lote, separador):
+        validas, erros_lote = validar_lote(lote, primeira_linha)
+        importados += inserir_lote(validas, treinador_id, caminho)
+        erros.extend(erros_lote)
+        primeira_linha += len(lote)
+        if progresso:
+            progresso(primeira_linha - 2, importados)
+    return {"importados": importados, "erros": erros}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Importa alunos de um arquivo CSV ou XLSX.")
+    parser.add_argument("arquivo", help=f"arquivo com as colunas {', '.join(COLUNAS)} e, opcionalmente, status")
+    parser.add_argument("--treinador", type=int, required=True, help="treinador dono dos alunos importados")
+    parser.add_argument("--lote", type=int, default=TAMANHO_LOTE, help="linhas por transação")
+    parser.add_argument("--separador", default=",", help="separador de colunas do CSV")
+    parser.add_argument("--banco", default=DB_PATH, help="caminho do banco de dados")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.arquivo):
+        parser.error(f"arquivo não encontrado: {args.arquivo}")
+
+    init_db(args.banco)
+    inicio = datetime.now()
+    resultado = importar_alunos(args.arquivo, args.treinador, caminho=args.banco, tamanho_lote=args.lote,
+                                separador=args.separador)
+    duracao = (datetime.now() - inicio).total_seconds()
+    for erro in resultado["erros"]:
+        print(f"linha {erro['linha']}: {erro['erro']}")
+    print(f"{resultado['importados']} alunos importados em {duracao:.2f}s, {len(resultado['erros'])} linhas com erro")
+
+if __name__ == "__main__":
+    main()
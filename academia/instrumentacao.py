@@ -0,0 +1,136 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+# Arquivo JSON lines onde cada execução registrada é gravada (vazio: não exportar)
+PERFIL_JSONL = os.environ.get('ACADEMIA_PERFIL_JSONL', '')
+
+# Registro da execução atual, um por thread (cada rerun do Streamlit roda em sua própria thread)
+_local = threading.local()
+
+class RegistroExecucao:
+    def __init__(self, pagina):
+        self.pagina = pagina
+        self.inicio = datetime.now()
+        self.duracao_ms = None
+        self.comandos = []
+        self._inicio = time.perf_counter()
+
+    def adicionar(self, sql, duracao_ms, linhas):
+        entrada = {"sql": " ".join(sql.split()), "duracao_ms": duracao_ms, "linhas": linhas}
+        self.comandos.append(entrada)
+        return entrada
+
+    def finalizar(self):
+        self.duracao_ms = (time.perf_counter() - self._inicio) * 1000
+
+    @property
+    def duracao_sql_ms(self):
+        return sum(c["duracao_ms"] for c in self.comandos)
+
+    def resumo(self):
+        # Comandos agrupados pelo texto do SQL, do mais demorado para o mais rápido
+        grupos = {}
+        for comando in self.comandos:
+            grupo = grupos.setdefault(comando["sql"], {"sql": comando["sql"], "execucoes": 0,
+                                                       "duracao_ms": 0.0, "linhas": 0})
+            grupo["execucoes"] += 1
+            grupo["duracao_ms"] += comando["duracao_ms"]
+            grupo["linhas"] += comando["linhas"]
+        return sorted(grupos.values(), key=lambda g: g["duracao_ms"], reverse=True)
+
+    def como_dict(self):
+        return {
+            "pagina": self.pagina,
+            "inicio": self.inicio.isoformat(timespec="milliseconds"),
+            "duracao_ms": self.duracao_ms,
+            "duracao_sql_ms": self.duracao_sql_ms,
+            "total_comandos": len(self.comandos),
+            "comandos": self.comandos,
+        }
+
+    def como_jsonl(self):
+        return json.dumps(self.como_dict(), ensure_ascii=False) + "\n"
+
+def registro_atual():
+    return getattr(_local, "registro", None)
+
+@contextmanager
+def registrar_execucao(pagina, arquivo=None):
+    # Registra todos os comandos SQL executados nesta thread durante o bloco
+    registro = RegistroExecucao(pagina)
+    anterior = registro_atual()
+    _local.registro = registro
+    try:
+        yield registro
+    finally:
+        _local.registro = anterior
+        registro.finalizar()
+        arquivo = arquivo or PERFIL_JSONL
+        if arquivo:
+            with open(arquivo, "a", encoding="utf-8") as saida:
+                saida.write(registro.como_jsonl())
+
+# Cursor e conexão que medem cada comando quando há um registro ativo na thread.
+# Sem registro ativo, apenas repassam a chamada.
+class CursorInstrumentado(sqlite3.Cursor):
+    _entrada = None
+
+    def _executar(self, executar, sql, parametros):
+        registro = registro_atual()
+        if registro is None:
+            self._entrada = None
+            return executar(sql, parametros)
+        inicio = time.perf_counter()
+        try:
+            return executar(sql, parametros)
+        finally:
+            self._entrada = registro.adicionar(sql, (time.perf_counter() - inicio) * 1000,
+                                               max(self.rowcount, 0))
+
+    def execute(self, sql, parametros=()):
+        return self._executar(super().execute, sql, parametros)
+
+    def executemany(self, sql, parametros):
+        return self._executar(super().executemany, sql, parametros)
+
+    def _ler(self, ler, *args):
+        entrada = self._entrada
+        if entrada is None:
+            return ler(*args)
+        inicio = time.perf_counter()
+        resultado = ler(*args)
+        entrada["duracao_ms"] += (time.perf_counter() - inicio) * 1000
+        if isinstance(resultado, list):
+            entrada["linhas"] += len(resultado)
+        elif resultado is not None:
+            entrada["linhas"] += 1
+        return resultado
+
+    def fetchone(self):
+        return self._ler(super().fetchone)
+
+    def fetchmany(self, size=None):
+        return self._ler(super().fetchmany, size if size is not None else self.arraysize)
+
+    def fetchall(self):
+        return self._ler(super().fetchall)
+
+    def __next__(self):
+        if self._entrada is None:
+            return super().__next__()
+        return self._ler(super().__next__)
+
+class ConexaoInstrumentada(sqlite3.Connection):
+    def cursor(self, factory=CursorInstrumentado):
+        return super().cursor(factory)
+
+    def execute(self, sql, parametros=()):
+        return self.cursor().execute(sql, parametros)
+
+    def executemany(self, sql, parametros):
+        return self.cursor().executemany(sql, parametros)
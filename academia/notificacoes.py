@@ -0,0 +1,363 @@
+import argparse
+import asyncio
+import functools
+import json
+import logging
+import os
+import random
+import sqlite3
+import string
+import threading
+import time
+from datetime import datetime, timedelta
+
+from academia.banco import DB_PATH, banco_atual, cache_por_treinador, conexao, init_db, leitura, usar_banco
+from academia.dados import verificar_pagamentos
+from academia.dinheiro import formatar_valor
+
+# Transporte usado pelo despachante: "simulado" (apenas registra no log) ou "arquivo" (JSON lines)
+TRANSPORTE = os.environ.get('ACADEMIA_TRANSPORTE', 'simulado')
+ARQUIVO_ENVIOS = os.environ.get('ACADEMIA_ARQUIVO_ENVIOS', 'envios.jsonl')
+
+CANAIS = ["email", "whatsapp"]
+# Envios simultâneos (lotes em andamento ao mesmo tempo) e mensagens por lote
+CONCORRENCIA = int(os.environ.get('ACADEMIA_ENVIOS_CONCORRENCIA', '4'))
+LOTE_ENVIO = 50
+# Mensagens por segundo em cada canal
+LIMITES_POR_CANAL = {"email": 20, "whatsapp": 10}
+# Tentativas por mensagem e espera entre elas (dobra a cada falha, até o máximo)
+MAX_TENTATIVAS = 5
+ESPERA_BASE_S = 30
+ESPERA_MAXIMA_S = 3600
+# Reservas ("Enviando") mais antigas que isto são de um despachante interrompido e voltam para a fila
+RESERVA_EXPIRACAO_S = 900
+# Intervalo entre verificações da fila pelo despachante em segundo plano
+INTERVALO_ENVIOS_S = int(os.environ.get('ACADEMIA_INTERVALO_ENVIOS_S', '10'))
+
+# Sinaliza ao despachante que há mensagens novas na fila
+novas_mensagens = threading.Event()
+
+def _agora():
+    return datetime.now().isoformat(sep=" ", timespec="seconds")
+
+# Modelos de lembrete por tipo (chaves de verificar_pagamentos) e campos disponíveis, como em {nome}
+MODELOS_PADRAO = {
+    "tres_dias": "Olá {nome}, este é um lembrete de que sua mensalidade no valor de R$ {valor} vence em 3 dias ({vencimento}). Obrigado!",
+    "hoje": "Olá {nome}, sua mensalidade no valor de R$ {valor} vence hoje ({vencimento}). Por favor, realize o pagamento. Obrigado!",
+    "atrasados": "Olá {nome}, sua mensalidade no valor de R$ {valor} está atrasada há {dias_atraso} dias. Por favor, entre em contato para regularizar sua situação. Obrigado!",
+}
+CAMPOS_MODELO = ["nome", "valor", "vencimento", "dias_atraso", "email", "telefone"]
+
+@functools.lru_cache(maxsize=256)
+def compilar_modelo(texto):
+    # Separa o modelo em trechos fixos e campos uma única vez; ValueError se o modelo for inválido
+    try:
+        trechos = list(string.Formatter().parse(texto))
+    except ValueError:
+        raise ValueError("Modelo inválido: verifique se todas as chaves { } estão fechadas.")
+    partes = []
+    for literal, campo, formato, conversao in trechos:
+        if campo is not None and campo not in CAMPOS_MODELO:
+            raise ValueError(f"Campo inválido no modelo: {{{campo}}}. Use: "
+                             + ", ".join("{" + c + "}" for c in CAMPOS_MODELO))
+        if formato or conversao:
+            raise ValueError(f"Formatação não suportada no campo {{{campo}}}.")
+        partes.append((literal, campo))
+    return tuple(partes)
+
+def validar_modelo(texto):
+    # Retorna a mensagem de erro do modelo, ou None se ele for válido
+    try:
+        compilar_modelo(texto)
+    except ValueError as e:
+        return str(e)
+    return None
+
+@cache_por_treinador
+def obter_modelos(treinador_id):
+    with leitura() as conn:
+        c = conn.execute('SELECT tipo, texto FROM modelos_mensagem WHERE treinador_id = ?', (treinador_id,))
+        modelos = dict(MODELOS_PADRAO)
+        modelos.update({row['tipo']: row['texto'] for row in c.fetchall()})
+    return modelos
+
+def salvar_modelo(treinador_id, tipo, texto):
+    if tipo not in MODELOS_PADRAO:
+        raise ValueError(f"Tipo de mensagem desconhecido: {tipo}")
+    compilar_modelo(texto)
+    with conexao() as conn:
+        conn.execute('''
+        INSERT INTO modelos_mensagem (treinador_id, tipo, texto) VALUES (?, ?, ?)
+        ON CONFLICT (treinador_id, tipo) DO UPDATE SET texto = excluded.texto
+        ''', (treinador_id, tipo, texto))
+
+def renderizar_mensagens(texto, notificacoes):
+    # Gera as mensagens de todas as notificações com o mesmo modelo compilado.
+    # Campos ausentes ficam vazios; um modelo inválido (salvo antes da validação) usa o texto do próprio modelo.
+    try:
+        partes = compilar_modelo(texto)
+    except ValueError:
+        return [texto] * len(notificacoes)
+    mensagens = []
+    for notif in notificacoes:
+        campos = dict(notif)
+        campos['valor'] = formatar_valor(notif.get('valor_centavos') or 0)
+        mensagens.append("".join(literal + ("" if campo is None else str(campos.get(campo, "")))
+                                 for literal, campo in partes))
+    return mensagens
+
+def montar_mensagens(treinador_id, notificacoes):
+    # notificacoes: resultado de verificar_pagamentos; retorna as mensagens de cada tipo, na mesma ordem
+    modelos = obter_modelos(treinador_id)
+    return {tipo: renderizar_mensagens(modelos.get(tipo, MODELOS_PADRAO.get(tipo, "")), lista)
+            for tipo, lista in notificacoes.items()}
+
+def enfileirar(envios, caminho=None):
+    # envios: dicionários com treinador_id, pagamento_id, canal, destino, mensagem e referencia.
+    # Lembretes já enfileirados (mesmo pagamento, canal e referência) são ignorados.
+    agora = _agora()
+    with conexao(caminho) as conn:
+        c = conn.executemany('''
+        INSERT INTO envios (treinador_id, pagamento_id, canal, destino, mensagem, referencia,
+                            proxima_tentativa, criado_em)
+        VALUES (:treinador_id, :pagamento_id, :canal, :destino, :mensagem, :referencia, :agora, :agora)
+        ON CONFLICT (pagamento_id, canal, referencia) DO NOTHING
+        ''', [dict(envio, agora=agora) for envio in envios])
+        enfileirados = c.rowcount
+    if enfileirados:
+        novas_mensagens.set()
+    return enfileirados
+
+def envio_lembrete(treinador_id, notif, canal, mensagem, hoje=None):
+    hoje = hoje or datetime.now().date()
+    return {
+        "treinador_id": treinador_id,
+        "pagamento_id": notif['id'],
+        "canal": canal,
+        "destino": notif['email'] if canal == "email" else notif['telefone'],
+        "mensagem": mensagem,
+        "referencia": hoje.strftime("%Y-%m-%d"),
+    }
+
+def enfileirar_lembretes_do_dia(treinador_id, canais=("email",), hoje=None):
+    # Enfileira de uma vez os lembretes de todos os pagamentos de hoje, dos próximos 3 dias e atrasados
+    hoje = hoje or datetime.now().date()
+    notificacoes = verificar_pagamentos(treinador_id, hoje)
+    mensagens = montar_mensagens(treinador_id, notificacoes)
+    envios = [envio_lembrete(treinador_id, notif, canal, mensagem, hoje)
+              for tipo, lista in notificacoes.items()
+              for notif, mensagem in zip(lista, mensagens[tipo])
+              for canal in canais]
+    return enfileirar(envios)
+
+@cache_por_treinador
+def resumo_envios(treinador_id):
+    with leitura() as conn:
+        c = conn.execute('''
+        SELECT status, COUNT(*) AS total FROM envios WHERE treinador_id = ? GROUP BY status
+        ''', (treinador_id,))
+        return {row['status']: row['total'] for row in c.fetchall()}
+
+# Transportes: enviar(lote) recebe uma lista de envios do mesmo canal e retorna {id: erro},
+# com erro None para as mensagens enviadas. Uma exceção marca o lote inteiro como falho.
+class TransporteSimulado:
+    def __init__(self, atraso_s=0.0):
+        self.atraso_s = atraso_s
+
+    async def enviar(self, lote):
+        await asyncio.sleep(self.atraso_s)
+        for envio in lote:
+            logging.getLogger(__name__).info("Simulação: %s para %s", envio['canal'], envio['destino'])
+        return {envio['id']: None for envio in lote}
+
+class TransporteArquivo:
+    def __init__(self, caminho=ARQUIVO_ENVIOS):
+        self.caminho = caminho
+
+    def _gravar(self, linhas):
+        with open(self.caminho, "a", encoding="utf-8") as arquivo:
+            arquivo.write(linhas)
+
+    async def enviar(self, lote):
+        linhas = "".join(json.dumps({"id": envio['id'], "canal": envio['canal'], "destino": envio['destino'],
+                                     "mensagem": envio['mensagem'], "enviado_em": _agora()},
+                                    ensure_ascii=False) + "\n" for envio in lote)
+        await asyncio.to_thread(self._gravar, linhas)
+        return {envio['id']: None for envio in lote}
+
+def criar_transportes(tipo=TRANSPORTE, arquivo=ARQUIVO_ENVIOS):
+    if tipo == "arquivo":
+        transporte = TransporteArquivo(arquivo)
+    elif tipo == "simulado":
+        transporte = TransporteSimulado()
+    else:
+        raise ValueError(f"Transporte desconhecido: {tipo}")
+    return {canal: transporte for canal in CANAIS}
+
+class LimiteTaxa:
+    # Balde de fichas: no máximo `por_segundo` mensagens por segundo em média
+    def __init__(self, por_segundo):
+        self.por_segundo = por_segundo
+        self.fichas = por_segundo
+        self.atualizado = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def aguardar(self, quantidade):
+        async with self._lock:
+            capacidade = max(self.por_segundo, quantidade)
+            while True:
+                agora = time.monotonic()
+                self.fichas = min(capacidade, self.fichas + (agora - self.atualizado) * self.por_segundo)
+                self.atualizado = agora
+                if self.fichas >= quantidade:
+                    self.fichas -= quantidade
+                    return
+                await asyncio.sleep((quantidade - self.fichas) / self.por_segundo)
+
+def _reservar(limite, caminho=None):
+    # Marca como "Enviando" os próximos envios prontos para tentativa, para que não sejam reservados de novo
+    with conexao(caminho) as conn:
+        conn.execute('BEGIN IMMEDIATE')
+        c = conn.execute('''
+        SELECT id, canal, destino, mensagem, tentativas FROM envios
+        WHERE status = 'Pendente' AND proxima_tentativa <= ?
+        ORDER BY proxima_tentativa, id
+        LIMIT ?
+        ''', (_agora(), limite))
+        envios = [dict(row) for row in c.fetchall()]
+        agora = _agora()
+        conn.executemany("UPDATE envios SET status = 'Enviando', reservado_em = ? WHERE id = ?",
+                         [(agora, e['id']) for e in envios])
+    return envios
+
+def _espera_s(tentativas):
+    espera = min(ESPERA_MAXIMA_S, ESPERA_BASE_S * 2 ** (tentativas - 1))
+    return espera * random.uniform(0.5, 1.0)
+
+def _registrar_resultados(lote, erros, caminho=None):
+    agora = datetime.now()
+    enviados = []
+    falhas = []
+    for envio in lote:
+        erro = erros.get(envio['id'], "sem resposta do transporte")
+        tentativas = envio['tentativas'] + 1
+        if erro is None:
+            enviados.append((tentativas, agora.isoformat(sep=" ", timespec="seconds"), envio['id']))
+        else:
+            status = 'Falhou' if tentativas >= MAX_TENTATIVAS else 'Pendente'
+            proxima = (agora + timedelta(seconds=_espera_s(tentativas))).isoformat(sep=" ", timespec="seconds")
+            falhas.append((status, tentativas, proxima, str(erro), envio['id']))
+    with conexao(caminho) as conn:
+        conn.executemany('''
+        UPDATE envios SET status = 'Enviado', tentativas = ?, enviado_em = ?, erro = NULL WHERE id = ?
+        ''', enviados)
+        conn.executemany('''
+        UPDATE envios SET status = ?, tentativas = ?, proxima_tentativa = ?, erro = ? WHERE id = ?
+        ''', falhas)
+    return len(enviados), len(falhas)
+
+def liberar_reservas(caminho=None, expiracao_s=RESERVA_EXPIRACAO_S):
+    # Envios que ficaram como "Enviando" após uma interrupção voltam para a fila. Apenas reservas
+    # com mais de expiracao_s: as mais novas podem ser de outro despachante (outro processo ou
+    # worker do Streamlit) ainda enviando, e seriam enviadas duas vezes
+    limite = (datetime.now() - timedelta(seconds=expiracao_s)).isoformat(sep=" ", timespec="seconds")
+    with conexao(caminho) as conn:
+        return conn.execute('''
+        UPDATE envios SET status = 'Pendente', reservado_em = NULL
+        WHERE status = 'Enviando' AND (reservado_em IS NULL OR reservado_em <= ?)
+        ''', (limite,)).rowcount
+
+async def _no_banco(funcao, *args, caminho=None):
+    # As escritas na fila rodam fora do laço de eventos, exceto em uma conexão recebida de fora
+    # (ex: sqlite3.connect(':memory:') em testes), que o sqlite3 só deixa usar na thread que a criou
+    if isinstance(caminho or banco_atual(), sqlite3.Connection):
+        return funcao(*args, caminho=caminho)
+    return await asyncio.to_thread(funcao, *args, caminho=caminho)
+
+async def drenar_fila(transportes, concorrencia=CONCORRENCIA, lote=LOTE_ENVIO, limites=None, caminho=None):
+    # Envia tudo o que está pronto na fila, em lotes por canal, com no máximo `concorrencia` lotes
+    # simultâneos e respeitando o limite de mensagens por segundo de cada canal.
+    # Falhas voltam para a fila com espera crescente e são tentadas em uma próxima execução.
+    limites = limites or LIMITES_POR_CANAL
+    taxas = {canal: LimiteTaxa(limites.get(canal, LOTE_ENVIO)) for canal in transportes}
+    semaforo = asyncio.Semaphore(concorrencia)
+    totais = {"enviados": 0, "falhas": 0}
+
+    async def enviar_lote(canal, envios):
+        async with semaforo:
+            if canal not in transportes:
+                erros = {envio['id']: f"canal sem transporte: {canal}" for envio in envios}
+            else:
+                await taxas[canal].aguardar(len(envios))
+                try:
+                    erros = await transportes[canal].enviar(envios)
+                except Exception as e:
+                    erros = {envio['id']: str(e) for envio in envios}
+        enviados, falhas = await _no_banco(_registrar_resultados, envios, erros, caminho=caminho)
+        totais["enviados"] += enviados
+        totais["falhas"] += falhas
+
+    while True:
+        reservados = await _no_banco(_reservar, concorrencia * lote, caminho=caminho)
+        if not reservados:
+            return totais
+        por_canal = {}
+        for envio in reservados:
+            por_canal.setdefault(envio['canal'], []).append(envio)
+        await asyncio.gather(*(enviar_lote(canal, envios[i:i + lote])
+                               for canal, envios in por_canal.items()
+                               for i in range(0, len(envios), lote)))
+
+def executar_despachante(parar, transportes=None, caminho=None, bancos=None):
+    # Laço do despachante em segundo plano: drena a fila a cada INTERVALO_ENVIOS_S
+    # ou assim que novas mensagens são enfileiradas. bancos: função que retorna os bancos
+    # cujas filas são drenadas (um por treinador, ver academia.shards); sem ela, apenas um.
+    # Um erro (do banco, do transporte ou de um modelo) é registrado e a fila é tentada de novo,
+    # com espera crescente enquanto os erros se repetem; o laço só termina com `parar`
+    transportes = transportes or criar_transportes()
+    bancos = bancos or (lambda: [caminho or banco_atual()])
+    erros_seguidos = 0
+    while not parar.is_set():
+        novas_mensagens.clear()
+        erro = False
+        try:
+            for banco in bancos():
+                try:
+                    liberar_reservas(banco)
+                    asyncio.run(drenar_fila(transportes, caminho=banco))
+                except Exception:
+                    erro = True
+                    logging.getLogger(__name__).exception("Erro ao enviar mensagens da fila")
+        except Exception:
+            erro = True
+            logging.getLogger(__name__).exception("Erro ao listar os bancos do despachante")
+        erros_seguidos = erros_seguidos + 1 if erro else 0
+        if erros_seguidos:
+            parar.wait(min(ESPERA_MAXIMA_S, INTERVALO_ENVIOS_S * 2 ** erros_seguidos))
+        else:
+            novas_mensagens.wait(INTERVALO_ENVIOS_S)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Enfileira lembretes e envia as mensagens pendentes da fila.")
+    parser.add_argument("--lembretes", type=int, metavar="TREINADOR",
+                        help="enfileirar antes os lembretes de hoje deste treinador")
+    parser.add_argument("--canais", nargs="+", choices=CANAIS, default=["email"])
+    parser.add_argument("--transporte", choices=["simulado", "arquivo"], default=TRANSPORTE)
+    parser.add_argument("--saida", default=ARQUIVO_ENVIOS, help="arquivo do transporte 'arquivo'")
+    parser.add_argument("--concorrencia", type=int, default=CONCORRENCIA)
+    parser.add_argument("--banco", default=DB_PATH, help="caminho do banco de dados")
+    args = parser.parse_args(argv)
+
+    usar_banco(args.banco)
+    init_db()
+    if args.lembretes is not None:
+        print(f"{enfileirar_lembretes_do_dia(args.lembretes, args.canais)} lembretes enfileirados")
+
+    inicio = datetime.now()
+    liberar_reservas()
+    totais = asyncio.run(drenar_fila(criar_transportes(args.transporte, args.saida), args.concorrencia))
+    duracao = (datetime.now() - inicio).total_seconds()
+    print(f"{totais['enviados']} mensagens enviadas, {totais['falhas']} falhas em {duracao:.2f}s")
+
+if __name__ == "__main__":
+    main()
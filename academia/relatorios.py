@@ -0,0 +1,149 @@
+import argparse
+from datetime import datetime
+
+from academia.banco import DB_PATH, cache_por_treinador, conexao, init_db, leitura
+from academia.dados import FAIXAS_ATRASO
+from academia.dinheiro import formatar_reais
+from academia.faturamento import somar_meses
+
+# Meses exibidos por padrão no relatório de receita
+MESES_RELATORIO = 12
+
+def atualizar_resumo_mensal(caminho=None, treinador_id=None):
+    # Recalcula apenas os meses marcados como alterados pelos triggers de pagamentos
+    # (com treinador_id, apenas os desse treinador).
+    # Retorna a quantidade de meses (por treinador) recalculados.
+    filtro = {"treinador_id": treinador_id}
+    pendentes = "SELECT * FROM resumo_mensal_pendente WHERE :treinador_id IS NULL OR treinador_id = :treinador_id"
+    with leitura(caminho) as conn:
+        if conn.execute(f'{pendentes} LIMIT 1', filtro).fetchone() is None:
+            return 0
+
+    with conexao(caminho) as conn:
+        conn.execute('BEGIN IMMEDIATE')
+        meses = conn.execute(f'SELECT COUNT(*) FROM ({pendentes})', filtro).fetchone()[0]
+        conn.execute(f'''
+        DELETE FROM resumo_mensal
+        WHERE (treinador_id, mes) IN (SELECT treinador_id, mes FROM ({pendentes}))
+        ''', filtro)
+        conn.execute(f'''
+        INSERT INTO resumo_mensal (treinador_id, mes, cobrancas, valor_esperado_centavos, pagas,
+                                   valor_recebido_centavos, dias_atraso)
+        SELECT r.treinador_id, r.mes,
+               COUNT(*),
+               SUM(p.valor_centavos),
+               SUM(p.status = 'Pago'),
+               COALESCE(SUM(CASE WHEN p.status = 'Pago' THEN p.valor_centavos END), 0),
+               COALESCE(SUM(CASE WHEN p.status = 'Pago' AND p.data_pagamento IS NOT NULL
+                   THEN MAX(0, CAST(julianday(p.data_pagamento) - julianday(p.data_vencimento) AS INTEGER))
+               END), 0)
+        FROM ({pendentes}) r
+        JOIN alunos a ON a.treinador_id = r.treinador_id
+        JOIN pagamentos p ON p.aluno_id = a.id
+             AND p.data_vencimento BETWEEN r.mes || '-01' AND r.mes || '-31'
+        GROUP BY r.treinador_id, r.mes
+        ''', filtro)
+        conn.execute('DELETE FROM resumo_mensal_pendente WHERE :treinador_id IS NULL OR treinador_id = :treinador_id',
+                     filtro)
+    return meses
+
+def receita_mensal(treinador_id, meses=MESES_RELATORIO, hoje=None, caminho=None):
+    # Receita esperada e recebida (em centavos) dos últimos `meses` meses (pelo mês de vencimento), lida do resumo
+    hoje = hoje or datetime.now().date()
+    lista_meses = ["%04d-%02d" % somar_meses(hoje.year, hoje.month, -i) for i in range(meses - 1, -1, -1)]
+    with leitura(caminho) as conn:
+        c = conn.execute('''
+        SELECT mes, cobrancas, valor_esperado_centavos, pagas, valor_recebido_centavos, dias_atraso
+        FROM resumo_mensal
+        WHERE treinador_id = ? AND mes BETWEEN ? AND ?
+        ''', (treinador_id, lista_meses[0], lista_meses[-1]))
+        por_mes = {row['mes']: row for row in c.fetchall()}
+
+    resultado = []
+    for mes in lista_meses:
+        row = por_mes.get(mes)
+        esperado = row['valor_esperado_centavos'] if row else 0
+        recebido = row['valor_recebido_centavos'] if row else 0
+        pagas = row['pagas'] if row else 0
+        resultado.append({
+            "mes": mes,
+            "cobrancas": row['cobrancas'] if row else 0,
+            "valor_esperado_centavos": esperado,
+            "valor_recebido_centavos": recebido,
+            "taxa_recebimento": recebido / esperado if esperado else None,
+            "media_dias_atraso": row['dias_atraso'] / pagas if pagas else None,
+        })
+    return resultado
+
+def _faixas_vazias():
+    return {faixa: {"faixa": faixa, "quantidade": 0, "valor_centavos": 0} for faixa in FAIXAS_ATRASO}
+
+def atrasos_por_faixa(treinador_id=None, hoje=None, caminho=None):
+    # Pagamentos em aberto já vencidos, agrupados por treinador e faixa de dias de atraso
+    hoje = (hoje or datetime.now().date()).strftime("%Y-%m-%d")
+    with leitura(caminho) as conn:
+        c = conn.execute('''
+        SELECT treinador_id,
+               CASE WHEN dias <= 30 THEN '0-30'
+                    WHEN dias <= 60 THEN '31-60'
+                    WHEN dias <= 90 THEN '61-90'
+                    ELSE '90+' END AS faixa,
+               COUNT(*) AS quantidade,
+               SUM(valor_centavos) AS valor_centavos
+        FROM (
+            SELECT a.treinador_id, p.valor_centavos,
+                   CAST(julianday(:hoje) - julianday(p.data_vencimento) AS INTEGER) AS dias
+            FROM pagamentos p
+            JOIN alunos a ON a.id = p.aluno_id
+            WHERE p.status IN ('Pendente', 'Atrasado')
+              AND p.data_vencimento < :hoje
+              AND (:treinador_id IS NULL OR a.treinador_id = :treinador_id)
+        )
+        GROUP BY treinador_id, faixa
+        ''', {"hoje": hoje, "treinador_id": treinador_id})
+        linhas = c.fetchall()
+
+    # Todas as faixas presentes para cada treinador, mesmo sem atrasos
+    por_treinador = {}
+    for row in linhas:
+        faixas = por_treinador.setdefault(row['treinador_id'], _faixas_vazias())
+        faixas[row['faixa']].update(quantidade=row['quantidade'], valor_centavos=row['valor_centavos'])
+    if treinador_id is not None:
+        return list(por_treinador.get(treinador_id, _faixas_vazias()).values())
+    return {t: list(faixas.values()) for t, faixas in por_treinador.items()}
+
+@cache_por_treinador
+def obter_relatorio(treinador_id, meses=MESES_RELATORIO, hoje=None):
+    return {
+        "mensal": receita_mensal(treinador_id, meses, hoje),
+        "atrasos": atrasos_por_faixa(treinador_id, hoje),
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Atualiza o resumo mensal e mostra os atrasos por treinador.")
+    parser.add_argument("--treinador", type=int, help="mostrar a receita mensal deste treinador")
+    parser.add_argument("--meses", type=int, default=MESES_RELATORIO)
+    parser.add_argument("--banco", default=DB_PATH, help="caminho do banco de dados")
+    args = parser.parse_args(argv)
+
+    init_db(args.banco)
+    inicio = datetime.now()
+    meses = atualizar_resumo_mensal(args.banco)
+    duracao = (datetime.now() - inicio).total_seconds()
+    print(f"{meses} meses recalculados em {duracao:.2f}s")
+
+    if args.treinador is not None:
+        for linha in receita_mensal(args.treinador, args.meses, caminho=args.banco):
+            taxa = f"{linha['taxa_recebimento']:.0%}" if linha['taxa_recebimento'] is not None else "-"
+            print(f"{linha['mes']}  esperado {formatar_reais(linha['valor_esperado_centavos']):>16}  "
+                  f"recebido {formatar_reais(linha['valor_recebido_centavos']):>16}  taxa {taxa:>5}")
+
+    atrasos = atrasos_por_faixa(args.treinador, caminho=args.banco)
+    if args.treinador is not None:
+        atrasos = {args.treinador: atrasos}
+    for treinador_id, faixas in sorted(atrasos.items()):
+        texto = "  ".join(f"{f['faixa']}: {f['quantidade']}" for f in faixas)
+        print(f"treinador {treinador_id}  {texto}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+import functools
+import sqlite3
+
+from academia import conciliacao, dados, exportacao, faturamento, notificacoes, relatorios
+from academia.banco import init_db, usando
+
+def _no_banco(funcao):
+    # Executa a função de dados com o banco do repositório como banco atual
+    @functools.wraps(funcao)
+    def metodo(self, *args, **kwargs):
+        with usando(self.banco):
+            return funcao(*args, **kwargs)
+    return metodo
+
+class Repositorio:
+    # Acesso aos dados do sistema de cobrança a partir de um caminho de banco ou de uma conexão
+    # já aberta (ex: sqlite3.connect(':memory:') em testes), sem depender do Streamlit.
+    # O schema é criado ou atualizado na construção.
+    def __init__(self, banco):
+        if isinstance(banco, sqlite3.Connection):
+            banco.row_factory = sqlite3.Row
+        self.banco = banco
+        init_db(banco)
+
+    # Treinadores
+    register_user = _no_banco(dados.register_user)
+    authenticate_user = _no_banco(dados.authenticate_user)
+    obter_treinador = _no_banco(dados.obter_treinador)
+    atualizar_treinador = _no_banco(dados.atualizar_treinador)
+    sincronizar_treinador = _no_banco(dados.sincronizar_treinador)
+
+    # Alunos
+    adicionar_aluno = _no_banco(dados.adicionar_aluno)
+    adicionar_aluno_com_status = _no_banco(dados.adicionar_aluno_com_status)
+    atualizar_aluno = _no_banco(dados.atualizar_aluno)
+    listar_alunos = _no_banco(dados.listar_alunos)
+    listar_alunos_por_status = _no_banco(dados.listar_alunos_por_status)
+    buscar_alunos = _no_banco(dados.buscar_alunos)
+    obter_painel_alunos = _no_banco(dados.obter_painel_alunos)
+    obter_metricas = _no_banco(dados.obter_metricas)
+
+    # Pagamentos
+    obter_status_pagamento = _no_banco(dados.obter_status_pagamento)
+    registrar_pagamento = _no_banco(dados.registrar_pagamento)
+    criar_proximo_pagamento = _no_banco(dados.criar_proximo_pagamento)
+    alterar_status_pagamento = _no_banco(dados.alterar_status_pagamento)
+    alterar_status_pagamentos = _no_banco(dados.alterar_status_pagamentos)
+    listar_historico_pagamentos = _no_banco(dados.listar_historico_pagamentos)
+    obter_resumo_pagamentos = _no_banco(dados.obter_resumo_pagamentos)
+    verificar_pagamentos = _no_banco(dados.verificar_pagamentos)
+    atualizar_pagamentos_atrasados = _no_banco(dados.atualizar_pagamentos_atrasados)
+    executar_agendador_atrasos = _no_banco(dados.executar_agendador_atrasos)
+    gerar_cobrancas = _no_banco(faturamento.gerar_cobrancas)
+
+    # Conciliação de extratos bancários
+    importar_extrato = _no_banco(conciliacao.importar_extrato)
+    listar_revisao = _no_banco(conciliacao.listar_revisao)
+    confirmar_conciliacao = _no_banco(conciliacao.confirmar_conciliacao)
+    descartar_conciliacao = _no_banco(conciliacao.descartar_conciliacao)
+
+    # Relatórios
+    atualizar_resumo_mensal = _no_banco(relatorios.atualizar_resumo_mensal)
+    obter_relatorio = _no_banco(relatorios.obter_relatorio)
+
+    # Notificações
+    montar_mensagens = _no_banco(notificacoes.montar_mensagens)
+    obter_modelos = _no_banco(notificacoes.obter_modelos)
+    salvar_modelo = _no_banco(notificacoes.salvar_modelo)
+    enfileirar = _no_banco(notificacoes.enfileirar)
+    enfileirar_lembretes_do_dia = _no_banco(notificacoes.enfileirar_lembretes_do_dia)
+    resumo_envios = _no_banco(notificacoes.resumo_envios)
+    executar_despachante = _no_banco(notificacoes.executar_despachante)
+
+    # Importação e exportação
+    exportar = _no_banco(exportacao.exportar)
+
+    def importar_alunos(self, *args, **kwargs):
+        # importacao depende do pandas, carregado apenas quando usado
+        from academia.importacao import importar_alunos
+        with usando(self.banco):
+            return importar_alunos(*args, **kwargs)
@@ -0,0 +1,208 @@
+import argparse
+import multiprocessing
+import os
+import sqlite3
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from academia import dados, notificacoes, relatorios
+from academia.banco import DB_PATH, init_db, leitura
+from academia.dinheiro import formatar_reais
+from academia.repositorio import Repositorio
+
+# Diretório com um banco por treinador e o catálogo; sem valor, todos os treinadores usam o banco único
+DIRETORIO_SHARDS = os.environ.get('ACADEMIA_SHARDS')
+ARQUIVO_CATALOGO = "catalogo.db"
+# Processos usados pelos relatórios que percorrem os bancos de todos os treinadores
+PROCESSOS = os.cpu_count() or 1
+
+# Tabelas copiadas do banco único para o banco de cada treinador por dividir(), com as linhas do
+# treinador (a tabela de origem tem o apelido t); os resumos, contadores e o índice de busca são
+# refeitos pelos triggers na inserção
+TABELAS_POR_TREINADOR = {
+    "alunos": "FROM origem.alunos t WHERE t.treinador_id = :treinador_id",
+    "pagamentos": '''FROM origem.pagamentos t JOIN origem.alunos a ON a.id = t.aluno_id
+                     WHERE a.treinador_id = :treinador_id''',
+    "envios": "FROM origem.envios t WHERE t.treinador_id = :treinador_id",
+    "modelos_mensagem": "FROM origem.modelos_mensagem t WHERE t.treinador_id = :treinador_id",
+    "transacoes_extrato": "FROM origem.transacoes_extrato t WHERE t.treinador_id = :treinador_id",
+}
+
+def caminho_catalogo(diretorio):
+    return os.path.join(diretorio, ARQUIVO_CATALOGO)
+
+def caminho_shard(diretorio, treinador_id):
+    return os.path.join(diretorio, f"treinador_{treinador_id}.db")
+
+def listar_shards(diretorio):
+    # (treinador_id, caminho) dos treinadores do catálogo que já têm banco próprio
+    with leitura(caminho_catalogo(diretorio)) as conn:
+        ids = [row[0] for row in conn.execute("SELECT id FROM treinadores ORDER BY id")]
+    return [(treinador_id, caminho_shard(diretorio, treinador_id)) for treinador_id in ids
+            if os.path.exists(caminho_shard(diretorio, treinador_id))]
+
+class Roteador:
+    # Resolve o Repositorio do treinador logado. Sem diretório, todos usam o mesmo banco; com diretório,
+    # cada treinador tem o próprio arquivo (as escritas de um não esperam pelo lock de escrita dos outros)
+    # e o catálogo guarda os treinadores e as senhas usadas no login
+    def __init__(self, diretorio=DIRETORIO_SHARDS, banco=None):
+        self.diretorio = diretorio
+        if diretorio:
+            os.makedirs(diretorio, exist_ok=True)
+            banco = caminho_catalogo(diretorio)
+        self.catalogo = Repositorio(banco or DB_PATH)
+        self._repositorios = {}
+        self._lock = threading.Lock()
+
+    def repositorio(self, treinador_id):
+        if not self.diretorio:
+            return self.catalogo
+        with self._lock:
+            repo = self._repositorios.get(treinador_id)
+            if repo is None:
+                # O banco é criado no primeiro acesso, com a cópia do treinador do catálogo
+                repo = Repositorio(caminho_shard(self.diretorio, treinador_id))
+                treinador = self.catalogo.obter_treinador(treinador_id)
+                if treinador:
+                    repo.sincronizar_treinador(treinador_id, treinador['nome'], treinador['email'])
+                self._repositorios[treinador_id] = repo
+            return repo
+
+    def authenticate_user(self, email, senha):
+        return self.catalogo.authenticate_user(email, senha)
+
+    def register_user(self, nome, email, senha):
+        if not self.catalogo.register_user(nome, email, senha):
+            return False
+        if self.diretorio:
+            self.repositorio(self.catalogo.authenticate_user(email, senha)['id'])
+        return True
+
+    def atualizar_treinador(self, treinador_id, nome, senha_atual, nova_senha=None):
+        if not self.catalogo.atualizar_treinador(treinador_id, nome, senha_atual, nova_senha):
+            return False
+        if self.diretorio:
+            treinador = self.catalogo.obter_treinador(treinador_id)
+            self.repositorio(treinador_id).sincronizar_treinador(treinador_id, nome, treinador['email'])
+        return True
+
+    def bancos(self):
+        # Bancos percorridos pelas tarefas em segundo plano
+        if not self.diretorio:
+            return [self.catalogo.banco]
+        return [caminho for _, caminho in listar_shards(self.diretorio)]
+
+    def executar_agendador_atrasos(self, parar):
+        dados.executar_agendador_atrasos(parar, self.bancos)
+
+    def executar_despachante(self, parar):
+        notificacoes.executar_despachante(parar, bancos=self.bancos)
+
+def _colunas(conn, tabela):
+    # Colunas pelo nome: a ordem física difere entre um banco antigo migrado (colunas adicionadas
+    # com ALTER TABLE vão para o final) e um banco criado já no schema atual
+    return [row[1] for row in conn.execute(f"PRAGMA main.table_info({tabela})")]
+
+def dividir(origem, diretorio):
+    # Copia o banco único para o catálogo e um banco por treinador; treinadores que já têm banco
+    # próprio são ignorados. Retorna a quantidade de bancos criados.
+    init_db(origem)
+    os.makedirs(diretorio, exist_ok=True)
+    catalogo = caminho_catalogo(diretorio)
+    init_db(catalogo)
+    with sqlite3.connect(catalogo) as conn:
+        conn.execute("ATTACH DATABASE ? AS origem", (origem,))
+        conn.execute("INSERT OR IGNORE INTO treinadores (id, nome, email, senha) "
+                     "SELECT id, nome, email, senha FROM origem.treinadores")
+        treinadores = conn.execute("SELECT id, nome, email FROM origem.treinadores ORDER BY id").fetchall()
+    conn.close()
+
+    criados = 0
+    for treinador_id, nome, email in treinadores:
+        caminho = caminho_shard(diretorio, treinador_id)
+        if os.path.exists(caminho):
+            continue
+        init_db(caminho)
+        conn = sqlite3.connect(caminho)
+        try:
+            conn.execute("ATTACH DATABASE ? AS origem", (origem,))
+            with conn:
+                conn.execute("INSERT INTO treinadores (id, nome, email, senha) VALUES (?, ?, ?, '')",
+                             (treinador_id, nome, email))
+                for tabela, origem_linhas in TABELAS_POR_TREINADOR.items():
+                    colunas = _colunas(conn, tabela)
+                    conn.execute(f"INSERT INTO {tabela} ({', '.join(colunas)}) "
+                                 f"SELECT {', '.join('t.' + c for c in colunas)} {origem_linhas}",
+                                 {"treinador_id": treinador_id})
+        finally:
+            conn.close()
+        criados += 1
+    return criados
+
+def _relatorio_treinador(treinador_id, caminho, meses, hoje):
+    # Executado em um processo do pool: atualiza o resumo do banco do treinador e lê o relatório
+    relatorios.atualizar_resumo_mensal(caminho)
+    return (treinador_id, relatorios.receita_mensal(treinador_id, meses, hoje, caminho),
+            relatorios.atrasos_por_faixa(treinador_id, hoje, caminho))
+
+def relatorio_geral(diretorio, meses=relatorios.MESES_RELATORIO, hoje=None, processos=PROCESSOS):
+    # Receita mensal somada e atrasos de cada treinador, com os bancos lidos em paralelo.
+    # Processos iniciados com "spawn", sem herdar as conexões abertas por este processo.
+    hoje = hoje or datetime.now().date()
+    shards = listar_shards(diretorio)
+    resultados = []
+    if shards:
+        contexto = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=processos, mp_context=contexto) as executor:
+            resultados = list(executor.map(_relatorio_treinador, [t for t, _ in shards], [c for _, c in shards],
+                                           [meses] * len(shards), [hoje] * len(shards)))
+
+    mensal = {}
+    for _, linhas, _ in resultados:
+        for linha in linhas:
+            total = mensal.setdefault(linha['mes'], {"mes": linha['mes'], "cobrancas": 0,
+                                                     "valor_esperado_centavos": 0, "valor_recebido_centavos": 0})
+            total["cobrancas"] += linha['cobrancas']
+            total["valor_esperado_centavos"] += linha['valor_esperado_centavos']
+            total["valor_recebido_centavos"] += linha['valor_recebido_centavos']
+    for total in mensal.values():
+        total["taxa_recebimento"] = (total["valor_recebido_centavos"] / total["valor_esperado_centavos"]
+                                     if total["valor_esperado_centavos"] else None)
+    return {
+        "mensal": [mensal[mes] for mes in sorted(mensal)],
+        "atrasos": {treinador_id: atrasos for treinador_id, _, atrasos in resultados},
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Modo com um banco por treinador: divisão do banco único e relatório geral.")
+    parser.add_argument("--diretorio", default=DIRETORIO_SHARDS, required=DIRETORIO_SHARDS is None,
+                        help="diretório do catálogo e dos bancos dos treinadores (padrão: $ACADEMIA_SHARDS)")
+    comandos = parser.add_subparsers(dest="comando", required=True)
+    comando_dividir = comandos.add_parser("dividir", help="copia o banco único para um banco por treinador")
+    comando_dividir.add_argument("--origem", default=DB_PATH, help="banco único de origem")
+    comando_relatorio = comandos.add_parser("relatorio", help="receita mensal e atrasos de todos os treinadores")
+    comando_relatorio.add_argument("--meses", type=int, default=relatorios.MESES_RELATORIO)
+    comando_relatorio.add_argument("--processos", type=int, default=PROCESSOS)
+    args = parser.parse_args(argv)
+
+    inicio = datetime.now()
+    if args.comando == "dividir":
+        criados = dividir(args.origem, args.diretorio)
+        duracao = (datetime.now() - inicio).total_seconds()
+        print(f"{criados} bancos de treinadores criados em {duracao:.2f}s")
+        return
+
+    relatorio = relatorio_geral(args.diretorio, args.meses, processos=args.processos)
+    duracao = (datetime.now() - inicio).total_seconds()
+    for linha in relatorio["mensal"]:
+        taxa = f"{linha['taxa_recebimento']:.0%}" if linha['taxa_recebimento'] is not None else "-"
+        print(f"{linha['mes']}  esperado {formatar_reais(linha['valor_esperado_centavos']):>16}  "
+              f"recebido {formatar_reais(linha['valor_recebido_centavos']):>16}  taxa {taxa:>5}")
+    for treinador_id, faixas in sorted(relatorio["atrasos"].items()):
+        texto = "  ".join(f"{f['faixa']}: {f['quantidade']}" for f in faixas)
+        print(f"treinador {treinador_id}  {texto}")
+    print(f"{len(relatorio['atrasos'])} bancos lidos em {duracao:.2f}s")
+
+if __name__ == "__main__":
+    main()
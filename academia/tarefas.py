@@ -0,0 +1,147 @@
+import argparse
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+from academia import faturamento, relatorios
+from academia.banco import DB_PATH, init_db, leitura, usando
+from academia.dados import atualizar_pagamentos_atrasados
+from academia.shards import DIRETORIO_SHARDS, listar_shards
+
+# Tarefas noturnas, executadas nesta ordem em cada partição (um treinador ou o banco de um treinador).
+# Cada função recebe (treinador_id, data de referência) e retorna as linhas alteradas.
+TAREFAS = {
+    "atrasos": lambda treinador_id, data: atualizar_pagamentos_atrasados(data, treinador_id),
+    "cobrancas": lambda treinador_id, data: faturamento.gerar_cobrancas(
+        treinador_id, faturamento.mes_seguinte(data)),
+    "resumo": lambda treinador_id, data: relatorios.atualizar_resumo_mensal(treinador_id=treinador_id),
+}
+# No banco único, as partições disputam o mesmo escritor: gerar_cobrancas mantém BEGIN IMMEDIATE durante
+# um treinador inteiro, e uma partição que espera mais que ACADEMIA_BUSY_TIMEOUT_MS (5 s) falha com
+# "database is locked". A falha é informada e a partição é repetida na próxima execução (checkpoint);
+# com muitos alunos por treinador, use poucos processos ou um banco por treinador (--diretorio).
+PROCESSOS = os.cpu_count() or 1
+ARQUIVO_CHECKPOINT = "tarefas_checkpoint.json"
+
+def listar_particoes(diretorio=None, banco=DB_PATH):
+    # (treinador_id, banco): no modo com um banco por treinador, cada banco; senão, cada treinador do banco único
+    if diretorio:
+        return listar_shards(diretorio)
+    init_db(banco)
+    with leitura(banco) as conn:
+        return [(row[0], banco) for row in conn.execute("SELECT id FROM treinadores ORDER BY id")]
+
+def executar_particao(treinador_id, banco, tarefas, data):
+    # Executado em um processo do pool; cada tarefa usa as próprias transações curtas
+    init_db(banco)
+    linhas = {}
+    inicio = time.perf_counter()
+    with usando(banco):
+        for tarefa in tarefas:
+            linhas[tarefa] = TAREFAS[tarefa](treinador_id, data)
+    return {"linhas": linhas, "segundos": time.perf_counter() - inicio}
+
+def ler_checkpoint(caminho, tarefas, data):
+    # Partições já concluídas de uma execução anterior com as mesmas tarefas e data
+    if not os.path.exists(caminho):
+        return {}
+    with open(caminho, encoding="utf-8") as f:
+        checkpoint = json.load(f)
+    if checkpoint.get("tarefas") != list(tarefas) or checkpoint.get("data") != data.isoformat():
+        return {}
+    return {int(treinador_id): resultado for treinador_id, resultado in checkpoint["concluidas"].items()}
+
+def gravar_checkpoint(caminho, tarefas, data, concluidas):
+    # Gravação atômica: uma interrupção no meio da escrita mantém o checkpoint anterior
+    temporario = caminho + ".tmp"
+    with open(temporario, "w", encoding="utf-8") as f:
+        json.dump({"tarefas": list(tarefas), "data": data.isoformat(),
+                   "concluidas": {str(t): r for t, r in concluidas.items()}}, f)
+    os.replace(temporario, caminho)
+
+def executar(tarefas, data=None, diretorio=None, banco=DB_PATH, processos=PROCESSOS,
+             checkpoint=ARQUIVO_CHECKPOINT, progresso=None):
+    # Executa as tarefas em todas as partições, até `processos` ao mesmo tempo, retomando do checkpoint.
+    # Retorna {treinador_id: resultado}, com "erro" nas partições que falharam (repetidas na próxima execução).
+    data = data or datetime.now().date()
+    concluidas = ler_checkpoint(checkpoint, tarefas, data) if checkpoint else {}
+    resultados = {treinador_id: dict(resultado, retomada=True) for treinador_id, resultado in concluidas.items()}
+    pendentes = [(t, b) for t, b in listar_particoes(diretorio, banco) if t not in concluidas]
+    if not pendentes:
+        return resultados
+
+    # Processos iniciados com "spawn", sem herdar as conexões abertas por este processo
+    contexto = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=processos, mp_context=contexto) as executor:
+        futuros = {executor.submit(executar_particao, treinador_id, banco_particao, tarefas, data): treinador_id
+                   for treinador_id, banco_particao in pendentes}
+        try:
+            for futuro in as_completed(futuros):
+                treinador_id = futuros[futuro]
+                try:
+                    resultados[treinador_id] = concluidas[treinador_id] = futuro.result()
+                except Exception as e:
+                    resultados[treinador_id] = {"erro": f"{type(e).__name__}: {e}"}
+                    continue
+                if checkpoint:
+                    gravar_checkpoint(checkpoint, tarefas, data, concluidas)
+                if progresso:
+                    progresso(treinador_id, resultados[treinador_id])
+        except KeyboardInterrupt:
+            # As partições já concluídas estão no checkpoint; as demais são canceladas
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+    return resultados
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Executa as tarefas noturnas por treinador em paralelo, "
+                                                 "retomando uma execução interrompida.")
+    parser.add_argument("--tarefas", nargs="+", choices=list(TAREFAS), default=list(TAREFAS),
+                        help="tarefas a executar (padrão: todas); executadas na ordem acima")
+    parser.add_argument("--data", type=lambda s: datetime.strptime(s, "%Y-%m-%d").date(),
+                        help="data de referência AAAA-MM-DD (padrão: hoje)")
+    parser.add_argument("--processos", type=int, default=PROCESSOS,
+                        help="partições executadas ao mesmo tempo (no banco único, disputam o mesmo escritor)")
+    parser.add_argument("--checkpoint", default=ARQUIVO_CHECKPOINT,
+                        help="arquivo com as partições concluídas, usado para retomar a execução")
+    parser.add_argument("--reiniciar", action="store_true", help="ignorar o checkpoint e executar tudo")
+    parser.add_argument("--diretorio", default=DIRETORIO_SHARDS,
+                        help="diretório dos bancos por treinador (padrão: $ACADEMIA_SHARDS); sem ele, o banco único")
+    parser.add_argument("--banco", default=DB_PATH, help="caminho do banco de dados único")
+    args = parser.parse_args(argv)
+
+    tarefas = [tarefa for tarefa in TAREFAS if tarefa in args.tarefas]
+    data = args.data or datetime.now().date()
+    if args.reiniciar and os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)
+
+    def progresso(treinador_id, resultado):
+        linhas = "  ".join(f"{tarefa}: {total}" for tarefa, total in resultado["linhas"].items())
+        print(f"treinador {treinador_id}  {linhas}  {resultado['segundos']:.2f}s", flush=True)
+
+    inicio = datetime.now()
+    try:
+        resultados = executar(tarefas, data, args.diretorio, args.banco, args.processos, args.checkpoint,
+                              progresso)
+    except KeyboardInterrupt:
+        print(f"Interrompido; execute novamente para retomar a partir de {args.checkpoint}")
+        return 130
+    duracao = (datetime.now() - inicio).total_seconds()
+
+    falhas = {t: r for t, r in resultados.items() if "erro" in r}
+    for treinador_id, resultado in sorted(falhas.items()):
+        print(f"treinador {treinador_id}  falhou: {resultado['erro']}")
+    retomadas = sum(1 for r in resultados.values() if r.get("retomada"))
+    totais = {tarefa: sum(r["linhas"][tarefa] for r in resultados.values() if "linhas" in r) for tarefa in tarefas}
+    print(f"{len(resultados)} partições ({retomadas} do checkpoint, {len(falhas)} com falha) em {duracao:.2f}s; "
+          + ", ".join(f"{tarefa}: {total} linhas" for tarefa, total in totais.items()))
+    if not falhas and os.path.exists(args.checkpoint):
+        # Execução completa: a próxima começa do zero
+        os.remove(args.checkpoint)
+    return 1 if falhas else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
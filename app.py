@@ -1,12 +1,23 @@
 import streamlit as st
 import pandas as pd
-import sqlite3
 import datetime
 import os
-import hashlib
 import json
-from datetime import datetime, timedelta
+import threading
+from datetime import datetime
 import time
+import tempfile
+from contextlib import nullcontext
+
+from academia.banco import banco_atual
+from academia.dados import FAIXAS_ATRASO, PAGINA_CARDS, STATUS_PAGAMENTO
+from academia.dinheiro import formatar_reais, para_centavos, para_reais
+from academia.exportacao import FORMATOS as FORMATOS_EXPORTACAO
+from academia.importacao import COLUNAS as COLUNAS_IMPORTACAO
+from academia.instrumentacao import PERFIL_JSONL, registrar_execucao
+from academia.notificacoes import CAMPOS_MODELO, CANAIS, MODELOS_PADRAO, envio_lembrete, validar_modelo
+from academia.relatorios import MESES_RELATORIO
+from academia.shards import DIRETORIO_SHARDS, Roteador
 
 # Configuração de desenvolvimento
 DEV_MODE = True  # Altere para False em produção
@@ -19,350 +30,30 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Inicialização do banco de dados
-def init_db():
-    conn = sqlite3.connect('academia.db')
-    c = conn.cursor()
-    
-    # Criar tabela de treinadores
-    c.execute('''
-    CREATE TABLE IF NOT EXISTS treinadores (
-        id INTEGER PRIMARY KEY,
-        nome TEXT NOT NULL,
-        email TEXT UNIQUE NOT NULL,
-        senha TEXT NOT NULL
-    )
-    ''')
-    
-    # Criar tabela de alunos
-    c.execute('''
-    CREATE TABLE IF NOT EXISTS alunos (
-        id INTEGER PRIMARY KEY,
-        nome TEXT NOT NULL,
-        email TEXT NOT NULL,
-        telefone TEXT NOT NULL,
-        data_inicio TEXT NOT NULL,
-        data_pagamento TEXT NOT NULL,
-        dia_vencimento INTEGER,
-        valor_mensalidade REAL NOT NULL,
-        treinador_id INTEGER NOT NULL,
-        FOREIGN KEY (treinador_id) REFERENCES treinadores (id)
-    )
-    ''')
-    
-    # Verificar se a coluna dia_vencimento existe, se não existir, adicioná-la
-    try:
-        c.execute('SELECT dia_vencimento FROM alunos LIMIT 1')
-    except sqlite3.OperationalError:
-        # A coluna não existe, adicioná-la e preencher com o dia da data_pagamento
-        c.execute('ALTER TABLE alunos ADD COLUMN dia_vencimento INTEGER')
-        # Preencher a coluna dia_vencimento com o dia da data_pagamento para registros existentes
-        c.execute('UPDATE alunos SET dia_vencimento = CAST(substr(data_pagamento, 9, 2) AS INTEGER)')
-    
-    # Criar tabela de pagamentos
-    c.execute('''
-    CREATE TABLE IF NOT EXISTS pagamentos (
-        id INTEGER PRIMARY KEY,
-        data_vencimento TEXT NOT NULL,
-        data_pagamento TEXT,
-        valor REAL NOT NULL,
-        status TEXT NOT NULL,
-        aluno_id INTEGER NOT NULL,
-        FOREIGN KEY (aluno_id) REFERENCES alunos (id)
-    )
-    ''')
-    
-    conn.commit()
-    conn.close()
-
-# Funções de autenticação
-def hash_password(password):
-    return hashlib.sha256(password.encode()).hexdigest()
-
-def check_password(password, hashed_password):
-    return hash_password(password) == hashed_password
-
-def register_user(nome, email, senha):
-    conn = sqlite3.connect('academia.db')
-    c = conn.cursor()
-    
-    try:
-        hashed_password = hash_password(senha)
-        c.execute("INSERT INTO treinadores (nome, email, senha) VALUES (?, ?, ?)", 
-                 (nome, email, hashed_password))
-        conn.commit()
-        return True
-    except sqlite3.IntegrityError:
-        return False
-    finally:
-        conn.close()
-
-def authenticate_user(email, senha):
-    conn = sqlite3.connect('academia.db')
-    c = conn.cursor()
-    
-    c.execute("SELECT id, nome, email, senha FROM treinadores WHERE email = ?", (email,))
-    user = c.fetchone()
-    conn.close()
-    
-    if user and check_password(senha, user[3]):
-        return {"id": user[0], "nome": user[1], "email": user[2]}
-    return None
-
-# Funções para gerenciar alunos
-def adicionar_aluno(nome, email, telefone, data_pagamento, valor_mensalidade, treinador_id):
-    conn = sqlite3.connect('academia.db')
-    c = conn.cursor()
-    
-    data_inicio = datetime.now().strftime("%Y-%m-%d")
-    
-    # Extrair o dia do mês da data de pagamento para o dia fixo de vencimento
-    data_vencimento = datetime.strptime(data_pagamento, "%Y-%m-%d")
-    dia_vencimento = data_vencimento.day
-    
-    c.execute('''
-    INSERT INTO alunos (nome, email, telefone, data_inicio, data_pagamento, dia_vencimento, valor_mensalidade, treinador_id)
-    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-    ''', (nome, email, telefone, data_inicio, data_pagamento, dia_vencimento, valor_mensalidade, treinador_id))
-    
-    aluno_id = c.lastrowid
-    
-    # Criar o primeiro pagamento
-    c.execute('''
-    INSERT INTO pagamentos (data_vencimento, valor, status, aluno_id)
-    VALUES (?, ?, ?, ?)
-    ''', (data_pagamento, valor_mensalidade, "Pendente", aluno_id))
-    
-    conn.commit()
-    conn.close()
-    return aluno_id
-
-def adicionar_aluno_com_status(nome, email, telefone, data_pagamento, valor_mensalidade, treinador_id, status_inicial="Pendente"):
-    conn = sqlite3.connect('academia.db')
-    c = conn.cursor()
-    
-    data_inicio = datetime.now().strftime("%Y-%m-%d")
-    
-    # Extrair o dia do mês da data de pagamento para o dia fixo de vencimento
-    data_vencimento = datetime.strptime(data_pagamento, "%Y-%m-%d")
-    dia_vencimento = data_vencimento.day
-    
-    c.execute('''
-    INSERT INTO alunos (nome, email, telefone, data_inicio, data_pagamento, dia_vencimento, valor_mensalidade, treinador_id)
-    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-    ''', (nome, email, telefone, data_inicio, data_pagamento, dia_vencimento, valor_mensalidade, treinador_id))
-    
-    aluno_id = c.lastrowid
-    
-    # Criar o primeiro pagamento com o status especificado
-    # A data de vencimento u00e9 a data informada pelo usuu00e1rio
-    
-    # Se o status for "Pago", registramos a data de pagamento efetivo
-    data_pagamento_efetivo = None
-    if status_inicial == "Pago":
-        data_pagamento_efetivo = datetime.now().strftime("%Y-%m-%d")
-    
-    c.execute('''
-    INSERT INTO pagamentos (data_vencimento, data_pagamento, valor, status, aluno_id)
-    VALUES (?, ?, ?, ?, ?)
-    ''', (data_pagamento, data_pagamento_efetivo, valor_mensalidade, status_inicial, aluno_id))
-    
-    conn.commit()
-    conn.close()
-    return aluno_id
-
-def listar_alunos(treinador_id):
-    conn = sqlite3.connect('academia.db')
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
-    
-    c.execute('''
-    SELECT * FROM alunos WHERE treinador_id = ? ORDER BY nome
-    ''', (treinador_id,))
-    
-    alunos = [dict(row) for row in c.fetchall()]
-    conn.close()
-    return alunos
-
-def obter_status_pagamento(aluno_id):
-    conn = sqlite3.connect('academia.db')
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
-    
-    c.execute('''
-    SELECT * FROM pagamentos WHERE aluno_id = ? ORDER BY data_vencimento DESC LIMIT 1
-    ''', (aluno_id,))
-    
-    pagamento = c.fetchone()
-    conn.close()
-    
-    if pagamento:
-        return dict(pagamento)
-    return None
-
-def registrar_pagamento(pagamento_id):
-    conn = sqlite3.connect('academia.db')
-    c = conn.cursor()
-    
-    data_atual = datetime.now().strftime("%Y-%m-%d")
-    c.execute('''
-    UPDATE pagamentos SET data_pagamento = ?, status = 'Pago' WHERE id = ?
-    ''', (data_atual, pagamento_id))
-    
-    conn.commit()
-    conn.close()
-
-def criar_proximo_pagamento(aluno_id, valor, data_ultimo_pagamento):
-    conn = sqlite3.connect('academia.db')
-    c = conn.cursor()
-    
-    # Obter o dia de vencimento fixo do aluno
-    c.execute('SELECT dia_vencimento FROM alunos WHERE id = ?', (aluno_id,))
-    resultado = c.fetchone()
-    
-    if resultado is None or resultado[0] is None:
-        # Se não houver dia de vencimento definido, usar a data do último pagamento
-        data_vencimento = datetime.strptime(data_ultimo_pagamento, "%Y-%m-%d")
-        dia_vencimento = data_vencimento.day
-    else:
-        dia_vencimento = resultado[0]
-        # Converter a data do último pagamento para extrair apenas mês e ano
-        data_vencimento = datetime.strptime(data_ultimo_pagamento, "%Y-%m-%d")
-    
-    # Calcular a próxima data de vencimento (mês seguinte, mesmo dia do vencimento)
-    mes_seguinte = data_vencimento.month + 1
-    ano = data_vencimento.year
-    
-    # Ajustar se estivermos passando para o próximo ano
-    if mes_seguinte > 12:
-        mes_seguinte = 1
-        ano += 1
-    
-    # Lidar com datas inválidas (ex: dia 31 em meses com menos dias)
-    ultimo_dia = 31  # Valor padrão alto
-    if mes_seguinte in [4, 6, 9, 11]:  # Meses com 30 dias
-        ultimo_dia = 30
-    elif mes_seguinte == 2:  # Fevereiro
-        if (ano % 4 == 0 and ano % 100 != 0) or (ano % 400 == 0):  # Ano bissexto
-            ultimo_dia = 29
-        else:
-            ultimo_dia = 28
-    
-    # Usar o menor valor entre o dia de vencimento e o último dia do mês seguinte
-    dia = min(dia_vencimento, ultimo_dia)
-    
-    # Criar a nova data de vencimento
-    nova_data_vencimento = datetime(ano, mes_seguinte, dia)
-    data_vencimento_str = nova_data_vencimento.strftime("%Y-%m-%d")
-    
-    # Inserir o novo pagamento no banco de dados
-    c.execute('''
-    INSERT INTO pagamentos (data_vencimento, data_pagamento, valor, status, aluno_id)
-    VALUES (?, NULL, ?, 'Pendente', ?)
-    ''', (data_vencimento_str, valor, aluno_id))
-    
-    conn.commit()
-    conn.close()
-
-def alterar_status_pagamento(pagamento_id, novo_status):
-    conn = sqlite3.connect('academia.db')
-    c = conn.cursor()
-    
-    # Se o status for alterado para "Pago", registramos a data de pagamento
-    if novo_status == "Pago":
-        data_atual = datetime.now().strftime("%Y-%m-%d")
-        c.execute('''
-        UPDATE pagamentos SET status = ?, data_pagamento = ? WHERE id = ?
-        ''', (novo_status, data_atual, pagamento_id))
-    else:
-        # Se for alterado para outro status, removemos a data de pagamento
-        c.execute('''
-        UPDATE pagamentos SET status = ?, data_pagamento = NULL WHERE id = ?
-        ''', (novo_status, pagamento_id))
-    
-    conn.commit()
-    conn.close()
+# Acesso aos dados (o schema é criado ou atualizado uma vez por processo). Com ACADEMIA_SHARDS,
+# cada treinador usa o próprio banco e o login é feito no catálogo; ver academia.shards
+@st.cache_resource
+def obter_roteador():
+    return Roteador(DIRETORIO_SHARDS, banco_atual())
 
-def atualizar_aluno(aluno_id, nome, email, telefone, data_pagamento, valor_mensalidade):
-    conn = sqlite3.connect('academia.db')
-    c = conn.cursor()
-    
-    # Extrair o dia do mês da data de pagamento para o dia fixo de vencimento
-    data_vencimento = datetime.strptime(data_pagamento, "%Y-%m-%d")
-    dia_vencimento = data_vencimento.day
-    
-    c.execute('''
-    UPDATE alunos 
-    SET nome = ?, email = ?, telefone = ?, data_pagamento = ?, dia_vencimento = ?, valor_mensalidade = ?
-    WHERE id = ?
-    ''', (nome, email, telefone, data_pagamento, dia_vencimento, valor_mensalidade, aluno_id))
-    
-    # Verificar se a atualização foi bem-sucedida
-    if c.rowcount > 0:
-        conn.commit()
-        conn.close()
-        return True
-    
-    conn.close()
-    return False
+roteador = obter_roteador()
+# Repositório do treinador logado, definido em main()
+repo = roteador.catalogo
 
-# Função para verificar pagamentos e gerar notificações
-def verificar_pagamentos():
-    conn = sqlite3.connect('academia.db')
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
-    
-    hoje = datetime.now().date()
-    tres_dias_depois = (hoje + timedelta(days=3)).strftime("%Y-%m-%d")
-    hoje_str = hoje.strftime("%Y-%m-%d")
-    
-    # Pagamentos que vencem em 3 dias
-    c.execute('''
-    SELECT p.id, p.data_vencimento, p.valor, a.nome, a.email, a.telefone
-    FROM pagamentos p
-    JOIN alunos a ON p.aluno_id = a.id
-    WHERE p.status = 'Pendente' AND p.data_vencimento = ?
-    ''', (tres_dias_depois,))
-    
-    notificacoes_3_dias = [dict(row) for row in c.fetchall()]
-    
-    # Pagamentos que vencem hoje
-    c.execute('''
-    SELECT p.id, p.data_vencimento, p.valor, a.nome, a.email, a.telefone
-    FROM pagamentos p
-    JOIN alunos a ON p.aluno_id = a.id
-    WHERE p.status = 'Pendente' AND p.data_vencimento = ?
-    ''', (hoje_str,))
-    
-    notificacoes_hoje = [dict(row) for row in c.fetchall()]
-    
-    # Pagamentos atrasados
-    c.execute('''
-    SELECT p.id, p.data_vencimento, p.valor, a.nome, a.email, a.telefone
-    FROM pagamentos p
-    JOIN alunos a ON p.aluno_id = a.id
-    WHERE p.status = 'Pendente' AND p.data_vencimento < ?
-    ''', (hoje_str,))
-    
-    notificacoes_atrasadas = [dict(row) for row in c.fetchall()]
-    
-    # Atualizar status dos pagamentos atrasados
-    c.execute('''
-    UPDATE pagamentos SET status = 'Atrasado' 
-    WHERE status = 'Pendente' AND data_vencimento < ?
-    ''', (hoje_str,))
-    
-    conn.commit()
-    conn.close()
-    
-    return {
-        "tres_dias": notificacoes_3_dias,
-        "hoje": notificacoes_hoje,
-        "atrasados": notificacoes_atrasadas
-    }
+# Uma única thread por processo, compartilhada por todas as sessões
+@st.cache_resource
+def iniciar_agendador_atrasos():
+    parar = threading.Event()
+    threading.Thread(target=roteador.executar_agendador_atrasos, args=(parar,),
+                     daemon=True, name="agendador-atrasos").start()
+    return parar
 
-# Inicializar o banco de dados
-init_db()
+@st.cache_resource
+def iniciar_despachante_envios():
+    parar = threading.Event()
+    threading.Thread(target=roteador.executar_despachante, args=(parar,),
+                     daemon=True, name="despachante-envios").start()
+    return parar
 
 # Inicializar sessão
 if 'logged_in' not in st.session_state:
@@ -389,7 +80,8 @@ def sidebar():
             # Menu de navegação
             selected = st.radio(
                 "Navegação",
-                ["Dashboard", "Cadastrar Aluno", "Notificações", "Configurações", "Sair"]
+                ["Dashboard", "Relatórios", "Cadastrar Aluno", "Importar Alunos", "Conciliação Bancária",
+                 "Exportar Dados", "Notificações", "Configurações", "Sair"]
             )
             
             # Se o usuário fez uma seleção manual, ela tem prioridade
@@ -440,7 +132,7 @@ def pagina_login():
             if not email or not senha:
                 st.error("Preencha todos os campos!")
             else:
-                user = authenticate_user(email, senha)
+                user = roteador.authenticate_user(email, senha)
                 if user:
                     # Inicializar corretamente a sessão
                     st.session_state.user = user
@@ -465,7 +157,7 @@ def pagina_login():
             elif not nome or not email or not senha:
                 st.error("Todos os campos são obrigatórios!")
             else:
-                if register_user(nome, email, senha):
+                if roteador.register_user(nome, email, senha):
                     st.success("Cadastro realizado com sucesso! Faça login para continuar.")
                     # Limpar os campos após o cadastro
                     st.session_state.reg_nome = ""
@@ -486,15 +178,10 @@ def pagina_dashboard():
             st.experimental_rerun()
         return
         
-    # Estabelecer conexão com o banco de dados
-    conn = sqlite3.connect('academia.db')
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
-    
     # Verificar se há um pagamento registrado recentemente
     if 'ultimo_pagamento_registrado' in st.session_state:
         aluno_id = st.session_state.ultimo_pagamento_registrado['aluno_id']
-        valor = st.session_state.ultimo_pagamento_registrado['valor']
+        valor_centavos = st.session_state.ultimo_pagamento_registrado['valor_centavos']
         data_vencimento = st.session_state.ultimo_pagamento_registrado['data_vencimento']
         
         st.success("Pagamento registrado com sucesso!")
@@ -503,7 +190,7 @@ def pagina_dashboard():
         col1, col2 = st.columns(2)
         with col1:
             if st.button("Sim, criar próximo pagamento"):
-                criar_proximo_pagamento(aluno_id, valor, data_vencimento)
+                repo.criar_proximo_pagamento(aluno_id, valor_centavos, data_vencimento)
                 st.success("Próximo pagamento mensal criado com sucesso!")
                 del st.session_state.ultimo_pagamento_registrado
                 st.experimental_rerun()
@@ -515,32 +202,18 @@ def pagina_dashboard():
         # Parar a execução do dashboard até que o usuário decida
         return
     
-    # Obter lista de alunos do treinador
-    alunos = listar_alunos(st.session_state.user['id'])
+    # Métricas lidas de uma única linha de contadores do treinador
+    metricas = repo.obter_metricas(st.session_state.user['id'])
     
     # Estatísticas
     col1, col2, col3, col4 = st.columns(4)
     
-    total_alunos = len(alunos)
-    
-    # Calcular pagamentos pendentes, atrasados e pagos
-    pagamentos_pendentes = 0
-    pagamentos_atrasados = 0
-    pagamentos_pagos = 0
-    receita_mensal = 0
-    receita_recebida = 0
-    
-    for aluno in alunos:
-        receita_mensal += aluno['valor_mensalidade']
-        status = obter_status_pagamento(aluno['id'])
-        if status:
-            if status['status'] == 'Pendente':
-                pagamentos_pendentes += 1
-            elif status['status'] == 'Atrasado':
-                pagamentos_atrasados += 1
-            elif status['status'] == 'Pago':
-                pagamentos_pagos += 1
-                receita_recebida += status['valor']
+    total_alunos = metricas['total_alunos']
+    pagamentos_pendentes = metricas['pendentes']
+    pagamentos_atrasados = metricas['atrasados']
+    pagamentos_pagos = metricas['pagos']
+    receita_mensal = metricas['receita_mensal_centavos']
+    receita_recebida = metricas['receita_recebida_centavos']
     
     with col1:
         st.metric("Total de Alunos", total_alunos)
@@ -558,15 +231,28 @@ def pagina_dashboard():
     st.subheader("Receita")
     col1, col2 = st.columns(2)
     with col1:
-        st.metric("Receita Mensal Esperada", f"R$ {receita_mensal:.2f}")
+        st.metric("Receita Mensal Esperada", formatar_reais(receita_mensal))
     with col2:
-        st.metric("Receita Recebida", f"R$ {receita_recebida:.2f}", 
-                 delta=f"R$ {receita_recebida - receita_mensal:.2f}" if receita_mensal > 0 else None)
+        st.metric("Receita Recebida", formatar_reais(receita_recebida), 
+                 delta=formatar_reais(receita_recebida - receita_mensal) if receita_mensal > 0 else None)
+    
+    # Alunos do treinador com o último pagamento e os prazos calculados em uma única consulta
+    painel = repo.obter_painel_alunos(st.session_state.user['id'], datetime.now().date())
+    tabela = painel['tabela']
+    
+    # Atrasos em aberto por faixa de dias
+    st.subheader("Atrasos por faixa")
+    colunas_faixas = st.columns(len(FAIXAS_ATRASO))
+    for coluna, faixa in zip(colunas_faixas, FAIXAS_ATRASO):
+        with coluna:
+            st.metric(f"{faixa} dias", painel['faixas_atraso'].get(faixa, 0))
     
     # Lista de alunos com filtro por status
     st.subheader("Seus Alunos")
     
-    if alunos:
+    # A tabela com todos os alunos só é montada e enviada ao navegador quando pedida; os cards
+    # abaixo continuam paginados
+    if not tabela.empty and st.checkbox(f"Mostrar tabela com todos os alunos ({len(tabela)})", key="mostrar_tabela"):
         # Adicionar filtro por status
         filtro_status = st.radio(
             "Filtrar por status:",
@@ -574,74 +260,79 @@ def pagina_dashboard():
             horizontal=True
         )
         
-        # Preparar dados para a tabela
-        dados_tabela = []
-        for aluno in alunos:
-            status_pagamento = obter_status_pagamento(aluno['id'])
-            status = status_pagamento['status'] if status_pagamento else "N/A"
-            
-            # Aplicar filtro
-            if filtro_status == "Pendentes" and status != "Pendente":
-                continue
-            elif filtro_status == "Atrasados" and status != "Atrasado":
-                continue
-            elif filtro_status == "Pagos" and status != "Pago":
-                continue
-            
-            # Formatar data para exibição
-            data_pagamento = datetime.strptime(aluno['data_pagamento'], "%Y-%m-%d").strftime("%d/%m/%Y")
-            
-            # Calcular dias até o vencimento ou dias de atraso
-            dias_info = ""
-            if status_pagamento:
-                data_venc = datetime.strptime(status_pagamento['data_vencimento'], "%Y-%m-%d").date()
-                hoje = datetime.now().date()
-                dias_diff = (data_venc - hoje).days
-                
-                if status == "Pendente":
-                    if dias_diff > 0:
-                        dias_info = f"Vence em {dias_diff} dias"
-                    elif dias_diff == 0:
-                        dias_info = "Vence hoje"
-                elif status == "Atrasado":
-                    dias_info = f"Atrasado há {abs(dias_diff)} dias"
-                elif status == "Pago":
-                    if status_pagamento['data_pagamento']:
-                        data_pag = datetime.strptime(status_pagamento['data_pagamento'], "%Y-%m-%d").date()
+        # Filtro e colunas de exibição aplicados sobre o quadro já calculado
+        status_filtro = {"Pendentes": "Pendente", "Atrasados": "Atrasado", "Pagos": "Pago"}.get(filtro_status)
+        filtrados = tabela if status_filtro is None else tabela[tabela['pag_status'] == status_filtro]
+        dados_tabela = pd.DataFrame({
+            "Nome": filtrados['nome'],
+            "Email": filtrados['email'],
+            "Telefone": filtrados['telefone'],
+            "Data de Pagamento": filtrados['data_pagamento_exibicao'],
+            "Status": filtrados['pag_status'].fillna("N/A"),
+            "Situação": filtrados['situacao'],
+            "Faixa de Atraso": filtrados['faixa_atraso'].astype(str).where(filtrados['faixa_atraso'].notna(), ""),
+        })
+        st.dataframe(dados_tabela, use_container_width=True)
     
     # 2. Lista de Alunos com Status de Pagamento
     st.subheader('Alunos e Status de Pagamento')
     
-    # Tabs para filtrar por status
-    tabs = st.tabs(["Todos", "Pendentes", "Pagos", "Atrasados"])
-    
-    # Preparar os dados dos alunos e seus pagamentos para exibição
-    alunos_com_pagamentos = []
-    for aluno in alunos:
-        c.execute('''
-        SELECT p.* FROM pagamentos p
-        WHERE p.aluno_id = ?
-        ORDER BY p.data_vencimento DESC LIMIT 1
-        ''', (aluno['id'],))
-        ultimo_pagamento = c.fetchone()
+    st.markdown("<style>"
+              ".status-card {padding: 15px; margin-bottom: 10px; border-radius: 5px; box-shadow: 0 1px 3px rgba(0,0,0,0.1);}"
+              ".status-pendente {border-left: 5px solid orange;}"
+              ".status-pago {border-left: 5px solid green;}"
+              ".status-atrasado {border-left: 5px solid red;}"
+              "</style>", unsafe_allow_html=True)
+    
+    # Função auxiliar para exibir o resumo e o histórico de pagamentos de um aluno
+    def exibir_historico(aluno_info, aba_id):
+        treinador_id = st.session_state.user['id']
+        historico = st.session_state.historico_detalhes
+        
+        st.markdown("### Histórico de Pagamentos")
+        resumo = repo.obter_resumo_pagamentos(treinador_id, aluno_info['id'])
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Total Pago", formatar_reais(resumo['total_pago_centavos']))
+        with col2:
+            st.metric("Total em Atraso", formatar_reais(resumo['total_atrasado_centavos']))
+        with col3:
+            st.metric("Meses Ativos", resumo['meses_ativos'])
         
-        if ultimo_pagamento:
-            aluno_info = dict(aluno)
-            aluno_info['pagamento'] = dict(ultimo_pagamento)
-            alunos_com_pagamentos.append(aluno_info)
+        if historico['pagamentos']:
+            for pgto in historico['pagamentos']:
+                cor_status = "green" if pgto['status'] == "Pago" else "orange" if pgto['status'] == "Pendente" else "red"
+                data_pagamento = f"<div><strong>Data do Pagamento:</strong> {pgto['data_pagamento']}</div>" if pgto['data_pagamento'] else ""
+                st.markdown(f"<div style='padding:8px;margin-bottom:5px;border-left:3px solid {cor_status};'>"
+                          f"<div><strong>Vencimento:</strong> {pgto['data_vencimento']}</div>"
+                          f"<div><strong>Status:</strong> <span style='color:{cor_status}'>{pgto['status']}</span></div>"
+                          f"{data_pagamento}"
+                          f"<div><strong>Valor:</strong> {formatar_reais(pgto['valor_centavos'])}</div>"
+                          f"</div>", unsafe_allow_html=True)
+        else:
+            st.info("Sem histórico de pagamentos disponível.")
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            # Próxima página a partir da chave do último pagamento exibido
+            if historico['proxima'] and st.button("Carregar mais", key=f"mais_{aba_id}_{aluno_info['id']}"):
+                pagina = repo.listar_historico_pagamentos(treinador_id, aluno_info['id'], historico['proxima'])
+                st.session_state.historico_detalhes = {
+                    "pagamentos": historico['pagamentos'] + pagina['pagamentos'],
+                    "proxima": pagina['proxima']
+                }
+                st.experimental_rerun()
+        with col2:
+            if st.button("Fechar histórico", key=f"fechar_{aba_id}_{aluno_info['id']}"):
+                del st.session_state.aluno_detalhes
+                del st.session_state.historico_detalhes
+                st.experimental_rerun()
     
     # Função auxiliar para exibir os cards de alunos
     def exibir_cards_alunos(alunos_filtrados, aba_id):
         if not alunos_filtrados:
             st.info(f"Nenhum aluno encontrado com este status.")
             return
-            
-        st.markdown("<style>"
-                  ".status-card {padding: 15px; margin-bottom: 10px; border-radius: 5px; box-shadow: 0 1px 3px rgba(0,0,0,0.1);}"
-                  ".status-pendente {border-left: 5px solid orange;}"
-                  ".status-pago {border-left: 5px solid green;}"
-                  ".status-atrasado {border-left: 5px solid red;}"
-                  "</style>", unsafe_allow_html=True)
         
         for i, aluno_info in enumerate(alunos_filtrados):
             pagamento = aluno_info['pagamento']
@@ -649,6 +340,8 @@ def pagina_dashboard():
             
             # Criar um identificador único para cada card
             card_id = f"{aba_id}_{aluno_info['id']}_{i}_{pagamento['status'].lower()}"
+            cor_status = "green" if pagamento['status'] == "Pago" else "orange" if pagamento['status'] == "Pendente" else "red"
+            pago_em = f" (Pago em: {pagamento['data_pagamento']})" if pagamento['status'] == "Pago" and pagamento['data_pagamento'] else ""
             
             st.markdown(f"<div class='status-card {status_class}'>"
                       f"<h4>{aluno_info['nome']}</h4>"
@@ -658,13 +351,13 @@ def pagina_dashboard():
                       f"</div>"
                       f"<div style='display:flex;justify-content:space-between;'>"
                       f"<div><strong>Vencimento Atual:</strong> {pagamento['data_vencimento']}</div>"
-                      f"<div><strong>Valor:</strong> R$ {aluno_info['valor_mensalidade']:.2f}</div>"
+                      f"<div><strong>Valor:</strong> {formatar_reais(aluno_info['mensalidade_centavos'])}</div>"
                       f"</div>"
                       f"<div style='display:flex;justify-content:space-between;align-items:center;margin-top:10px;'>"
                       f"<div><span style='font-weight:bold;color:"
-                      f"{"green" if pagamento['status'] == "Pago" else "orange" if pagamento['status'] == "Pendente" else "red"};'>"
+                      f"{cor_status};'>"
                       f"Status: {pagamento['status']}</span>"
-                      f"{f" (Pago em: {pagamento['data_pagamento']})" if pagamento['status'] == "Pago" and pagamento['data_pagamento'] else ""}"
+                      f"{pago_em}"
                       f"</div>"
                       f"<div>"
                       f"<a href='#'>Detalhes</a> | "
@@ -682,29 +375,13 @@ def pagina_dashboard():
             pago_key = f"pago_{aba_id}_{i}_{aluno_info['id']}_{pagamento['status'].lower()}"
             
             if st.button(f"Ver Detalhes", key=detalhe_key):
-                # Armazenar o ID do aluno para mostrar detalhes
+                # Armazenar o ID do aluno para mostrar detalhes; o histórico é carregado por páginas
                 st.session_state.aluno_detalhes = aluno_info['id']
-                # Aqui você poderia mostrar um modal com detalhes do histórico de pagamentos
-                st.markdown("### Histórico de Pagamentos")
-                c.execute('''
-                SELECT p.* FROM pagamentos p
-                WHERE p.aluno_id = ?
-                ORDER BY p.data_vencimento DESC
-                LIMIT 6
-                ''', (aluno_info['id'],))
-                historico = [dict(row) for row in c.fetchall()]
-                
-                if historico:
-                    for pgto in historico:
-                        cor_status = "green" if pgto['status'] == "Pago" else "orange" if pgto['status'] == "Pendente" else "red"
-                        st.markdown(f"<div style='padding:8px;margin-bottom:5px;border-left:3px solid {cor_status};'>"
-                                  f"<div><strong>Vencimento:</strong> {pgto['data_vencimento']}</div>"
-                                  f"<div><strong>Status:</strong> <span style='color:{cor_status}'>{pgto['status']}</span></div>"
-                                  f"{f"<div><strong>Data do Pagamento:</strong> {pgto['data_pagamento']}</div>" if pgto['data_pagamento'] else ""}"
-                                  f"<div><strong>Valor:</strong> R$ {pgto['valor']:.2f}</div>"
-                                  f"</div>", unsafe_allow_html=True)
-                else:
-                    st.info("Sem histórico de pagamentos disponível.")
+                st.session_state.historico_detalhes = repo.listar_historico_pagamentos(
+                    st.session_state.user['id'], aluno_info['id'])
+            
+            if st.session_state.get('aluno_detalhes') == aluno_info['id'] and 'historico_detalhes' in st.session_state:
+                exibir_historico(aluno_info, aba_id)
             
             if st.button(f"Editar", key=editar_key):
                 st.session_state.aluno_a_editar = aluno_info['id']
@@ -712,36 +389,152 @@ def pagina_dashboard():
                 st.experimental_rerun()
             
             if pagamento['status'] != "Pago" and st.button(f"Marcar como Pago", key=pago_key):
-                alterar_status_pagamento(pagamento['id'], "Pago")
+                repo.alterar_status_pagamento(st.session_state.user['id'], pagamento['id'], "Pago")
                 
                 # Armazenar informações para criar o próximo pagamento
                 st.session_state.ultimo_pagamento_registrado = {
                     'aluno_id': aluno_info['id'],
-                    'valor': pagamento['valor'],
+                    'valor_centavos': pagamento['valor_centavos'],
                     'data_vencimento': pagamento['data_vencimento']
                 }
                 
                 st.success(f"Pagamento de {aluno_info['nome']} registrado com sucesso!")
                 st.experimental_rerun()
     
-    # Exibir alunos em cada aba
-    with tabs[0]:  # Todos os alunos
-        if not alunos_com_pagamentos:
-            st.info("Nenhum aluno cadastrado. Adicione alunos na aba 'Cadastrar Aluno'.")
+    def exibir_acoes_em_lote(alunos_filtrados, aba_id):
+        # Alteração de status de vários alunos da página com um único commit e um único rerun
+        if 'resultado_lote' in st.session_state:
+            st.success(st.session_state.pop('resultado_lote'))
+        if not alunos_filtrados:
+            return
+        
+        pagamentos = {aluno_info['pagamento']['id']: aluno_info for aluno_info in alunos_filtrados}
+        with st.expander("Ações em lote"):
+            selecionados = st.multiselect(
+                "Alunos", list(pagamentos), key=f"lote_{aba_id}",
+                format_func=lambda pagamento_id: f"{pagamentos[pagamento_id]['nome']} - "
+                                                 f"vencimento {pagamentos[pagamento_id]['pagamento']['data_vencimento']}")
+            col1, col2 = st.columns(2)
+            with col1:
+                novo_status = st.selectbox("Novo status", STATUS_PAGAMENTO, key=f"lote_status_{aba_id}")
+            with col2:
+                criar_proximos = st.checkbox("Criar o próximo pagamento mensal", value=True,
+                                             key=f"lote_proximos_{aba_id}",
+                                             disabled=novo_status != "Pago")
+            
+            if st.button(f"Marcar {len(selecionados)} como {novo_status}", key=f"lote_aplicar_{aba_id}",
+                         disabled=not selecionados):
+                resultado = repo.alterar_status_pagamentos(
+                    st.session_state.user['id'], selecionados, novo_status,
+                    criar_proximos=criar_proximos and novo_status == "Pago")
+                mensagem = f"{resultado['alterados']} pagamentos marcados como {novo_status}."
+                if resultado['proximos']:
+                    mensagem += f" {resultado['proximos']} próximos pagamentos criados."
+                st.session_state.resultado_lote = mensagem
+                del st.session_state[f"lote_{aba_id}"]
+                st.experimental_rerun()
+    
+    # Busca por nome, email ou telefone (sem acentos, por prefixo)
+    termo_busca = st.text_input("🔍 Buscar aluno", placeholder="Nome, email ou telefone", key="busca_alunos")
+    if termo_busca.strip():
+        # Os cards exibem o último pagamento; alunos ainda sem pagamento ficam de fora
+        resultados = [aluno for aluno in repo.buscar_alunos(st.session_state.user['id'], termo_busca.strip())
+                      if aluno['pagamento']]
+        if not resultados:
+            st.info("Nenhum aluno encontrado.")
         else:
-            exibir_cards_alunos(alunos_com_pagamentos, "todos")
+            st.caption(f"{len(resultados)} alunos encontrados")
+            exibir_cards_alunos(resultados, "busca")
+        return
+    
+    # Apenas a visão selecionada é renderizada, uma página de cards por vez;
+    # o filtro por status e a paginação são feitos na consulta
+    abas = {
+        "Todos": (None, metricas['com_pagamento']),
+        "Pendentes": ("Pendente", metricas['pendentes']),
+        "Pagos": ("Pago", metricas['pagos']),
+        "Atrasados": ("Atrasado", metricas['atrasados']),
+    }
+    aba = st.radio("Status", list(abas), horizontal=True, key="aba_cards",
+                   format_func=lambda nome: f"{nome} ({abas[nome][1]})")
+    status_aba, total_aba = abas[aba]
+    
+    if aba == "Todos" and total_aba == 0:
+        st.info("Nenhum aluno cadastrado. Adicione alunos na aba 'Cadastrar Aluno'.")
+        return
+    
+    total_paginas = max(1, -(-total_aba // PAGINA_CARDS))
+    chave_pagina = f"pagina_cards_{aba.lower()}"
+    # A quantidade de páginas pode ter diminuído desde o último rerun
+    if chave_pagina not in st.session_state:
+        st.session_state[chave_pagina] = 1
+    elif st.session_state[chave_pagina] > total_paginas:
+        st.session_state[chave_pagina] = total_paginas
+    
+    pagina_atual = 1
+    if total_paginas > 1:
+        col1, col2 = st.columns([1, 4])
+        with col1:
+            # Valor inicial (1) e página corrigida definidos só pelo session_state, antes do widget
+            pagina_atual = st.number_input("Página", min_value=1, max_value=total_paginas,
+                                           step=1, key=chave_pagina)
+        with col2:
+            st.caption(f"{total_aba} alunos, página {pagina_atual} de {total_paginas}")
+    
+    alunos_pagina = repo.listar_alunos_por_status(st.session_state.user['id'], status_aba,
+                                             PAGINA_CARDS, (pagina_atual - 1) * PAGINA_CARDS)
+    exibir_acoes_em_lote(alunos_pagina, aba.lower())
+    exibir_cards_alunos(alunos_pagina, aba.lower())
+
+def pagina_relatorios():
+    st.title("Relatórios")
+    
+    # Verificar se o usuário está logado
+    if 'user' not in st.session_state or st.session_state.user is None:
+        st.error("Você precisa estar logado para acessar os relatórios.")
+        if st.button("Ir para o Login"):
+            st.session_state.pagina = "Login"
+            st.experimental_rerun()
+        return
     
-    with tabs[1]:  # Alunos com pagamentos pendentes
-        alunos_pendentes = [a for a in alunos_com_pagamentos if a['pagamento']['status'] == "Pendente"]
-        exibir_cards_alunos(alunos_pendentes, "pendentes")
+    # Recalcular apenas os meses do treinador alterados desde a última visita
+    repo.atualizar_resumo_mensal(treinador_id=st.session_state.user['id'])
     
-    with tabs[2]:  # Alunos com pagamentos pagos
-        alunos_pagos = [a for a in alunos_com_pagamentos if a['pagamento']['status'] == "Pago"]
-        exibir_cards_alunos(alunos_pagos, "pagos")
+    meses = st.slider("Meses", min_value=3, max_value=36, value=MESES_RELATORIO)
+    relatorio = repo.obter_relatorio(st.session_state.user['id'], meses, datetime.now().date())
+    mensal = pd.DataFrame(relatorio['mensal']).set_index("mes")
     
-    with tabs[3]:  # Alunos com pagamentos atrasados
-        alunos_atrasados = [a for a in alunos_com_pagamentos if a['pagamento']['status'] == "Atrasado"]
-        exibir_cards_alunos(alunos_atrasados, "atrasados")
+    # Totais somados sobre as colunas int64 de centavos; reais só na exibição
+    esperado = int(mensal['valor_esperado_centavos'].sum())
+    recebido = int(mensal['valor_recebido_centavos'].sum())
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Receita Esperada", formatar_reais(esperado))
+    with col2:
+        st.metric("Receita Recebida", formatar_reais(recebido))
+    with col3:
+        st.metric("Taxa de Recebimento", f"{recebido / esperado:.0%}" if esperado else "-")
+    
+    st.subheader("Receita mensal")
+    st.bar_chart(para_reais(mensal[['valor_esperado_centavos', 'valor_recebido_centavos']]).rename(
+        columns={"valor_esperado_centavos": "Esperada", "valor_recebido_centavos": "Recebida"}))
+    
+    st.subheader("Recebimento e atraso médio por mês")
+    st.dataframe(pd.DataFrame({
+        "Cobranças": mensal['cobrancas'],
+        "Esperada": mensal['valor_esperado_centavos'].map(formatar_reais),
+        "Recebida": mensal['valor_recebido_centavos'].map(formatar_reais),
+        "Taxa de Recebimento": mensal['taxa_recebimento'].map(lambda t: f"{t:.0%}" if pd.notna(t) else "-"),
+        "Atraso Médio (dias)": mensal['media_dias_atraso'].round(1),
+    }), use_container_width=True)
+    
+    st.subheader("Pagamentos em atraso por faixa")
+    atrasos = pd.DataFrame(relatorio['atrasos'])
+    st.dataframe(pd.DataFrame({
+        "Faixa (dias)": atrasos['faixa'],
+        "Pagamentos": atrasos['quantidade'],
+        "Valor": atrasos['valor_centavos'].map(formatar_reais),
+    }), use_container_width=True)
 
 def pagina_cadastro_aluno():
     st.title("Cadastrar Novo Aluno")
@@ -793,8 +586,8 @@ def pagina_cadastro_aluno():
                     data_pagamento_str = data_pagamento.strftime("%Y-%m-%d")
                     
                     # Chamando função modificada para adicionar aluno com status inicial
-                    aluno_id = adicionar_aluno_com_status(nome, email, telefone, data_pagamento_str, 
-                                             valor_mensalidade, st.session_state.user['id'], status_inicial)
+                    aluno_id = repo.adicionar_aluno_com_status(nome, email, telefone, data_pagamento_str, 
+                                             para_centavos(valor_mensalidade), st.session_state.user['id'], status_inicial)
                     if aluno_id:
                         st.success(f"Aluno {nome} cadastrado com sucesso!")
                         st.balloons()
@@ -805,6 +598,158 @@ def pagina_cadastro_aluno():
                     st.error(f"Erro ao cadastrar aluno: {str(e)}")
                     st.error("Verifique se você está logado corretamente.")
 
+def pagina_importar_alunos():
+    st.title("Importar Alunos")
+    
+    # Verificar se o usuário está logado
+    if 'user' not in st.session_state or st.session_state.user is None:
+        st.error("Você precisa estar logado para importar alunos.")
+        if st.button("Ir para o Login"):
+            st.session_state.pagina = "Login"
+            st.experimental_rerun()
+        return
+    
+    st.info("ℹ️ Envie um arquivo CSV ou XLSX com as colunas: " + ", ".join(COLUNAS_IMPORTACAO) +
+            " e, opcionalmente, status (Pendente, Pago ou Atrasado). "
+            "A data de vencimento (AAAA-MM-DD ou DD/MM/AAAA) define o dia fixo de vencimento mensal do aluno.")
+    
+    arquivo = st.file_uploader("Arquivo de alunos", type=["csv", "xlsx"])
+    separador = st.selectbox("Separador de colunas (CSV)", [",", ";"])
+    
+    if arquivo is not None and st.button("Importar"):
+        barra = st.progress(0.0)
+        total_estimado = max(arquivo.size // 60, 1)  # estimativa de linhas pelo tamanho do arquivo
+        
+        def progresso(processadas, importados):
+            barra.progress(min(processadas / total_estimado, 1.0))
+        
+        try:
+            resultado = repo.importar_alunos(arquivo, st.session_state.user['id'], nome_arquivo=arquivo.name,
+                                        separador=separador, progresso=progresso)
+        except Exception as e:
+            st.error(f"Erro ao importar arquivo: {str(e)}")
+            return
+        
+        barra.progress(1.0)
+        st.success(f"{resultado['importados']} alunos importados com sucesso!")
+        if resultado['erros']:
+            st.warning(f"{len(resultado['erros'])} linhas não foram importadas:")
+            st.dataframe(pd.DataFrame(resultado['erros']), use_container_width=True)
+
+def pagina_conciliacao():
+    st.title("Conciliação Bancária")
+    
+    # Verificar se o usuário está logado
+    if 'user' not in st.session_state or st.session_state.user is None:
+        st.error("Você precisa estar logado para conciliar extratos.")
+        if st.button("Ir para o Login"):
+            st.session_state.pagina = "Login"
+            st.experimental_rerun()
+        return
+    
+    treinador_id = st.session_state.user['id']
+    st.info("ℹ️ Envie o extrato da conta (OFX ou CSV com as colunas data, valor e descrição). "
+            "Os créditos são comparados por valor, data e nome do pagador com os pagamentos em aberto; "
+            "os que não puderem ser identificados com segurança ficam para revisão abaixo.")
+    
+    arquivo = st.file_uploader("Extrato bancário", type=["ofx", "csv"])
+    criar_proximos = st.checkbox("Criar o próximo pagamento mensal dos alunos quitados", value=True)
+    
+    if arquivo is not None and st.button("Conciliar"):
+        try:
+            totais = repo.importar_extrato(arquivo, treinador_id, nome_arquivo=arquivo.name,
+                                           criar_proximos=criar_proximos)
+        except Exception as e:
+            st.error(f"Erro ao ler o extrato: {str(e)}")
+            return
+        
+        st.success(f"{totais['creditos']} créditos lidos: {totais['conciliados']} pagamentos quitados, "
+                   f"{totais['revisar']} para revisar e {totais['sem_correspondencia']} sem correspondência.")
+        if totais['ja_importados']:
+            st.caption(f"{totais['ja_importados']} créditos já haviam sido importados e foram ignorados.")
+        if totais['erros']:
+            st.warning(f"{len(totais['erros'])} lançamentos não puderam ser lidos:")
+            st.dataframe(pd.DataFrame(totais['erros']), use_container_width=True)
+    
+    st.subheader("Créditos para revisar")
+    revisao = repo.listar_revisao(treinador_id)
+    if not revisao:
+        st.info("Nenhum crédito aguardando revisão.")
+        return
+    
+    for transacao in revisao:
+        with st.container():
+            st.markdown(f"**{transacao['data'][8:10]}/{transacao['data'][5:7]}/{transacao['data'][:4]}** - "
+                        f"{formatar_reais(transacao['valor_centavos'])} - {transacao['descricao']}")
+            candidatos = {p['id']: p for p in transacao['candidatos']}
+            col1, col2, col3 = st.columns([3, 1, 1])
+            with col1:
+                pagamento_id = st.selectbox(
+                    "Pagamento", list(candidatos), key=f"conciliar_{transacao['id']}",
+                    format_func=lambda p: f"{candidatos[p]['nome']} - vencimento {candidatos[p]['data_vencimento']}")
+            with col2:
+                if st.button("Confirmar", key=f"confirmar_{transacao['id']}", disabled=pagamento_id is None):
+                    if repo.confirmar_conciliacao(treinador_id, transacao['id'], pagamento_id,
+                                                  criar_proximo=criar_proximos):
+                        st.experimental_rerun()
+                    st.error("Não foi possível quitar este pagamento.")
+            with col3:
+                if st.button("Descartar", key=f"descartar_{transacao['id']}"):
+                    repo.descartar_conciliacao(treinador_id, transacao['id'])
+                    st.experimental_rerun()
+
+def pagina_exportar_dados():
+    st.title("Exportar Dados")
+    
+    # Verificar se o usuário está logado
+    if 'user' not in st.session_state or st.session_state.user is None:
+        st.error("Você precisa estar logado para exportar dados.")
+        if st.button("Ir para o Login"):
+            st.session_state.pagina = "Login"
+            st.experimental_rerun()
+        return
+    
+    tabela = st.selectbox("Dados", ["pagamentos", "alunos"],
+                          format_func=lambda t: "Histórico de pagamentos" if t == "pagamentos" else "Alunos")
+    formato = st.selectbox("Formato", FORMATOS_EXPORTACAO, format_func=str.upper)
+    
+    inicio = fim = status = None
+    if tabela == "pagamentos":
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            filtrar_periodo = st.checkbox("Filtrar por vencimento")
+        if filtrar_periodo:
+            with col2:
+                inicio = st.date_input("De", value=datetime.now().date().replace(month=1, day=1))
+            with col3:
+                fim = st.date_input("Até", value=datetime.now().date())
+            inicio, fim = inicio.strftime("%Y-%m-%d"), fim.strftime("%Y-%m-%d")
+        escolha = st.selectbox("Status", ["Todos", "Pago", "Pendente", "Atrasado"])
+        status = None if escolha == "Todos" else escolha
+    
+    if st.button("Gerar arquivo"):
+        # O arquivo é gravado em disco lote a lote, sem montar o resultado inteiro na memória.
+        # Limitação: o st.download_button só aceita o conteúdo inteiro (bytes), que fica na memória
+        # enquanto é exibido; para exportações muito grandes, use a linha de comando
+        # (python -m academia.exportacao).
+        with tempfile.TemporaryFile() as destino:
+            try:
+                total = repo.exportar(st.session_state.user['id'], tabela, formato, destino, inicio, fim, status)
+            except Exception as e:
+                st.error(f"Erro ao exportar: {str(e)}")
+                return
+            
+            destino.seek(0)
+            conteudo = destino.read()
+        
+        st.success(f"{total} linhas exportadas.")
+        st.download_button(
+            "Baixar arquivo",
+            data=conteudo,
+            file_name=f"{tabela}_{datetime.now().strftime('%Y%m%d')}.{formato}",
+            mime="text/csv" if formato == "csv" else "application/octet-stream",
+        )
+
 def pagina_notificacoes():
     st.title("Notificações de Pagamento")
     
@@ -818,71 +763,92 @@ def pagina_notificacoes():
     
     try:
         # Verificar pagamentos e gerar notificações
-        notificacoes = verificar_pagamentos()
+        treinador_id = st.session_state.user['id']
+        hoje = datetime.now().date()
+        notificacoes = repo.verificar_pagamentos(treinador_id, hoje)
+        # Mensagens de todas as notificações geradas de uma vez a partir dos modelos do treinador
+        mensagens = repo.montar_mensagens(treinador_id, notificacoes)
+        
+        # Envio em lote: todos os lembretes de hoje vão para a fila e são enviados em segundo plano
+        col1, col2 = st.columns([2, 3])
+        with col1:
+            canais = st.multiselect("Canais", CANAIS, default=["email"],
+                                    format_func=lambda c: "Email" if c == "email" else "WhatsApp")
+        with col2:
+            st.write("")
+            if st.button("Enviar todos os lembretes de hoje", disabled=not canais):
+                enfileirados = repo.enfileirar_lembretes_do_dia(treinador_id, canais, hoje)
+                st.success(f"{enfileirados} lembretes enfileirados para envio.")
+        situacao_envios = repo.resumo_envios(treinador_id)
+        if situacao_envios:
+            st.caption(" | ".join(f"{status}: {total}" for status, total in sorted(situacao_envios.items())))
+        
+        def enviar(notif, canal, mensagem):
+            # A mensagem enviada é a do campo de texto, que pode ter sido editada
+            if repo.enfileirar([envio_lembrete(treinador_id, notif, canal, mensagem, hoje)]):
+                st.success("Mensagem enfileirada para envio!")
+            else:
+                st.info("Este lembrete já foi enfileirado hoje.")
         
         tab1, tab2, tab3 = st.tabs(["Vencimentos em 3 dias", "Vencimentos Hoje", "Pagamentos Atrasados"])
         
         with tab1:
             if notificacoes["tres_dias"]:
-                for notif in notificacoes["tres_dias"]:
+                for notif, mensagem in zip(notificacoes["tres_dias"], mensagens["tres_dias"]):
                     with st.expander(f"{notif['nome']} - Vence em 3 dias"):
-                        st.write(f"**Valor:** R$ {notif['valor']:.2f}")
-                        st.write(f"**Data de Vencimento:** {datetime.strptime(notif['data_vencimento'], '%Y-%m-%d').strftime('%d/%m/%Y')}")
+                        st.write(f"**Valor:** {formatar_reais(notif['valor_centavos'])}")
+                        st.write(f"**Data de Vencimento:** {notif['vencimento']}")
                         st.write(f"**Contato:** {notif['email']} | {notif['telefone']}")
                         
-                        mensagem = f"Olá {notif['nome']}, este é um lembrete de que sua mensalidade no valor de R$ {notif['valor']:.2f} vence em 3 dias ({datetime.strptime(notif['data_vencimento'], '%Y-%m-%d').strftime('%d/%m/%Y')}). Obrigado!"
-                        st.text_area("Mensagem para enviar", mensagem, key=f"msg_3d_{notif['id']}")
+                        mensagem = st.text_area("Mensagem para enviar", mensagem, key=f"msg_3d_{notif['id']}")
                         
                         col1, col2 = st.columns(2)
                         with col1:
                             if st.button("Enviar Email", key=f"email_3d_{notif['id']}"):
-                                st.success("Simulação: Email enviado com sucesso!")
+                                enviar(notif, "email", mensagem)
                         with col2:
                             if st.button("Enviar WhatsApp", key=f"whats_3d_{notif['id']}"):
-                                st.success("Simulação: Mensagem de WhatsApp enviada com sucesso!")
+                                enviar(notif, "whatsapp", mensagem)
             else:
                 st.info("Não há pagamentos vencendo em 3 dias.")
         
         with tab2:
             if notificacoes["hoje"]:
-                for notif in notificacoes["hoje"]:
+                for notif, mensagem in zip(notificacoes["hoje"], mensagens["hoje"]):
                     with st.expander(f"{notif['nome']} - Vence hoje"):
-                        st.write(f"**Valor:** R$ {notif['valor']:.2f}")
-                        st.write(f"**Data de Vencimento:** {datetime.strptime(notif['data_vencimento'], '%Y-%m-%d').strftime('%d/%m/%Y')}")
+                        st.write(f"**Valor:** {formatar_reais(notif['valor_centavos'])}")
+                        st.write(f"**Data de Vencimento:** {notif['vencimento']}")
                         st.write(f"**Contato:** {notif['email']} | {notif['telefone']}")
                         
-                        mensagem = f"Olá {notif['nome']}, sua mensalidade no valor de R$ {notif['valor']:.2f} vence hoje ({datetime.strptime(notif['data_vencimento'], '%Y-%m-%d').strftime('%d/%m/%Y')}). Por favor, realize o pagamento. Obrigado!"
-                        st.text_area("Mensagem para enviar", mensagem, key=f"msg_h_{notif['id']}")
+                        mensagem = st.text_area("Mensagem para enviar", mensagem, key=f"msg_h_{notif['id']}")
                         
                         col1, col2 = st.columns(2)
                         with col1:
                             if st.button("Enviar Email", key=f"email_h_{notif['id']}"):
-                                st.success("Simulação: Email enviado com sucesso!")
+                                enviar(notif, "email", mensagem)
                         with col2:
                             if st.button("Enviar WhatsApp", key=f"whats_h_{notif['id']}"):
-                                st.success("Simulação: Mensagem de WhatsApp enviada com sucesso!")
+                                enviar(notif, "whatsapp", mensagem)
             else:
                 st.info("Não há pagamentos vencendo hoje.")
         
         with tab3:
             if notificacoes["atrasados"]:
-                for notif in notificacoes["atrasados"]:
+                for notif, mensagem in zip(notificacoes["atrasados"], mensagens["atrasados"]):
                     with st.expander(f"{notif['nome']} - ATRASADO"):
-                        st.write(f"**Valor:** R$ {notif['valor']:.2f}")
-                        st.write(f"**Data de Vencimento:** {datetime.strptime(notif['data_vencimento'], '%Y-%m-%d').strftime('%d/%m/%Y')}")
+                        st.write(f"**Valor:** {formatar_reais(notif['valor_centavos'])}")
+                        st.write(f"**Data de Vencimento:** {notif['vencimento']}")
                         st.write(f"**Contato:** {notif['email']} | {notif['telefone']}")
                         
-                        dias_atraso = notif['dias_atraso']
-                        mensagem = f"Olá {notif['nome']}, sua mensalidade no valor de R$ {notif['valor']:.2f} está atrasada há {dias_atraso} dias. Por favor, entre em contato para regularizar sua situação. Obrigado!"
-                        st.text_area("Mensagem para enviar", mensagem, key=f"msg_a_{notif['id']}")
+                        mensagem = st.text_area("Mensagem para enviar", mensagem, key=f"msg_a_{notif['id']}")
                         
                         col1, col2 = st.columns(2)
                         with col1:
                             if st.button("Enviar Email", key=f"email_a_{notif['id']}"):
-                                st.success("Simulação: Email enviado com sucesso!")
+                                enviar(notif, "email", mensagem)
                         with col2:
                             if st.button("Enviar WhatsApp", key=f"whats_a_{notif['id']}"):
-                                st.success("Simulação: Mensagem de WhatsApp enviada com sucesso!")
+                                enviar(notif, "whatsapp", mensagem)
             else:
                 st.info("Não há pagamentos atrasados.")
     except Exception as e:
@@ -895,16 +861,12 @@ def pagina_configuracoes():
     st.subheader("Dados do Treinador")
     
     # Obter dados atuais do usuário
-    conn = sqlite3.connect('academia.db')
-    c = conn.cursor()
-    c.execute("SELECT nome, email FROM treinadores WHERE id = ?", (st.session_state.user['id'],))
-    treinador = c.fetchone()
-    conn.close()
+    treinador = repo.obter_treinador(st.session_state.user['id'])
     
     if treinador:
         with st.form("form_config_treinador"):
-            nome = st.text_input("Nome", value=treinador[0])
-            email = st.text_input("Email", value=treinador[1], disabled=True)
+            nome = st.text_input("Nome", value=treinador['nome'])
+            email = st.text_input("Email", value=treinador['email'], disabled=True)
             senha_atual = st.text_input("Senha Atual", type="password")
             nova_senha = st.text_input("Nova Senha (deixe em branco para manter a atual)", type="password")
             
@@ -912,36 +874,37 @@ def pagina_configuracoes():
             
             if submitted:
                 if senha_atual:
-                    # Verificar senha atual
-                    conn = sqlite3.connect('academia.db')
-                    c = conn.cursor()
-                    c.execute("SELECT senha FROM treinadores WHERE id = ?", (st.session_state.user['id'],))
-                    senha_hash = c.fetchone()[0]
-                    
-                    if check_password(senha_atual, senha_hash):
-                        # Atualizar dados
-                        if nova_senha:
-                            nova_senha_hash = hash_password(nova_senha)
-                            c.execute("UPDATE treinadores SET nome = ?, senha = ? WHERE id = ?", 
-                                     (nome, nova_senha_hash, st.session_state.user['id']))
-                        else:
-                            c.execute("UPDATE treinadores SET nome = ? WHERE id = ?", 
-                                     (nome, st.session_state.user['id']))
-                        
-                        conn.commit()
+                    # Verificar a senha atual e atualizar os dados
+                    if roteador.atualizar_treinador(st.session_state.user['id'], nome, senha_atual, nova_senha):
                         st.success("Dados atualizados com sucesso!")
                         
                         # Atualizar sessão
                         st.session_state.user['nome'] = nome
                     else:
                         st.error("Senha atual incorreta!")
-                    
-                    conn.close()
                 else:
                     st.error("Digite sua senha atual para confirmar as alterações.")
     
     st.subheader("Configurações de Notificação")
-    st.info("Em uma versão futura, você poderá configurar modelos de mensagens e integrações com serviços de email e WhatsApp.")
+    st.info("Modelos das mensagens de lembrete. Campos disponíveis: "
+            + ", ".join("{" + campo + "}" for campo in CAMPOS_MODELO))
+    
+    titulos = {"tres_dias": "Vencimento em 3 dias", "hoje": "Vencimento hoje", "atrasados": "Pagamento atrasado"}
+    modelos = repo.obter_modelos(st.session_state.user['id'])
+    with st.form("form_modelos_mensagem"):
+        textos = {tipo: st.text_area(titulos[tipo], modelos[tipo], key=f"modelo_{tipo}") for tipo in MODELOS_PADRAO}
+        
+        if st.form_submit_button("Salvar Modelos"):
+            erros = {tipo: validar_modelo(texto) for tipo, texto in textos.items()}
+            if any(erros.values()):
+                for tipo, erro in erros.items():
+                    if erro:
+                        st.error(f"{titulos[tipo]}: {erro}")
+            else:
+                for tipo, texto in textos.items():
+                    if texto != modelos[tipo]:
+                        repo.salvar_modelo(st.session_state.user['id'], tipo, texto)
+                st.success("Modelos de mensagem atualizados com sucesso!")
 
 def pagina_editar_aluno():
     st.title("Editar Aluno")
@@ -976,7 +939,7 @@ def pagina_editar_aluno():
         with col2:
             valor_mensalidade = st.number_input("Valor da Mensalidade (R$)", 
                                               min_value=0.0, 
-                                              value=float(aluno['valor_mensalidade']),
+                                              value=para_reais(aluno['mensalidade_centavos']),
                                               step=10.0,
                                               format="%.2f")
         
@@ -1000,8 +963,8 @@ def pagina_editar_aluno():
                     data_pagamento_str = data_pagamento.strftime("%Y-%m-%d")
                     
                     # Atualizar dados do aluno
-                    sucesso = atualizar_aluno(aluno['id'], nome, email, telefone, 
-                                             data_pagamento_str, valor_mensalidade)
+                    sucesso = repo.atualizar_aluno(aluno['id'], nome, email, telefone, 
+                                             data_pagamento_str, para_centavos(valor_mensalidade))
                     
                     if sucesso:
                         st.success(f"Dados do aluno {nome} atualizados com sucesso!")
@@ -1015,31 +978,67 @@ def pagina_editar_aluno():
                     st.error(f"Erro ao atualizar aluno: {str(e)}")
                     st.error("Verifique se você está logado corretamente.")
 
+# Painel de perfil do modo de desenvolvimento: comandos SQL e tempo total do rerun
+def exibir_painel_perfil(registro):
+    with st.sidebar.expander("Perfil da execução"):
+        st.write(f"**Página:** {registro.pagina}")
+        st.write(f"**Tempo total:** {registro.duracao_ms:.1f} ms")
+        st.write(f"**Comandos SQL:** {len(registro.comandos)} ({registro.duracao_sql_ms:.1f} ms)")
+        
+        resumo = registro.resumo()
+        if resumo:
+            st.dataframe(pd.DataFrame(resumo), use_container_width=True)
+        
+        st.download_button("Exportar (JSON lines)", registro.como_jsonl(),
+                           file_name="perfil.jsonl", mime="application/json")
+
 # Aplicativo principal
 def main():
-    # Verificar pagamentos
-    verificar_pagamentos()
+    global repo
+    # Atualização de pagamentos atrasados em segundo plano
+    iniciar_agendador_atrasos()
+    # Envio das mensagens enfileiradas em segundo plano
+    iniciar_despachante_envios()
+    
+    # Registrar os comandos SQL e o tempo de todo o rerun apenas em desenvolvimento ou quando o
+    # perfil for exportado; sem registro ativo, as conexões apenas repassam os comandos
+    perfil = registrar_execucao("Login") if DEV_MODE or PERFIL_JSONL else nullcontext()
+    with perfil as registro:
+        # Mostrar página correspondente
+        if not st.session_state.logged_in:
+            pagina_login()
+        else:
+            # Se estiver no modo de desenvolvimento, mostrar um indicador
+            if DEV_MODE:
+                st.sidebar.warning("MODO DE DESENVOLVIMENTO - Login automático")
+            
+            pagina = sidebar()
+            if registro is not None:
+                registro.pagina = pagina
+            if st.session_state.user is not None:
+                repo = roteador.repositorio(st.session_state.user['id'])
+            
+            if pagina == "Dashboard":
+                pagina_dashboard()
+            elif pagina == "Relatórios":
+                pagina_relatorios()
+            elif pagina == "Cadastrar Aluno":
+                pagina_cadastro_aluno()
+            elif pagina == "Importar Alunos":
+                pagina_importar_alunos()
+            elif pagina == "Conciliação Bancária":
+                pagina_conciliacao()
+            elif pagina == "Exportar Dados":
+                pagina_exportar_dados()
+            elif pagina == "Notificações":
+                pagina_notificacoes()
+            elif pagina == "Configurações":
+                pagina_configuracoes()
+            elif pagina == "Editar Aluno" and 'aluno_id' in st.session_state:
+                pagina_editar_aluno()
     
-    # Mostrar página correspondente
-    if not st.session_state.logged_in:
-        pagina_login()
-    else:
-        # Se estiver no modo de desenvolvimento, mostrar um indicador
-        if DEV_MODE:
-            st.sidebar.warning("MODO DE DESENVOLVIMENTO - Login automático")
-        
-        pagina = sidebar()
-        
-        if pagina == "Dashboard":
-            pagina_dashboard()
-        elif pagina == "Cadastrar Aluno":
-            pagina_cadastro_aluno()
-        elif pagina == "Notificações":
-            pagina_notificacoes()
-        elif pagina == "Configurações":
-            pagina_configuracoes()
-        elif pagina == "Editar Aluno" and 'aluno_id' in st.session_state:
-            pagina_editar_aluno()
+    if DEV_MODE:
+        exibir_painel_perfil(registro)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,124 @@
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+from datetime import date
+
+from academia import banco, dados
+from benchmarks.gerar_dados import gerar_banco
+from academia.faturamento import gerar_cobrancas, mes_seguinte
+from academia.instrumentacao import registrar_execucao
+
+# Tamanhos padrão (total de alunos) e alunos por treinador
+TAMANHOS = [1000, 10000, 100000]
+ALUNOS_POR_TREINADOR = 2000
+
+def _percentil(valores, p):
+    ordenados = sorted(valores)
+    indice = min(len(ordenados) - 1, max(0, round(p / 100 * len(ordenados)) - 1))
+    return ordenados[indice]
+
+def medir(nome, funcao, repeticoes):
+    # Executa a função `repeticoes` vezes; funcao recebe o número da repetição
+    tempos = []
+    comandos = 0
+    for i in range(repeticoes):
+        with registrar_execucao(nome, arquivo=None) as registro:
+            funcao(i)
+        tempos.append(registro.duracao_ms)
+        comandos += len(registro.comandos)
+    return {
+        "funcao": nome,
+        "repeticoes": repeticoes,
+        "p50_ms": _percentil(tempos, 50),
+        "p95_ms": _percentil(tempos, 95),
+        "p99_ms": _percentil(tempos, 99),
+        "media_ms": statistics.fmean(tempos),
+        "comandos_por_execucao": comandos / repeticoes,
+    }
+
+def montar_dashboard(treinador_id):
+    # Mesma montagem de dados feita por pagina_dashboard, sem o Streamlit
+    metricas = dados.obter_metricas.__wrapped__(treinador_id)
+    painel = dados.obter_painel_alunos.__wrapped__(treinador_id, date.today())
+    tabela = painel['tabela']
+    por_status = {status: grupo for status, grupo in tabela.groupby('pag_status')}
+    return metricas, por_status
+
+def executar_cenario(caminho, total_alunos, alunos_por_treinador, meses, repeticoes):
+    # Arredondado para cima: o último treinador fica com o resto, e o total gerado é o pedido
+    treinadores = max(1, -(-total_alunos // alunos_por_treinador))
+    inicio = time.perf_counter()
+    totais = gerar_banco(caminho, treinadores, min(total_alunos, alunos_por_treinador), meses,
+                         total_alunos=total_alunos)
+    geracao_s = time.perf_counter() - inicio
+
+    banco.usar_banco(caminho)
+    hoje = date.today()
+    treinador_id = 1
+    with banco.leitura() as conn:
+        alunos = [dict(row) for row in conn.execute(
+            "SELECT id, mensalidade_centavos FROM alunos WHERE treinador_id = ? ORDER BY id", (treinador_id,))]
+
+    def proximo(i):
+        aluno = alunos[i % len(alunos)]
+        ultimo = dados.obter_status_pagamento(aluno['id'])
+        dados.criar_proximo_pagamento(aluno['id'], aluno['mensalidade_centavos'], ultimo['data_vencimento'])
+
+    # Funções com cache são medidas sem ele (__wrapped__), como na primeira leitura após uma escrita
+    resultados = [
+        medir("listar_alunos", lambda i: dados.listar_alunos.__wrapped__(treinador_id), repeticoes),
+        medir("obter_metricas", lambda i: dados.obter_metricas.__wrapped__(treinador_id), repeticoes),
+        medir("obter_painel_alunos", lambda i: dados.obter_painel_alunos.__wrapped__(treinador_id), repeticoes),
+        medir("pagina_dashboard (dados)", lambda i: montar_dashboard(treinador_id), repeticoes),
+        medir("buscar_alunos", lambda i: dados.buscar_alunos.__wrapped__(treinador_id, ["joao", "ana sil", "silva"][i % 3]),
+              repeticoes),
+        medir("verificar_pagamentos", lambda i: dados.verificar_pagamentos.__wrapped__(treinador_id, hoje),
+              repeticoes),
+        medir("listar_historico_pagamentos",
+              lambda i: dados.listar_historico_pagamentos.__wrapped__(treinador_id, alunos[i % len(alunos)]['id']),
+              repeticoes),
+        medir("criar_proximo_pagamento", proximo, repeticoes),
+        medir("atualizar_pagamentos_atrasados", lambda i: dados.atualizar_pagamentos_atrasados(hoje), repeticoes),
+        medir("gerar_cobrancas (treinador)", lambda i: gerar_cobrancas(treinador_id, mes_seguinte(hoje)), 1),
+    ]
+    for resultado in resultados:
+        resultado.update({"alunos": totais["alunos"], "pagamentos": totais["pagamentos"]})
+    return {"alunos": totais["alunos"], "pagamentos": totais["pagamentos"],
+            "geracao_s": geracao_s, "resultados": resultados}
+
+def _imprimir(cenario):
+    print(f"\n== {cenario['alunos']} alunos, {cenario['pagamentos']} pagamentos "
+          f"(gerado em {cenario['geracao_s']:.1f}s)")
+    print(f"{'função':<32}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'comandos':>10}")
+    for r in cenario["resultados"]:
+        print(f"{r['funcao']:<32}{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}{r['p99_ms']:>10.2f}"
+              f"{r['comandos_por_execucao']:>10.1f}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mede o desempenho das funções de dados em bancos sintéticos.")
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=TAMANHOS, help="total de alunos por cenário")
+    parser.add_argument("--alunos-por-treinador", type=int, default=ALUNOS_POR_TREINADOR)
+    parser.add_argument("--meses", type=int, default=12, help="meses de histórico de pagamentos")
+    parser.add_argument("--repeticoes", type=int, default=20)
+    parser.add_argument("--diretorio", default=tempfile.gettempdir(), help="onde criar os bancos temporários")
+    parser.add_argument("--json", help="grava os resultados em JSON lines neste arquivo")
+    args = parser.parse_args(argv)
+
+    cenarios = []
+    for tamanho in args.tamanhos:
+        caminho = os.path.join(args.diretorio, f"academia-bench-{tamanho}.db")
+        cenario = executar_cenario(caminho, tamanho, args.alunos_por_treinador, args.meses, args.repeticoes)
+        _imprimir(cenario)
+        cenarios.append(cenario)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as arquivo:
+            for cenario in cenarios:
+                for resultado in cenario["resultados"]:
+                    arquivo.write(json.dumps(resultado, ensure_ascii=False) + "\n")
+
+if __name__ == "__main__":
+    main()
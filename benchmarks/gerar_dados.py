@@ -0,0 +1,115 @@
+import argparse
+import os
+import random
+from datetime import date, timedelta
+
+from academia.banco import conexao, fechar_conexoes, init_db
+from academia.dados import hash_password
+from academia.faturamento import somar_meses, vencimento_no_mes
+
+NOMES = ["Ana", "Bruno", "Carla", "Daniel", "Eduarda", "Felipe", "Gabriela", "Henrique", "Isabela",
+         "João", "Larissa", "Marcos", "Natália", "Otávio", "Paula", "Rafael", "Sofia", "Thiago",
+         "Vitória", "William"]
+SOBRENOMES = ["Silva", "Santos", "Oliveira", "Souza", "Rodrigues", "Ferreira", "Alves", "Pereira",
+              "Lima", "Gomes", "Costa", "Ribeiro", "Martins", "Carvalho", "Araújo", "Melo"]
+# Em centavos
+MENSALIDADES = [12000, 15000, 18000, 20000, 24000, 30000, 36000, 40000]
+
+# Tamanho dos lotes de inserção
+LOTE = 50000
+
+def _inserir_em_lotes(conn, sql, linhas):
+    for inicio in range(0, len(linhas), LOTE):
+        conn.executemany(sql, linhas[inicio:inicio + LOTE])
+
+def gerar_banco(caminho, treinadores=1, alunos_por_treinador=1000, meses=12, semente=42, hoje=None,
+                total_alunos=None):
+    # Gera um banco de dados sintético e determinístico (para a mesma semente e data de referência).
+    # Com total_alunos, gera exatamente esse número de alunos: o último treinador fica com o resto.
+    if total_alunos is None:
+        total_alunos = treinadores * alunos_por_treinador
+    hoje = hoje or date.today()
+    rng = random.Random(semente)
+
+    fechar_conexoes()
+    for sufixo in ("", "-wal", "-shm"):
+        if os.path.exists(caminho + sufixo):
+            os.remove(caminho + sufixo)
+    init_db(caminho)
+
+    senha = hash_password("senha")
+    linhas_treinadores = [(t, f"Treinador {t}", f"treinador{t}@exemplo.com", senha)
+                          for t in range(1, treinadores + 1)]
+
+    linhas_alunos = []
+    linhas_pagamentos = []
+    aluno_id = 0
+    pagamento_id = 0
+    for treinador_id in range(1, treinadores + 1):
+        for _ in range(min(alunos_por_treinador, total_alunos - aluno_id)):
+            aluno_id += 1
+            nome = f"{rng.choice(NOMES)} {rng.choice(SOBRENOMES)} {rng.choice(SOBRENOMES)}"
+            email = f"aluno{aluno_id}@exemplo.com"
+            telefone = f"51 9{rng.randint(1000, 9999)}-{rng.randint(1000, 9999)}"
+            dia_vencimento = rng.randint(1, 31)
+            valor = rng.choice(MENSALIDADES)
+            # Alunos entram em meses diferentes; no máximo `meses` de histórico
+            meses_aluno = rng.randint(1, meses)
+            ano_inicio, mes_inicio = somar_meses(hoje.year, hoje.month, 1 - meses_aluno)
+            primeiro_vencimento = vencimento_no_mes(ano_inicio, mes_inicio, dia_vencimento)
+            linhas_alunos.append((aluno_id, nome, email, telefone,
+                                  primeiro_vencimento.strftime("%Y-%m-%d"),
+                                  primeiro_vencimento.strftime("%Y-%m-%d"),
+                                  dia_vencimento, valor, treinador_id))
+
+            for i in range(meses_aluno):
+                ano, mes = somar_meses(ano_inicio, mes_inicio, i)
+                vencimento = vencimento_no_mes(ano, mes, dia_vencimento)
+                data_pagamento = None
+                if vencimento > hoje:
+                    status = "Pendente"
+                elif rng.random() < 0.85:
+                    status = "Pago"
+                    data_pagamento = min(vencimento + timedelta(days=rng.randint(-5, 15)), hoje)
+                    data_pagamento = data_pagamento.strftime("%Y-%m-%d")
+                elif rng.random() < 0.5:
+                    status = "Pendente"
+                else:
+                    status = "Atrasado"
+                pagamento_id += 1
+                linhas_pagamentos.append((pagamento_id, vencimento.strftime("%Y-%m-%d"),
+                                          data_pagamento, valor, status, aluno_id))
+
+    with conexao(caminho) as conn:
+        conn.executemany("INSERT INTO treinadores (id, nome, email, senha) VALUES (?, ?, ?, ?)",
+                         linhas_treinadores)
+        _inserir_em_lotes(conn, '''
+        INSERT INTO alunos (id, nome, email, telefone, data_inicio, data_pagamento, dia_vencimento,
+                            mensalidade_centavos, treinador_id)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', linhas_alunos)
+        _inserir_em_lotes(conn, '''
+        INSERT INTO pagamentos (id, data_vencimento, data_pagamento, valor_centavos, status, aluno_id)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ''', linhas_pagamentos)
+        conn.execute("ANALYZE")
+
+    return {"treinadores": treinadores, "alunos": aluno_id, "pagamentos": pagamento_id}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gera um banco de dados sintético para testes de desempenho.")
+    parser.add_argument("caminho", help="arquivo do banco a ser criado (será sobrescrito)")
+    parser.add_argument("--treinadores", type=int, default=1)
+    parser.add_argument("--alunos-por-treinador", type=int, default=1000)
+    parser.add_argument("--total-alunos", type=int, help="total de alunos (o último treinador fica com o resto)")
+    parser.add_argument("--meses", type=int, default=12, help="meses de histórico de pagamentos")
+    parser.add_argument("--semente", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    totais = gerar_banco(args.caminho, args.treinadores, args.alunos_por_treinador, args.meses, args.semente,
+                         total_alunos=args.total_alunos)
+    print(f"{totais['treinadores']} treinadores, {totais['alunos']} alunos, "
+          f"{totais['pagamentos']} pagamentos gerados em {args.caminho}")
+
+if __name__ == "__main__":
+    main()
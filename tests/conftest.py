@@ -0,0 +1,34 @@
+import os
+import shutil
+import sqlite3
+
+import pytest
+
+from academia.banco import fechar_conexoes
+from academia.repositorio import Repositorio
+
+# Banco distribuído com o projeto, no schema anterior às migrações (user_version 0)
+BANCO_ORIGINAL = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "academia.db")
+
+@pytest.fixture(autouse=True)
+def _fechar_conexoes():
+    yield
+    fechar_conexoes()
+
+@pytest.fixture
+def repo():
+    conn = sqlite3.connect(":memory:")
+    yield Repositorio(conn)
+    conn.close()
+
+@pytest.fixture
+def banco_original(tmp_path):
+    # Cópia do banco distribuído, para que as migrações não alterem o arquivo do repositório
+    caminho = str(tmp_path / "academia.db")
+    shutil.copy(BANCO_ORIGINAL, caminho)
+    return caminho
+
+@pytest.fixture
+def treinador(repo):
+    repo.register_user("Treinador", "treinador@exemplo.com", "senha")
+    return repo.authenticate_user("treinador@exemplo.com", "senha")["id"]
@@ -0,0 +1,39 @@
+import importlib
+from unittest import mock
+
+import pytest
+import streamlit as st
+
+from academia.banco import DB_PATH, usar_banco
+from academia.repositorio import Repositorio
+
+class Sessao(dict):
+    # st.session_state sem um servidor do Streamlit (modo "bare", onde as gravações são descartadas)
+    __getattr__ = dict.__getitem__
+    __setattr__ = dict.__setitem__
+
+@pytest.fixture(scope="module")
+def app(tmp_path_factory):
+    # O app cria o roteador ao ser importado, no banco atual
+    usar_banco(str(tmp_path_factory.mktemp("app") / "academia.db"))
+    try:
+        yield importlib.import_module("app")
+    finally:
+        usar_banco(DB_PATH)
+
+def test_exportar_dados(app, tmp_path, monkeypatch):
+    repo = Repositorio(str(tmp_path / "academia.db"))
+    repo.register_user("Treinador", "treinador@exemplo.com", "senha")
+    treinador = repo.authenticate_user("treinador@exemplo.com", "senha")["id"]
+    repo.adicionar_aluno("Ana", "ana@exemplo.com", "1", "2026-01-10", 15000, treinador)
+    monkeypatch.setattr(app, "repo", repo)
+
+    with mock.patch.object(st, "session_state", Sessao(user={"id": treinador})), \
+            mock.patch.object(st, "button", return_value=True), \
+            mock.patch.object(st, "error", side_effect=AssertionError), \
+            mock.patch.object(st, "download_button", wraps=st.download_button) as download_button:
+        app.pagina_exportar_dados()
+
+    linhas = download_button.call_args.kwargs["data"].decode().splitlines()
+    assert linhas[0] == "id,aluno_id,aluno_nome,data_vencimento,data_pagamento,valor_centavos,status"
+    assert len(linhas) == 2
@@ -0,0 +1,51 @@
+import threading
+import time
+from datetime import date
+
+from academia import dados
+from academia.repositorio import Repositorio
+
+def _treinador_com_aluno(repo, nome):
+    repo.register_user(nome, f"{nome.lower()}@exemplo.com", "senha")
+    treinador = repo.authenticate_user(f"{nome.lower()}@exemplo.com", "senha")["id"]
+    aluno = repo.adicionar_aluno(f"Aluno {nome}", f"aluno.{nome.lower()}@exemplo.com", "1", "2026-01-10", 15000,
+                                 treinador)
+    return treinador, aluno
+
+def test_atrasos_apenas_do_treinador(repo, monkeypatch):
+    monkeypatch.setattr(dados, "LOTE_ATRASOS", 1)
+    um, aluno_um = _treinador_com_aluno(repo, "Um")
+    dois, aluno_dois = _treinador_com_aluno(repo, "Dois")
+    repo.gerar_cobrancas(um, date(2026, 2, 1))
+
+    # Vencimentos de janeiro e fevereiro, atualizados em lotes de um pagamento
+    assert repo.atualizar_pagamentos_atrasados(date(2026, 3, 1), um) == 2
+    assert repo.obter_status_pagamento(aluno_um)["status"] == "Atrasado"
+    assert repo.obter_status_pagamento(aluno_dois)["status"] == "Pendente"
+    # Pode ser executada novamente sem alterar nada
+    assert repo.atualizar_pagamentos_atrasados(date(2026, 3, 1), um) == 0
+
+def test_atrasos_no_dia_do_vencimento(repo):
+    _, aluno = _treinador_com_aluno(repo, "Um")
+    assert repo.atualizar_pagamentos_atrasados(date(2026, 1, 10)) == 0
+    assert repo.atualizar_pagamentos_atrasados(date(2026, 1, 11)) == 1
+    assert repo.obter_status_pagamento(aluno)["status"] == "Atrasado"
+
+def test_agendador_atualiza_e_para(tmp_path):
+    banco = str(tmp_path / "academia.db")
+    repo = Repositorio(banco)
+    _, aluno = _treinador_com_aluno(repo, "Um")
+
+    parar = threading.Event()
+    agendador = threading.Thread(target=repo.executar_agendador_atrasos, args=(parar,))
+    agendador.start()
+    try:
+        for _ in range(100):
+            if repo.obter_status_pagamento(aluno)["status"] == "Atrasado":
+                break
+            time.sleep(0.05)
+    finally:
+        parar.set()
+        agendador.join(5)
+    assert not agendador.is_alive()
+    assert repo.obter_status_pagamento(aluno)["status"] == "Atrasado"
@@ -0,0 +1,28 @@
+import sqlite3
+
+import pytest
+
+from academia.banco import conexao, init_db, leitura
+
+def test_conexao_de_escrita_em_wal(tmp_path):
+    banco = str(tmp_path / "academia.db")
+    init_db(banco)
+    with conexao(banco) as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+def test_leitura_somente_leitura(tmp_path):
+    banco = str(tmp_path / "academia.db")
+    init_db(banco)
+    with leitura(banco) as conn:
+        with pytest.raises(sqlite3.OperationalError, match="readonly"):
+            conn.execute("INSERT INTO treinadores (nome, email, senha) VALUES ('x', 'x@exemplo.com', 'x')")
+
+def test_conexao_reaproveitada_do_pool(tmp_path):
+    banco = str(tmp_path / "academia.db")
+    init_db(banco)
+    with leitura(banco) as primeira:
+        pass
+    with leitura(banco) as segunda:
+        assert segunda is primeira
+    with conexao(banco) as escrita:
+        assert escrita is not primeira
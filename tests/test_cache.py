@@ -0,0 +1,54 @@
+import os
+import subprocess
+import sys
+from datetime import date
+
+from academia import banco
+from academia.banco import cache_por_treinador, usando
+from academia.repositorio import Repositorio
+
+def test_escrita_de_outro_processo_invalida_cache(tmp_path):
+    caminho = str(tmp_path / "academia.db")
+    repo = Repositorio(caminho)
+    repo.register_user("Treinador", "treinador@exemplo.com", "senha")
+    treinador = repo.authenticate_user("treinador@exemplo.com", "senha")["id"]
+    repo.adicionar_aluno("Ana", "ana@exemplo.com", "1", "2026-01-10", 15000, treinador)
+    assert [a["nome"] for a in repo.listar_alunos(treinador)] == ["Ana"]
+    assert repo.obter_metricas(treinador)["total_alunos"] == 1
+
+    # Mesma gravação feita por uma CLI ou pela tarefa noturna, que não passam por este processo
+    script = (
+        "import sys\n"
+        "from academia.repositorio import Repositorio\n"
+        "repo = Repositorio(sys.argv[1])\n"
+        "repo.adicionar_aluno('Bia', 'bia@exemplo.com', '2', '2026-01-15', 20000, int(sys.argv[2]))\n"
+    )
+    subprocess.run([sys.executable, "-c", script, caminho, str(treinador)], check=True,
+                   cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    assert [a["nome"] for a in repo.listar_alunos(treinador)] == ["Ana", "Bia"]
+    assert repo.obter_metricas(treinador)["total_alunos"] == 2
+
+def test_hoje_omitido_entra_na_chave(repo, monkeypatch):
+    chamadas = []
+
+    @cache_por_treinador
+    def prazos(treinador_id, hoje=None):
+        chamadas.append(hoje)
+        return hoje
+
+    class Data:
+        hoje = date(2026, 1, 10)
+
+        @classmethod
+        def today(cls):
+            return cls.hoje
+
+    monkeypatch.setattr(banco, "date", Data)
+    with usando(repo.banco):
+        assert prazos(1) == date(2026, 1, 10)
+        assert prazos(1, hoje=date(2026, 1, 10)) == date(2026, 1, 10)
+        # Depois da meia-noite, a entrada do dia anterior não é usada
+        Data.hoje = date(2026, 1, 11)
+        assert prazos(1) == date(2026, 1, 11)
+    assert chamadas == [date(2026, 1, 10), date(2026, 1, 11)]
@@ -0,0 +1,81 @@
+import io
+from datetime import date
+
+from academia.conciliacao import CONCILIADA, REVISAR, SEM_CORRESPONDENCIA, conciliar, palavras, semelhanca_nome
+
+def _credito(descricao, valor_centavos=15000, data=date(2026, 1, 12)):
+    return {"identificador": descricao, "data": data, "valor_centavos": valor_centavos, "descricao": descricao}
+
+def _aberto(pagamento_id, nome, aluno_id=None, valor_centavos=15000, data_vencimento="2026-01-10"):
+    return {"id": pagamento_id, "aluno_id": aluno_id or pagamento_id, "valor_centavos": valor_centavos,
+            "data_vencimento": data_vencimento, "nome": nome}
+
+def test_semelhanca_nome():
+    assert semelhanca_nome("João Silva", set(palavras("PIX JOAO SILVA"))) == 1.0
+    # Inicial e erro de digitação
+    assert semelhanca_nome("João Souza", set(palavras("PIX J SOUSA"))) == 0.65
+    assert semelhanca_nome("João Silva", set(palavras("PIX MARIA"))) == 0.0
+
+def test_nome_claro_concilia():
+    abertos = [_aberto(1, "João Silva"), _aberto(2, "Maria Souza")]
+    [resultado] = conciliar([_credito("PIX RECEBIDO JOAO SILVA")], abertos)
+    assert resultado["situacao"] == CONCILIADA
+    assert resultado["pagamento_id"] == 1
+
+def test_mesmo_aluno_quita_o_vencimento_mais_antigo():
+    abertos = [_aberto(2, "João Silva", aluno_id=1, data_vencimento="2026-02-10"), _aberto(1, "João Silva", aluno_id=1)]
+    creditos = [_credito("PIX JOAO SILVA"), _credito("PIX JOAO SILVA", data=date(2026, 2, 9))]
+    assert [r["pagamento_id"] for r in conciliar(creditos, abertos)] == [1, 2]
+
+def test_nomes_ambiguos_vao_para_revisao():
+    # Mesma pontuação para dois alunos: abaixo da MARGEM_NOME
+    abertos = [_aberto(1, "João Silva"), _aberto(2, "João Santos")]
+    [resultado] = conciliar([_credito("PIX JOAO")], abertos)
+    assert resultado["situacao"] == REVISAR
+    assert sorted(resultado["candidatos"]) == [1, 2]
+
+def test_nome_fraco_vai_para_revisao():
+    # Apenas a inicial: abaixo do LIMIAR_NOME
+    [resultado] = conciliar([_credito("PIX J")], [_aberto(1, "João Silva")])
+    assert resultado["situacao"] == REVISAR
+    assert resultado["candidatos"] == [1]
+
+def test_valor_ou_data_fora_da_janela():
+    abertos = [_aberto(1, "João Silva")]
+    creditos = [_credito("PIX JOAO SILVA", valor_centavos=15001),
+                _credito("PIX JOAO SILVA", data=date(2026, 3, 20)),
+                _credito("PIX JOAO SILVA", data=date(2025, 12, 20))]
+    assert [r["situacao"] for r in conciliar(creditos, abertos)] == [SEM_CORRESPONDENCIA] * 3
+
+def _extrato(*linhas):
+    return io.BytesIO(("data;valor;descricao\n" + "".join(f"{linha}\n" for linha in linhas)).encode())
+
+def test_fila_de_revisao(repo, treinador):
+    silva = repo.adicionar_aluno("João Silva", "silva@exemplo.com", "1", "2026-01-10", 15000, treinador)
+    santos = repo.adicionar_aluno("João Santos", "santos@exemplo.com", "2", "2026-01-10", 15000, treinador)
+    totais = repo.importar_extrato(_extrato("12/01/2026;150,00;PIX JOAO", "13/01/2026;99,00;PIX OUTRO"),
+                                   treinador, "extrato.csv")
+    assert (totais["conciliados"], totais["revisar"], totais["sem_correspondencia"]) == (0, 1, 1)
+
+    [transacao] = repo.listar_revisao(treinador)
+    assert {p["nome"] for p in transacao["candidatos"]} == {"João Silva", "João Santos"}
+    # Pagamento de outro treinador não é aceito
+    pagamento = repo.obter_status_pagamento(santos)["id"]
+    assert not repo.confirmar_conciliacao(treinador + 1, transacao["id"], pagamento)
+    assert repo.confirmar_conciliacao(treinador, transacao["id"], pagamento)
+    assert repo.obter_status_pagamento(santos)["data_pagamento"] == "2026-01-12"
+    assert repo.obter_status_pagamento(silva)["status"] == "Pendente"
+    assert repo.listar_revisao(treinador) == []
+    # Já resolvido
+    assert not repo.descartar_conciliacao(treinador, transacao["id"])
+
+    # O mesmo extrato importado de novo não gera créditos repetidos
+    totais = repo.importar_extrato(_extrato("12/01/2026;150,00;PIX JOAO"), treinador, "extrato.csv")
+    assert totais["ja_importados"] == 1
+
+def test_descartar_da_revisao(repo, treinador):
+    repo.adicionar_aluno("João Silva", "silva@exemplo.com", "1", "2026-01-10", 15000, treinador)
+    repo.importar_extrato(_extrato("12/01/2026;150,00;PIX J"), treinador, "extrato.csv")
+    [transacao] = repo.listar_revisao(treinador)
+    assert repo.descartar_conciliacao(treinador, transacao["id"])
+    assert repo.listar_revisao(treinador) == []
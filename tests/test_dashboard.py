@@ -0,0 +1,41 @@
+from datetime import date
+
+from academia import dados
+from academia.banco import usando
+from academia.instrumentacao import registrar_execucao
+from academia.repositorio import Repositorio
+
+def test_painel_em_uma_consulta(tmp_path):
+    # Alunos e último pagamento de cada um em uma consulta, qualquer que seja o número de alunos
+    repo = Repositorio(str(tmp_path / "academia.db"))
+    repo.register_user("Treinador", "treinador@exemplo.com", "senha")
+    treinador = repo.authenticate_user("treinador@exemplo.com", "senha")["id"]
+
+    comandos = []
+    for total in (2, 6):
+        while len(repo.listar_alunos(treinador)) < total:
+            n = len(repo.listar_alunos(treinador))
+            aluno = repo.adicionar_aluno(f"Aluno {n}", f"aluno{n}@exemplo.com", str(n), "2026-01-10", 15000, treinador)
+            repo.criar_proximo_pagamento(aluno, 15000, "2026-01-10")
+        with usando(repo.banco), registrar_execucao("Dashboard") as registro:
+            tabela = dados.obter_painel_alunos.__wrapped__(treinador, date(2026, 1, 20))["tabela"]
+        comandos.append(len(registro.comandos))
+        assert len(tabela) == total
+        # O pagamento exibido é o de vencimento mais recente
+        assert set(tabela["pag_data_vencimento"]) == {"2026-02-10"}
+    assert comandos[0] == comandos[1] == 1
+
+def test_prazos_calculados_por_coluna():
+    import pandas as pd
+
+    tabela = pd.DataFrame({
+        "pag_status": ["Pendente", "Pendente", "Atrasado", "Pendente", "Pago", None],
+        "pag_data_vencimento": ["2026-01-25", "2026-01-20", "2025-12-10", "2025-09-01", "2026-01-10", None],
+        "pag_data_pagamento": [None, None, None, None, "2026-01-12", None],
+        "data_pagamento": ["2026-01-25", "2026-01-20", "2025-12-10", "2025-09-01", "2026-01-10", "2026-01-05"],
+    })
+    tabela = dados.calcular_prazos(tabela, date(2026, 1, 20))
+    assert tabela["situacao"].tolist() == ["Vence em 5 dias", "Vence hoje", "Atrasado há 41 dias",
+                                           "Atrasado há 141 dias", "Pago em 12/01/2026", ""]
+    assert tabela["faixa_atraso"].astype(str).tolist() == ["nan", "nan", "31-60", "90+", "nan", "nan"]
+    assert tabela["data_pagamento_exibicao"].tolist()[:2] == ["25/01/2026", "20/01/2026"]
@@ -0,0 +1,53 @@
+import io
+
+import pandas as pd
+import pytest
+
+from academia.conciliacao import ler_extrato
+from academia.dinheiro import centavos_de_texto, formatar_reais, formatar_valor, para_centavos, para_reais
+from academia.importacao import _converter_valores
+
+# Mesmo texto, mesmo valor na importação de alunos e na conciliação de extratos
+VALORES = [
+    ("150", 15000),
+    ("150.00", 15000),
+    ("150,00", 15000),
+    ("150.5", 15050),
+    ("1.500", 150000),
+    ("1.234.567", 123456700),
+    ("1.234,56", 123456),
+    ("R$ 1.500,00", 150000),
+    ("12.3456", 1235),
+]
+
+@pytest.mark.parametrize("texto, centavos", VALORES)
+def test_centavos_de_texto(texto, centavos):
+    assert centavos_de_texto(texto) == centavos
+
+def test_importacao_usa_a_mesma_regra():
+    textos = [texto for texto, _ in VALORES] + ["abc", ""]
+    assert _converter_valores(pd.Series(textos)).tolist() == [centavos for _, centavos in VALORES] + [0, 0]
+
+def test_conciliacao_usa_a_mesma_regra():
+    linhas = "".join(f'10/01/2026;"{texto}";PIX {i}\n' for i, (texto, _) in enumerate(VALORES))
+    creditos, erros = ler_extrato(io.BytesIO(("data;valor;descricao\n" + linhas).encode()), "extrato.csv")
+    assert erros == []
+    assert [c["valor_centavos"] for c in creditos] == [centavos for _, centavos in VALORES]
+
+def test_formatacao():
+    assert para_centavos(0.1 + 0.2) == 30
+    assert formatar_valor(123456) == "1.234,56"
+    assert formatar_reais(-5) == "R$ -0,05"
+
+@pytest.mark.parametrize("centavos", [0, 1, 10, 15010, 19999, 123456789])
+def test_ida_e_volta_do_formulario(centavos):
+    # O campo numérico do formulário recebe para_reais e devolve um float, salvo com para_centavos
+    assert para_centavos(para_reais(centavos)) == centavos
+
+def test_metricas_somadas_em_centavos(repo, treinador):
+    # Três mensalidades de R$ 0,10: em float, 0.1 + 0.1 + 0.1 != 0.3
+    for i in range(3):
+        repo.adicionar_aluno(f"Aluno {i}", f"aluno{i}@exemplo.com", "1", "2026-01-10", para_centavos(0.1), treinador)
+    metricas = repo.obter_metricas(treinador)
+    assert metricas["receita_mensal_centavos"] == 30
+    assert formatar_reais(metricas["receita_mensal_centavos"]) == "R$ 0,30"
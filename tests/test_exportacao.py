@@ -0,0 +1,17 @@
+import io
+
+import pyarrow.parquet as pq
+
+def test_exportar_sem_linhas(repo, treinador):
+    destino = io.BytesIO()
+    assert repo.exportar(treinador, "pagamentos", "csv", destino) == 0
+    assert destino.getvalue().decode().splitlines() == [
+        "id,aluno_id,aluno_nome,data_vencimento,data_pagamento,valor_centavos,status"]
+
+def test_exportar_parquet(repo, treinador):
+    repo.adicionar_aluno("Ana", "ana@exemplo.com", "1", "2026-01-10", 15000, treinador)
+    repo.adicionar_aluno("Bia", "bia@exemplo.com", "2", "2026-01-15", 20000, treinador)
+    destino = io.BytesIO()
+    assert repo.exportar(treinador, "alunos", "parquet", destino, tamanho_lote=1) == 2
+    tabela = pq.read_table(io.BytesIO(destino.getvalue()))
+    assert tabela.column("mensalidade_centavos").to_pylist() == [15000, 20000]
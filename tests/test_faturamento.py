@@ -0,0 +1,33 @@
+from datetime import date
+
+from academia.banco import leitura
+from academia.faturamento import vencimentos_pendentes
+
+def _vencimentos(repo, aluno_id):
+    with leitura(repo.banco) as conn:
+        return [row[0] for row in conn.execute(
+            "SELECT data_vencimento FROM pagamentos WHERE aluno_id = ? ORDER BY data_vencimento", (aluno_id,))]
+
+def test_cobrancas_do_mes_seguinte_para_todos(repo, treinador):
+    ana = repo.adicionar_aluno("Ana", "ana@exemplo.com", "1", "2026-01-10", 15000, treinador)
+    bia = repo.adicionar_aluno("Bia", "bia@exemplo.com", "2", "2026-01-31", 12000, treinador)
+
+    assert repo.gerar_cobrancas(treinador, date(2026, 2, 1)) == 2
+    assert _vencimentos(repo, ana) == ["2026-01-10", "2026-02-10"]
+    # Dia 31 em fevereiro: último dia do mês
+    assert _vencimentos(repo, bia) == ["2026-01-31", "2026-02-28"]
+
+def test_cobrancas_preenchem_meses_para_tras(repo, treinador):
+    ana = repo.adicionar_aluno("Ana", "ana@exemplo.com", "1", "2026-01-31", 15000, treinador)
+
+    assert repo.gerar_cobrancas(treinador, date(2026, 4, 1)) == 3
+    # O dia fixo do aluno volta depois de fevereiro
+    assert _vencimentos(repo, ana) == ["2026-01-31", "2026-02-28", "2026-03-31", "2026-04-30"]
+
+def test_cobrancas_idempotentes(repo, treinador):
+    repo.adicionar_aluno("Ana", "ana@exemplo.com", "1", "2026-01-10", 15000, treinador)
+    assert repo.gerar_cobrancas(treinador, date(2026, 3, 1)) == 2
+    assert repo.gerar_cobrancas(treinador, date(2026, 3, 1)) == 0
+
+def test_limite_de_meses_retroativos():
+    assert vencimentos_pendentes("2024-01-10", 10, date(2026, 1, 1), max_meses=2) == ["2025-12-10", "2026-01-10"]
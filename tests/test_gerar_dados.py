@@ -0,0 +1,30 @@
+import sqlite3
+from datetime import date
+
+from benchmarks.gerar_dados import gerar_banco
+
+def _alunos_por_treinador(caminho):
+    conn = sqlite3.connect(caminho)
+    try:
+        return conn.execute("SELECT treinador_id, COUNT(*) FROM alunos GROUP BY treinador_id").fetchall()
+    finally:
+        conn.close()
+
+def test_total_de_alunos_pedido(tmp_path):
+    caminho = str(tmp_path / "sintetico.db")
+    totais = gerar_banco(caminho, treinadores=3, alunos_por_treinador=4, meses=2, hoje=date(2026, 1, 10),
+                         total_alunos=10)
+    assert (totais["treinadores"], totais["alunos"]) == (3, 10)
+    # O último treinador fica com o resto
+    assert _alunos_por_treinador(caminho) == [(1, 4), (2, 4), (3, 2)]
+
+def test_mesma_semente_mesmo_banco(tmp_path):
+    caminhos = [str(tmp_path / f"sintetico{i}.db") for i in range(2)]
+    for caminho in caminhos:
+        gerar_banco(caminho, treinadores=2, alunos_por_treinador=5, meses=3, hoje=date(2026, 1, 10))
+    linhas = []
+    for caminho in caminhos:
+        conn = sqlite3.connect(caminho)
+        linhas.append(conn.execute("SELECT * FROM pagamentos ORDER BY id").fetchall())
+        conn.close()
+    assert linhas[0] == linhas[1] and linhas[0]
@@ -0,0 +1,26 @@
+from academia import dados
+from academia.banco import leitura
+
+def test_paginas_do_historico(repo, treinador):
+    ana = repo.adicionar_aluno("Ana", "ana@exemplo.com", "1", "2026-01-10", 15000, treinador)
+    for _ in range(6):
+        atual = repo.obter_status_pagamento(ana)
+        repo.criar_proximo_pagamento(ana, 15000, atual["data_vencimento"])
+
+    vencimentos = []
+    depois_de = None
+    while True:
+        pagina = repo.listar_historico_pagamentos(treinador, ana, depois_de, limite=3)
+        vencimentos.extend(p["data_vencimento"] for p in pagina["pagamentos"])
+        depois_de = pagina["proxima"]
+        if depois_de is None:
+            break
+    assert vencimentos == [f"2026-{mes:02d}-10" for mes in range(7, 0, -1)]
+
+def test_continuacao_usa_intervalo_no_indice(repo):
+    # As páginas seguintes começam no ponto da chave, e não pelo pagamento mais recente
+    with leitura(repo.banco) as conn:
+        plano = conn.execute("EXPLAIN QUERY PLAN " + dados.SQL_HISTORICO_CONTINUACAO,
+                             {"aluno_id": 1, "treinador_id": 1, "data_vencimento": "2026-01-10", "id": 1,
+                              "limite": 4}).fetchall()
+    assert any("aluno_id=? AND data_vencimento<?" in linha[3] for linha in plano)
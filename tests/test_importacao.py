@@ -0,0 +1,16 @@
+import pandas as pd
+
+from academia.importacao import validar_lote
+
+def test_valores_da_mensalidade():
+    lote = pd.DataFrame({
+        "nome": ["Ana", "Bia", "Caio", "Duda"],
+        "email": ["ana@exemplo.com", "bia@exemplo.com", "caio@exemplo.com", "duda@exemplo.com"],
+        "telefone": ["1", "2", "3", "4"],
+        "data_vencimento": ["2026-01-10", "10/01/2026", "2026-01-10", "2026-01-10"],
+        "valor_mensalidade": ["1.500", "R$ 150,00", "-150", "abc"],
+    })
+    validas, erros = validar_lote(lote, 2)
+    assert validas["mensalidade_centavos"].tolist() == [150000, 15000]
+    assert erros == [{"linha": 4, "erro": "valor da mensalidade inválido"},
+                     {"linha": 5, "erro": "valor da mensalidade inválido"}]
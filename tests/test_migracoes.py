@@ -0,0 +1,41 @@
+import sqlite3
+
+from academia import estatisticas, relatorios
+from academia.banco import MIGRACOES, fechar_conexoes, init_db, leitura
+
+def _colunas(conn, tabela):
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({tabela})")]
+
+def test_banco_novo(tmp_path):
+    caminho = str(tmp_path / "novo.db")
+    assert init_db(caminho) == len(MIGRACOES)
+    # Reabrindo o arquivo: nenhuma migração é reaplicada
+    fechar_conexoes()
+    assert init_db(caminho) == 0
+    with leitura(caminho) as conn:
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == len(MIGRACOES)
+        assert "mensalidade_centavos" in _colunas(conn, "alunos")
+        assert "valor_mensalidade" not in _colunas(conn, "alunos")
+
+def test_banco_original(banco_original):
+    original = sqlite3.connect(banco_original)
+    alunos = original.execute("SELECT id, treinador_id, dia_vencimento, valor_mensalidade FROM alunos ORDER BY id").fetchall()
+    pagamentos = original.execute("SELECT id, valor, status FROM pagamentos ORDER BY id").fetchall()
+    original.close()
+
+    assert init_db(banco_original) == len(MIGRACOES)
+    with leitura(banco_original) as conn:
+        migrados = conn.execute('''
+        SELECT id, treinador_id, dia_vencimento, mensalidade_centavos FROM alunos ORDER BY id
+        ''').fetchall()
+        assert [tuple(row) for row in migrados] == [(i, t, d, round(v * 100)) for i, t, d, v in alunos]
+        migrados = conn.execute("SELECT id, valor_centavos, status, typeof(valor_centavos) FROM pagamentos ORDER BY id")
+        assert [tuple(row) for row in migrados] == [(i, round(v * 100), s, "integer") for i, v, s in pagamentos]
+
+    # Contadores, ponteiros e resumo mensal calculados a partir dos dados migrados
+    assert estatisticas.verificar_estatisticas(banco_original) == []
+    assert estatisticas.verificar_pagamentos_atuais(banco_original) == []
+    assert relatorios.atualizar_resumo_mensal(banco_original) > 0
+    with leitura(banco_original) as conn:
+        esperado = conn.execute("SELECT SUM(valor_centavos) FROM pagamentos").fetchone()[0]
+        assert conn.execute("SELECT SUM(valor_esperado_centavos) FROM resumo_mensal").fetchone()[0] == esperado
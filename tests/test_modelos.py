@@ -0,0 +1,37 @@
+import pytest
+
+from academia.notificacoes import MODELOS_PADRAO, compilar_modelo, renderizar_mensagens, validar_modelo
+
+def test_renderizar_em_lote():
+    notificacoes = [{"nome": "Ana", "valor_centavos": 150000, "vencimento": "10/01/2026"},
+                    {"nome": "Bia", "valor_centavos": 5, "vencimento": "13/01/2026"}]
+    assert renderizar_mensagens("{nome}: R$ {valor} em {vencimento}", notificacoes) == [
+        "Ana: R$ 1.500,00 em 10/01/2026", "Bia: R$ 0,05 em 13/01/2026"]
+
+def test_campo_ausente_fica_vazio():
+    assert renderizar_mensagens("Olá {nome}{telefone}!", [{"nome": "Ana"}]) == ["Olá Ana!"]
+
+def test_modelo_compilado_uma_vez():
+    texto = "Olá {nome}, {{chaves}} literais"
+    assert compilar_modelo(texto) is compilar_modelo(texto)
+    assert renderizar_mensagens(texto, [{"nome": "Ana"}]) == ["Olá Ana, {chaves} literais"]
+
+@pytest.mark.parametrize("texto, erro", [
+    ("Olá {nome", "chaves"),
+    ("Olá {apelido}", "Campo inválido"),
+    ("R$ {valor:.2f}", "Formatação não suportada"),
+])
+def test_modelo_invalido(texto, erro):
+    assert erro in validar_modelo(texto)
+    # Um modelo inválido salvo antes da validação é enviado como está
+    assert renderizar_mensagens(texto, [{"nome": "Ana"}]) == [texto]
+
+def test_salvar_modelo(repo, treinador):
+    assert all(validar_modelo(texto) is None for texto in MODELOS_PADRAO.values())
+    repo.salvar_modelo(treinador, "hoje", "Oi {nome}")
+    assert repo.obter_modelos(treinador)["hoje"] == "Oi {nome}"
+    assert repo.obter_modelos(treinador)["atrasados"] == MODELOS_PADRAO["atrasados"]
+    with pytest.raises(ValueError):
+        repo.salvar_modelo(treinador, "hoje", "Oi {apelido}")
+    with pytest.raises(ValueError):
+        repo.salvar_modelo(treinador, "amanha", "Oi {nome}")
@@ -0,0 +1,69 @@
+import asyncio
+import threading
+from datetime import date
+
+from academia import notificacoes
+from academia.banco import conexao, leitura, usando
+
+def _status(repo):
+    with leitura(repo.banco) as conn:
+        return [row[0] for row in conn.execute("SELECT status FROM envios ORDER BY id")]
+
+def test_liberar_apenas_reservas_expiradas(repo, treinador):
+    repo.enfileirar([{"treinador_id": treinador, "pagamento_id": i, "canal": "email", "destino": "a@exemplo.com",
+                      "mensagem": "Lembrete", "referencia": "2026-01-10"} for i in (1, 2)])
+    with usando(repo.banco):
+        # Reserva de outro despachante ainda em andamento
+        assert len(notificacoes._reservar(1)) == 1
+        assert notificacoes.liberar_reservas() == 0
+        assert _status(repo) == ["Enviando", "Pendente"]
+
+        # Reserva de um despachante interrompido há mais tempo que a expiração
+        with conexao(repo.banco) as conn:
+            conn.execute("UPDATE envios SET reservado_em = '2026-01-01 00:00:00' WHERE status = 'Enviando'")
+        assert notificacoes.liberar_reservas() == 1
+        assert _status(repo) == ["Pendente", "Pendente"]
+
+def test_drenar_fila_em_conexao_externa(repo, treinador):
+    # A conexão do repo (sqlite3.connect(':memory:')) só pode ser usada na thread que a criou
+    repo.enfileirar([{"treinador_id": treinador, "pagamento_id": 1, "canal": "email", "destino": "a@exemplo.com",
+                      "mensagem": "Lembrete", "referencia": "2026-01-10"}])
+    with usando(repo.banco):
+        totais = asyncio.run(notificacoes.drenar_fila({"email": notificacoes.TransporteSimulado()}))
+    assert totais == {"enviados": 1, "falhas": 0}
+    assert _status(repo) == ["Enviado"]
+
+def test_despachante_continua_apos_erro(monkeypatch):
+    parar = threading.Event()
+    chamadas = []
+
+    async def drenar_fila(transportes, caminho=None):
+        chamadas.append(caminho)
+        if len(chamadas) == 1:
+            raise RuntimeError("falha no transporte")
+        parar.set()
+        return {"enviados": 0, "falhas": 0}
+
+    monkeypatch.setattr(notificacoes, "drenar_fila", drenar_fila)
+    monkeypatch.setattr(notificacoes, "liberar_reservas", lambda banco: 0)
+    monkeypatch.setattr(notificacoes, "INTERVALO_ENVIOS_S", 0.01)
+    notificacoes.executar_despachante(parar, bancos=lambda: ["academia.db"])
+    assert chamadas == ["academia.db", "academia.db"]
+
+def test_enfileirar_ignora_repetidos(repo, treinador):
+    envios = [{"treinador_id": treinador, "pagamento_id": 1, "canal": canal, "destino": "a@exemplo.com",
+               "mensagem": "Lembrete", "referencia": "2026-01-10"} for canal in ("email", "whatsapp")]
+    assert repo.enfileirar(envios) == 2
+    # Mesmo pagamento, canal e referência: já enfileirado
+    assert repo.enfileirar(envios) == 0
+    assert repo.enfileirar([dict(envios[0], referencia="2026-01-11")]) == 1
+    assert _status(repo) == ["Pendente"] * 3
+
+def test_lembretes_do_dia_em_lote(repo, treinador):
+    repo.adicionar_aluno("Ana", "ana@exemplo.com", "1", "2026-01-10", 15000, treinador)
+    repo.adicionar_aluno("Bia", "bia@exemplo.com", "2", "2026-01-13", 12000, treinador)
+    assert repo.enfileirar_lembretes_do_dia(treinador, ("email", "whatsapp"), date(2026, 1, 10)) == 4
+    assert repo.enfileirar_lembretes_do_dia(treinador, ("email", "whatsapp"), date(2026, 1, 10)) == 0
+    with leitura(repo.banco) as conn:
+        assert [tuple(row) for row in conn.execute("SELECT canal, destino FROM envios ORDER BY id")] == [
+            ("email", "bia@exemplo.com"), ("whatsapp", "2"), ("email", "ana@exemplo.com"), ("whatsapp", "1")]
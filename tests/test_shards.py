@@ -0,0 +1,32 @@
+from academia import estatisticas
+from academia.banco import leitura
+from academia.shards import caminho_catalogo, caminho_shard, dividir, listar_shards
+
+def test_dividir_banco_original(banco_original, tmp_path):
+    # No banco original, alunos.dia_vencimento foi adicionada depois de treinador_id (migração 1);
+    # no banco novo de cada treinador ela vem antes: a cópia precisa casar as colunas pelo nome
+    diretorio = str(tmp_path / "shards")
+    assert dividir(banco_original, diretorio) == 3
+
+    with leitura(banco_original) as conn:
+        treinadores = [tuple(row) for row in conn.execute("SELECT id, nome, email, senha FROM treinadores ORDER BY id")]
+        alunos = {row["id"]: dict(row) for row in conn.execute("SELECT * FROM alunos")}
+        pagamentos = {row["id"]: dict(row) for row in conn.execute("SELECT * FROM pagamentos")}
+    with leitura(caminho_catalogo(diretorio)) as conn:
+        assert [tuple(row) for row in conn.execute("SELECT id, nome, email, senha FROM treinadores ORDER BY id")] == treinadores
+
+    assert [t for t, _ in listar_shards(diretorio)] == [t[0] for t in treinadores]
+    copiados = 0
+    for treinador_id, _, _, _ in treinadores:
+        caminho = caminho_shard(diretorio, treinador_id)
+        with leitura(caminho) as conn:
+            for row in conn.execute("SELECT * FROM alunos"):
+                assert dict(row) == alunos[row["id"]]
+                assert row["treinador_id"] == treinador_id
+                copiados += 1
+            for row in conn.execute("SELECT * FROM pagamentos"):
+                assert dict(row) == pagamentos[row["id"]]
+            assert [row[0] for row in conn.execute("SELECT treinador_id FROM treinador_stats")] == [treinador_id]
+        assert estatisticas.verificar_estatisticas(caminho) == []
+        assert estatisticas.verificar_pagamentos_atuais(caminho) == []
+    assert copiados == len(alunos)
@@ -0,0 +1,57 @@
+from datetime import date
+
+import pytest
+
+from academia.banco import leitura
+
+def _pagamento(repo, pagamento_id):
+    with leitura(repo.banco) as conn:
+        return dict(conn.execute("SELECT status, data_pagamento FROM pagamentos WHERE id = ?", (pagamento_id,)).fetchone())
+
+def test_alterar_status_pagamento(repo, treinador):
+    ana = repo.adicionar_aluno("Ana", "ana@exemplo.com", "1", "2026-01-10", 15000, treinador)
+    pagamento = repo.obter_status_pagamento(ana)["id"]
+
+    # Pagamentos de alunos de outro treinador não são alterados
+    assert repo.alterar_status_pagamento(treinador + 1, pagamento, "Pago") == 0
+    assert repo.alterar_status_pagamento(treinador, pagamento, "Pago", hoje=date(2026, 1, 12)) == 1
+    assert _pagamento(repo, pagamento) == {"status": "Pago", "data_pagamento": "2026-01-12"}
+    assert repo.obter_metricas(treinador)["pagos"] == 1
+
+    assert repo.alterar_status_pagamento(treinador, pagamento, "Pendente") == 1
+    assert _pagamento(repo, pagamento) == {"status": "Pendente", "data_pagamento": None}
+
+def test_alterar_status_em_lote(repo, treinador):
+    ana = repo.adicionar_aluno("Ana", "ana@exemplo.com", "1", "2026-01-10", 15000, treinador)
+    bia = repo.adicionar_aluno("Bia", "bia@exemplo.com", "2", "2026-01-31", 12000, treinador)
+    pagamentos = [repo.obter_status_pagamento(aluno)["id"] for aluno in (ana, bia)]
+
+    resultado = repo.alterar_status_pagamentos(treinador, pagamentos, "Pago", hoje=date(2026, 1, 12))
+    assert resultado == {"alterados": 2, "proximos": 0}
+    assert all(_pagamento(repo, p) == {"status": "Pago", "data_pagamento": "2026-01-12"} for p in pagamentos)
+
+def test_alterar_status_em_lote_com_proximos(repo, treinador):
+    ana = repo.adicionar_aluno("Ana", "ana@exemplo.com", "1", "2026-01-31", 15000, treinador)
+    pagamento = repo.obter_status_pagamento(ana)["id"]
+
+    assert repo.alterar_status_pagamentos(treinador, [pagamento], "Pago", criar_proximos=True) == \
+        {"alterados": 1, "proximos": 1}
+    assert repo.obter_status_pagamento(ana)["data_vencimento"] == "2026-02-28"
+    # O próximo pagamento já existe: não é criado de novo
+    assert repo.alterar_status_pagamentos(treinador, [pagamento], "Pago", criar_proximos=True)["proximos"] == 0
+
+def test_alterar_status_em_lote_de_outro_treinador(repo, treinador):
+    ana = repo.adicionar_aluno("Ana", "ana@exemplo.com", "1", "2026-01-10", 15000, treinador)
+    pagamento = repo.obter_status_pagamento(ana)["id"]
+
+    assert repo.alterar_status_pagamentos(treinador + 1, [pagamento], "Pago", criar_proximos=True) == \
+        {"alterados": 0, "proximos": 0}
+    assert _pagamento(repo, pagamento)["status"] == "Pendente"
+
+def test_alterar_status_em_lote_invalido(repo, treinador):
+    ana = repo.adicionar_aluno("Ana", "ana@exemplo.com", "1", "2026-01-10", 15000, treinador)
+    pagamento = repo.obter_status_pagamento(ana)["id"]
+
+    with pytest.raises(ValueError):
+        repo.alterar_status_pagamentos(treinador, [pagamento], "Cancelado")
+    assert _pagamento(repo, pagamento)["status"] == "Pendente"
@@ -0,0 +1,62 @@
+import sqlite3
+from datetime import date
+
+from academia import tarefas
+from academia.banco import leitura
+from academia.repositorio import Repositorio
+
+DATA = date(2026, 1, 20)
+
+def _banco_com_dois_treinadores(caminho):
+    repo = Repositorio(caminho)
+    treinadores = []
+    for nome in ("Um", "Dois"):
+        repo.register_user(nome, f"{nome.lower()}@exemplo.com", "senha")
+        treinador = repo.authenticate_user(f"{nome.lower()}@exemplo.com", "senha")["id"]
+        repo.adicionar_aluno(f"Aluno {nome}", f"aluno.{nome.lower()}@exemplo.com", "1", "2026-01-10", 15000, treinador)
+        treinadores.append(treinador)
+    return treinadores
+
+def _pagamentos_por_treinador(caminho):
+    with leitura(caminho) as conn:
+        return dict(conn.execute('''
+        SELECT a.treinador_id, COUNT(*) FROM pagamentos p JOIN alunos a ON a.id = p.aluno_id GROUP BY a.treinador_id
+        ''').fetchall())
+
+def test_retomar_do_checkpoint(tmp_path):
+    banco = str(tmp_path / "academia.db")
+    checkpoint = str(tmp_path / "checkpoint.json")
+    um, dois = _banco_com_dois_treinadores(banco)
+    tarefas.gravar_checkpoint(checkpoint, ["cobrancas"], DATA, {um: {"linhas": {"cobrancas": 1}, "segundos": 0.0}})
+
+    resultados = tarefas.executar(["cobrancas"], DATA, banco=banco, processos=1, checkpoint=checkpoint)
+    assert resultados[um]["retomada"] is True
+    assert resultados[dois]["linhas"] == {"cobrancas": 1}
+    # Apenas a partição que faltava gerou a cobrança de fevereiro
+    assert _pagamentos_por_treinador(banco) == {um: 1, dois: 2}
+    assert set(tarefas.ler_checkpoint(checkpoint, ["cobrancas"], DATA)) == {um, dois}
+    # Outra data de referência não reaproveita o checkpoint
+    assert tarefas.ler_checkpoint(checkpoint, ["cobrancas"], date(2026, 1, 21)) == {}
+
+def test_banco_unico_bloqueado(tmp_path, monkeypatch):
+    # No banco único, as partições disputam o mesmo escritor: gerar_cobrancas mantém BEGIN IMMEDIATE
+    # durante um treinador inteiro, e uma partição que espera mais que o busy_timeout falha com
+    # "database is locked". A falha fica fora do checkpoint e a partição é repetida na próxima execução.
+    banco = str(tmp_path / "academia.db")
+    checkpoint = str(tmp_path / "checkpoint.json")
+    um, dois = _banco_com_dois_treinadores(banco)
+    monkeypatch.setenv("ACADEMIA_BUSY_TIMEOUT_MS", "100")
+
+    escritor = sqlite3.connect(banco, isolation_level=None)
+    escritor.execute("BEGIN IMMEDIATE")
+    try:
+        resultados = tarefas.executar(["cobrancas"], DATA, banco=banco, processos=2, checkpoint=checkpoint)
+    finally:
+        escritor.execute("ROLLBACK")
+        escritor.close()
+    assert all("database is locked" in resultados[t]["erro"] for t in (um, dois))
+    assert tarefas.ler_checkpoint(checkpoint, ["cobrancas"], DATA) == {}
+
+    resultados = tarefas.executar(["cobrancas"], DATA, banco=banco, processos=2, checkpoint=checkpoint)
+    assert all("erro" not in resultados[t] for t in (um, dois))
+    assert _pagamentos_por_treinador(banco) == {um: 2, dois: 2}
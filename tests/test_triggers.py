@@ -0,0 +1,114 @@
+from academia import estatisticas
+from academia.banco import conexao, leitura
+
+def _sem_divergencias(repo):
+    assert estatisticas.verificar_estatisticas(repo.banco) == []
+    assert estatisticas.verificar_pagamentos_atuais(repo.banco) == []
+
+def _pendentes(repo):
+    with leitura(repo.banco) as conn:
+        return sorted(tuple(row) for row in conn.execute("SELECT treinador_id, mes FROM resumo_mensal_pendente"))
+
+def test_ponteiro_e_contadores(repo, treinador):
+    ana = repo.adicionar_aluno("Ana", "ana@exemplo.com", "1", "2026-01-10", 15000, treinador)
+    bia = repo.adicionar_aluno_com_status("Bia", "bia@exemplo.com", "2", "2026-01-15", 20000, treinador, "Pago")
+    _sem_divergencias(repo)
+
+    repo.criar_proximo_pagamento(ana, 15000, "2026-01-10")
+    atual = repo.obter_status_pagamento(ana)
+    assert (atual["data_vencimento"], atual["status"], atual["valor_centavos"]) == ("2026-02-10", "Pendente", 15000)
+    _sem_divergencias(repo)
+
+    assert repo.alterar_status_pagamento(treinador, atual["id"], "Pago") == 1
+    repo.atualizar_aluno(bia, "Bia", "bia@exemplo.com", "2", "2026-01-15", 25000)
+    metricas = repo.obter_metricas(treinador)
+    assert metricas["pagos"] == 2
+    assert metricas["receita_mensal_centavos"] == 40000
+    assert metricas["receita_recebida_centavos"] == 35000
+    _sem_divergencias(repo)
+
+    # Remover o último pagamento volta o ponteiro para o anterior
+    with conexao(repo.banco) as conn:
+        conn.execute("DELETE FROM pagamentos WHERE id = ?", (atual["id"],))
+    assert repo.obter_status_pagamento(ana)["data_vencimento"] == "2026-01-10"
+    _sem_divergencias(repo)
+
+    with conexao(repo.banco) as conn:
+        conn.execute("DELETE FROM pagamentos WHERE aluno_id = ?", (bia,))
+        conn.execute("DELETE FROM alunos WHERE id = ?", (bia,))
+    assert repo.obter_metricas(treinador)["total_alunos"] == 1
+    _sem_divergencias(repo)
+
+def test_meses_pendentes_do_resumo(repo, treinador):
+    ana = repo.adicionar_aluno("Ana", "ana@exemplo.com", "1", "2026-01-10", 15000, treinador)
+    assert _pendentes(repo) == [(treinador, "2026-01")]
+    repo.atualizar_resumo_mensal()
+    assert _pendentes(repo) == []
+
+    repo.criar_proximo_pagamento(ana, 15000, "2026-01-10")
+    assert _pendentes(repo) == [(treinador, "2026-02")]
+    repo.atualizar_resumo_mensal()
+
+    pagamento = repo.obter_status_pagamento(ana)
+    with conexao(repo.banco) as conn:
+        conn.execute("UPDATE pagamentos SET data_vencimento = '2026-03-10' WHERE id = ?", (pagamento["id"],))
+    assert _pendentes(repo) == [(treinador, "2026-02"), (treinador, "2026-03")]
+    repo.atualizar_resumo_mensal()
+
+    with conexao(repo.banco) as conn:
+        conn.execute("DELETE FROM pagamentos WHERE id = ?", (pagamento["id"],))
+    assert _pendentes(repo) == [(treinador, "2026-03")]
+
+def test_meses_pendentes_ao_mudar_aluno(repo, treinador):
+    repo.register_user("Outro", "outro@exemplo.com", "senha")
+    outro = repo.authenticate_user("outro@exemplo.com", "senha")["id"]
+    ana = repo.adicionar_aluno("Ana", "ana@exemplo.com", "1", "2026-01-10", 15000, treinador)
+    repo.criar_proximo_pagamento(ana, 15000, "2026-01-10")
+    repo.atualizar_resumo_mensal()
+
+    with conexao(repo.banco) as conn:
+        conn.execute("UPDATE alunos SET treinador_id = ? WHERE id = ?", (outro, ana))
+    assert _pendentes(repo) == sorted([(treinador, "2026-01"), (treinador, "2026-02"),
+                                       (outro, "2026-01"), (outro, "2026-02")])
+    repo.atualizar_resumo_mensal(treinador_id=treinador)
+    assert _pendentes(repo) == [(outro, "2026-01"), (outro, "2026-02")]
+    repo.atualizar_resumo_mensal(treinador_id=outro)
+    with leitura(repo.banco) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM resumo_mensal WHERE treinador_id = ?", (treinador,)).fetchone()[0] == 0
+
+    with conexao(repo.banco) as conn:
+        conn.execute("DELETE FROM alunos WHERE id = ?", (ana,))
+    assert _pendentes(repo) == [(outro, "2026-01"), (outro, "2026-02")]
+    repo.atualizar_resumo_mensal()
+    with leitura(repo.banco) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM resumo_mensal").fetchone()[0] == 0
+
+def test_busca_acompanha_alunos(repo, treinador):
+    jose = repo.adicionar_aluno("José Conceição", "jose@exemplo.com", "51 99999-0000", "2026-01-10", 15000, treinador)
+    repo.adicionar_aluno("Maria Souza", "maria@exemplo.com", "51 98888-0000", "2026-01-10", 15000, treinador)
+    assert [a["id"] for a in repo.buscar_alunos(treinador, "jose conc")] == [jose]
+    assert [a["nome"] for a in repo.buscar_alunos(treinador, "51 9999")] == ["José Conceição"]
+
+    repo.atualizar_aluno(jose, "Joana Conceição", "joana@exemplo.com", "51 99999-0000", "2026-01-10", 15000)
+    assert repo.buscar_alunos(treinador, "jose") == []
+    assert [a["id"] for a in repo.buscar_alunos(treinador, "joana")] == [jose]
+
+    with conexao(repo.banco) as conn:
+        conn.execute("DELETE FROM pagamentos WHERE aluno_id = ?", (jose,))
+        conn.execute("DELETE FROM alunos WHERE id = ?", (jose,))
+    assert repo.buscar_alunos(treinador, "joana") == []
+
+def test_busca_por_treinador(repo, treinador):
+    repo.register_user("Outro", "outro@exemplo.com", "senha")
+    outro = repo.authenticate_user("outro@exemplo.com", "senha")["id"]
+    ana = repo.adicionar_aluno("Ana Silva", "ana@exemplo.com", "1", "2026-01-10", 15000, treinador)
+    bia = repo.adicionar_aluno("Bia Silva", "bia@exemplo.com", "2", "2026-01-10", 15000, outro)
+    assert [a["id"] for a in repo.buscar_alunos(treinador, "silva")] == [ana]
+    assert [a["id"] for a in repo.buscar_alunos(outro, "silva")] == [bia]
+    # O número do treinador não é procurado como texto digitado
+    assert repo.buscar_alunos(treinador, str(outro)) == []
+
+    with conexao(repo.banco) as conn:
+        conn.execute("UPDATE alunos SET treinador_id = ? WHERE id = ?", (outro, ana))
+    assert repo.buscar_alunos(treinador, "silva") == []
+    assert [a["id"] for a in repo.buscar_alunos(outro, "silva")] == [ana, bia]